@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Post-provision orchestrator: runs the setup phases in one process.
+
+    python -m config                          # every phase, concurrently
+    python -m config --phases search          # a subset
+    python -m config --sequential             # one after another, in the order below
+
+The phases touch unrelated resources (RAI policy and Key Vault, Container Apps registries,
+Search), so they run concurrently on their own threads and the run takes as long as the slowest
+phase. They share one credential (tokens for the known scopes are prefetched concurrently and
+cached across runs), one App Config snapshot (listed once before the phases start) and one HTTP
+connection pool; see config/runtime.py, config/credentials.py and config/snapshot.py. Retries follow
+one policy (config/retry.py), whose counters are logged with the summary.
+
+Each phase keeps its own module and can still be run alone (``python -m config.search.setup``).
+The exit status is 1 when any phase failed; the duration and status of every phase are logged.
+"""
+
+import argparse
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from .retry import get_retry_policy
+from .runtime import close_http_session, get_credential
+from .snapshot import get_snapshot
+
+
+class Phase(NamedTuple):
+    name: str
+    module: str
+    title: str
+
+
+class PhaseResult(NamedTuple):
+    name: str
+    ok: bool
+    seconds: float
+    detail: str
+
+
+PHASES = (
+    Phase("aifoundry", "config.aifoundry.setup", "📑 AI Foundry setup"),
+    Phase("containerapps", "config.containerapps.setup", "🔍 Container Apps setup"),
+    Phase("search", "config.search.setup", "🔍 AI Search setup"),
+)
+
+
+def configure_logging() -> None:
+    log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+    logging.basicConfig(
+        level=getattr(logging, log_level, logging.INFO),
+        format="%(asctime)s %(levelname)s [%(threadName)s] %(message)s",
+    )
+    azure_log_level = logging.DEBUG if log_level == "DEBUG" else logging.WARNING
+    for logger_name in ("azure.core.pipeline.policies.http_logging_policy", "azure.identity", "azure.mgmt", "azure.appconfiguration"):
+        logging.getLogger(logger_name).setLevel(azure_log_level)
+
+
+def run_phase(phase: Phase, credential) -> PhaseResult:
+    """Import and run one phase; a phase fails when it raises, exits non-zero or returns False."""
+    logging.info(f"🚀 {phase.title} ({phase.module})…")
+    start = time.perf_counter()
+    ok, detail = True, ""
+    try:
+        module = importlib.import_module(phase.module)
+        if module.run(credential) is False:
+            ok, detail = False, "reported failures"
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            ok, detail = False, f"exited with status {e.code}"
+    except Exception as e:
+        logging.error(f"❗️ {phase.title} failed: {e}", exc_info=True)
+        ok, detail = False, str(e)
+    seconds = time.perf_counter() - start
+    logging.info(f"{'✅' if ok else '❗️'} {phase.title} finished in {seconds:.1f}s{'' if ok else f' ({detail})'}")
+    return PhaseResult(phase.name, ok, seconds, detail)
+
+
+def run_phases(phases: List[Phase], credential, sequential: bool = False) -> List[PhaseResult]:
+    if sequential:
+        return [run_phase(phase, credential) for phase in phases]
+
+    results: Dict[str, PhaseResult] = {}
+
+    def target(phase: Phase) -> None:
+        results[phase.name] = run_phase(phase, credential)
+
+    threads = [threading.Thread(target=target, args=(phase,), name=phase.name) for phase in phases]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [results[phase.name] for phase in phases]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    names = [phase.name for phase in PHASES]
+    parser = argparse.ArgumentParser(prog="python -m config", description="Run the GPT-RAG post-provision setup phases.")
+    parser.add_argument("--phases", default=",".join(names), help=f"Comma-separated phases to run (default: {','.join(names)}).")
+    parser.add_argument("--sequential", action="store_true", help="Run the phases one after another instead of concurrently.")
+    args = parser.parse_args(argv)
+    args.phases = [name.strip() for name in args.phases.split(",") if name.strip()]
+    unknown = sorted(set(args.phases) - set(names))
+    if unknown:
+        parser.error(f"unknown phase(s): {', '.join(unknown)}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    configure_logging()
+    args = parse_args(argv)
+    phases = [phase for phase in PHASES if phase.name in args.phases]
+    overall_start = time.perf_counter()
+
+    endpoint = os.getenv("APP_CONFIG_ENDPOINT")
+    if not endpoint:
+        logging.error("❗️ APP_CONFIG_ENDPOINT environment variable must be set.")
+        return 1
+
+    credential = get_credential()
+    credential.prefetch()
+    try:
+        # Load the snapshot once up front, so the phases read it from memory instead of racing to list it.
+        get_snapshot(endpoint, credential).load()
+    except Exception as e:
+        logging.error(f"❗️ Could not read App Configuration at {endpoint}: {e}")
+        return 1
+
+    try:
+        results = run_phases(phases, credential, args.sequential)
+    finally:
+        close_http_session()
+
+    overall = time.perf_counter() - overall_start
+    logging.info("=" * 60)
+    for result in results:
+        status = "✅ ok" if result.ok else f"❗️ failed ({result.detail})"
+        logging.info(f"⏱️ {result.name:<14} {result.seconds:7.1f}s  {status}")
+    logging.info(f"⏱️ {'total':<14} {overall:7.1f}s  ({'sequential' if args.sequential else 'concurrent'})")
+    retries = get_retry_policy().stats.summary()
+    if retries:
+        logging.info(f"🔄 Retries: {retries}")
+    logging.info("=" * 60)
+    return 0 if all(result.ok for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,33 +1,74 @@
 import os
-from typing import Dict, Any
-from azure.identity import ChainedTokenCredential, ManagedIdentityCredential, AzureCliCredential
-from azure.appconfiguration import AzureAppConfigurationClient
+from typing import Any, Iterable, Optional
 from azure.core.exceptions import AzureError
+from ..snapshot import DEFAULT_LABEL, AppConfigSnapshot, get_snapshot
+
+MAX_KEY_FILTERS = 5   # App Configuration accepts up to five comma-separated key filters
+
+
+def key_matches(key: str, key_filter: str) -> bool:
+    """True when ``key`` is selected by ``key_filter`` (exact keys, ``PREFIX*``, or a comma-separated list)."""
+    for part in key_filter.split(","):
+        part = part.strip()
+        if (part.endswith("*") and key.startswith(part[:-1])) or key == part:
+            return True
+    return False
+
 
 class AppConfigClient:
-    def __init__(self):
+    def __init__(
+        self,
+        keys: Optional[Iterable[str]] = None,
+        label: str = DEFAULT_LABEL,
+        endpoint: Optional[str] = None,
+        ttl: Optional[float] = None,
+        credential=None,
+    ):
         """
-        Bulk-loads all keys labeled 'gpt-rag' into an in-memory dict.
+        Reads settings labeled ``label`` through the shared App Config snapshots; nothing is fetched
+        until the first ``get``.
+
+        ``keys`` limits the listing to those keys or prefixes (``"AI_FOUNDRY_*"``); None lists the whole
+        label, and so does the first ``get`` of a key outside ``keys``. When the full label is already
+        loaded in this process (by another client or setup step) lookups are answered from it. ``ttl`` (seconds) makes a long-lived client revalidate its copy
+        with conditional requests once it is older than that.
         """
-        endpoint = os.getenv("APP_CONFIG_ENDPOINT")
-        if not endpoint:
+        self._endpoint = endpoint or os.getenv("APP_CONFIG_ENDPOINT")
+        if not self._endpoint:
             raise EnvironmentError("APP_CONFIG_ENDPOINT must be set")
+        self._label = label
+        self._ttl = ttl
+        self._credential = credential
+        keys = [keys] if isinstance(keys, str) else list(keys or [])
+        # One listing per group of at most five filters.
+        self._key_filters = [
+            ",".join(keys[i:i + MAX_KEY_FILTERS]) for i in range(0, len(keys), MAX_KEY_FILTERS)
+        ] or [None]
 
-        credential = ChainedTokenCredential(AzureCliCredential(),ManagedIdentityCredential())
-        client = AzureAppConfigurationClient(base_url=endpoint, credential=credential)
+    def _snapshot(self, key_filter: Optional[str]) -> AppConfigSnapshot:
+        return get_snapshot(self._endpoint, self._credential, self._label, key_filter)
 
-        self._settings: Dict[str, str] = {}
-
-        try:
-            for setting in client.list_configuration_settings(label_filter="gpt-rag"):
-                self._settings[setting.key] = setting.value
-        except AzureError as e:
-            raise RuntimeError(f"Failed to bulk-load 'gpt-rag' settings: {e}")
+    def _snapshot_for(self, key: str) -> AppConfigSnapshot:
+        full = self._snapshot(None)
+        if full.loaded:
+            return full
+        for key_filter in self._key_filters:
+            if key_filter is None or key_matches(key, key_filter):
+                return self._snapshot(key_filter)
+        # Not one of the requested keys: use the full-label snapshot (listed once per process)
+        # rather than a listing and cache file per ad-hoc key.
+        return full
 
     def get(self, key: str, default: Any = None) -> Any:
         """
-        Returns the in-memory value for the given key.
+        Returns the value for the given key, loading (or, past the TTL, revalidating) the snapshot
+        that covers it.
 
-        If the key was not found under either label, returns `default`.
+        If the key is not set under the label, returns `default`.
         """
-        return self._settings.get(key, default)
\ No newline at end of file
+        snapshot = self._snapshot_for(key)
+        try:
+            setting = snapshot.load(max_age=self._ttl).get(key)
+        except AzureError as e:
+            raise RuntimeError(f"Failed to load '{self._label}' settings: {e}")
+        return setting.value if setting is not None and setting.value is not None else default
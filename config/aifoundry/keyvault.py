@@ -1,25 +1,36 @@
-import os
-from azure.identity import ChainedTokenCredential, ManagedIdentityCredential, AzureCliCredential
-from azure.keyvault.secrets import SecretClient
-from azure.core.exceptions import AzureError
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from azure.core.exceptions import AzureError, ResourceNotFoundError
+from ..retry import endpoint_of, get_retry_policy
+from ..runtime import get_credential, get_transport
 from .appconfig import AppConfigClient
 
+LEGACY_HASH_TAG = "sha256"   # unsalted digest tag written by earlier versions; removed when seen
+SYNC_MAX_WORKERS = 8
+
+
 class KeyVaultClient:
     """
-    Simple wrapper to fetch and set secrets in Azure Key Vault.
-    Optionally accepts a vault URI; if not provided, reads KEY_VAULT_URI from App Configuration.
+    Simple wrapper to fetch, set and sync (write-if-changed) secrets in Azure Key Vault.
+    Optionally accepts a vault URI; if not provided, reads KEY_VAULT_URI from App Configuration
+    (only that key is listed, unless the process already holds the whole label).
     """
-    def __init__(self, vault_uri: str = None):
+    def __init__(self, vault_uri: str = None, credential=None):
         # Determine vault URI
         if vault_uri is None:
-            cfg = AppConfigClient()
+            cfg = AppConfigClient(keys=["KEY_VAULT_URI"], credential=credential)
             vault_uri = cfg.get("KEY_VAULT_URI")
             if not vault_uri:
                 raise EnvironmentError("KEY_VAULT_URI must be set to your Key Vault URI in App Configuration")
         # Authenticate
-        credential = ChainedTokenCredential(AzureCliCredential(),ManagedIdentityCredential())
+        credential = credential or get_credential()
+        from azure.keyvault.secrets import SecretClient
         try:
-            self._client = SecretClient(vault_url=vault_uri, credential=credential)
+            # Retries are left to the shared policy (config/retry.py) instead of the SDK's own.
+            self._client = SecretClient(vault_url=vault_uri, credential=credential, transport=get_transport(), retry_total=0)
+            self._endpoint = endpoint_of(vault_uri)
         except AzureError as e:
             raise RuntimeError(f"Failed to create SecretClient: {e}")
 
@@ -28,7 +39,7 @@ class KeyVaultClient:
         Returns the secret value, or raises on error.
         """
         try:
-            secret = self._client.get_secret(name)
+            secret = get_retry_policy().call(self._client.get_secret, name, endpoint=self._endpoint, label=f"Reading secret '{name}'")
             return secret.value
         except AzureError as e:
             raise RuntimeError(f"Error retrieving secret '{name}': {e}")
@@ -38,6 +49,61 @@ class KeyVaultClient:
         Stores (or updates) a secret in Key Vault.
         """
         try:
-            self._client.set_secret(name, value)
+            get_retry_policy().call(self._client.set_secret, name, value, endpoint=self._endpoint, label=f"Setting secret '{name}'")
+        except AzureError as e:
+            raise RuntimeError(f"Error setting secret '{name}': {e}")
+
+    def sync_secret(self, name: str, value: str) -> bool:
+        """
+        Write the secret only when it differs from the current version; returns True when a new
+        version was written. The comparison uses the current value (one get_secret, which needs the
+        same Get permission a caller of this method already has); nothing derived from the value
+        is stored in tags, since tags are readable with List permission alone.
+        """
+        retry = get_retry_policy()
+        try:
+            current = retry.call(self._client.get_secret, name, endpoint=self._endpoint, label=f"Reading secret '{name}'")
+        except ResourceNotFoundError:
+            current = None
+        except AzureError as e:
+            raise RuntimeError(f"Error retrieving secret '{name}': {e}")
+
+        tags = dict((current.properties.tags or {}) if current is not None else {})
+        had_legacy_tag = tags.pop(LEGACY_HASH_TAG, None) is not None
+        try:
+            if current is not None and current.value == value:
+                if had_legacy_tag:
+                    retry.call(
+                        self._client.update_secret_properties, name, tags=tags,
+                        endpoint=self._endpoint, label=f"Untagging secret '{name}'"
+                    )
+                    logging.info(f"🧹 Removed the '{LEGACY_HASH_TAG}' tag from secret '{name}'.")
+                logging.info(f"⏭️ Secret '{name}' is unchanged; skipping write.")
+                return False
+            retry.call(
+                self._client.set_secret, name, value, tags=tags or None,
+                endpoint=self._endpoint, label=f"Setting secret '{name}'"
+            )
+            logging.info(f"✅ Secret '{name}' written.")
+            return True
         except AzureError as e:
             raise RuntimeError(f"Error setting secret '{name}': {e}")
+
+    def sync_secrets(self, secrets: Dict[str, str], max_workers: int = SYNC_MAX_WORKERS) -> Dict[str, bool]:
+        """
+        Sync several secrets concurrently over this client (one credential and connection pool).
+        Returns {name: written}; raises the first error after every secret has been tried.
+        """
+        if not secrets:
+            return {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(secrets))), thread_name_prefix="keyvault") as pool:
+            futures = {name: pool.submit(self.sync_secret, name, value) for name, value in secrets.items()}
+        results, errors = {}, []
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+        return results
@@ -19,11 +19,17 @@ Prerequisites:
 - Azure CLI or Managed Identity authentication must be available.
 
 Features:
-- Loads configuration values from Azure App Configuration (subscription, resource group, account, deployment, Key Vault URI, etc).
+- Loads configuration values from Azure App Configuration (subscription, resource group, account, deployment, Key Vault URI, etc) through the shared, locally cached label snapshot (config/snapshot.py).
 - Reads RAI blocklist and policy definitions from JSON files and applies them to the specified Azure OpenAI (Cognitive Services) resource.
-- Creates or updates the RAI blocklist and its items, ensuring the blocklist is always in sync with the provided JSON.
-- Creates or updates the RAI policy, associates it with the deployment, and normalizes policy structure as needed.
+- Creates or updates the RAI blocklist and syncs its items with the provided JSON incrementally: items are diffed on
+  (pattern, isRegex), added with batch calls before stale ones are removed, so the live blocklist never loses coverage.
+- Creates or updates the RAI policy, associates it with the deployment, and normalizes policy structure as needed. Both
+  are compared with the live resources first and skipped when nothing would change, so a rerun does not put the chat
+  deployment through another update.
+- Retries throttled and transient ARM and Key Vault failures with the shared policy (config/retry.py).
 - Fetches the Azure OpenAI (AI Foundry) model API key and stores it as a secret in Azure Key Vault, enabling secure integration with AI Foundry Evaluation tools and workflows.
+- Runs the blocklist → policy → deployment chain and the Key Vault path concurrently as declared tasks on a bounded pool
+  (AIFOUNDRY_MAX_WORKERS), and logs how long each task took.
 
 Typical use case:
 Run this script after provisioning your Azure OpenAI resource and before running evaluation jobs that require access to the model API key via Key Vault.
@@ -32,20 +38,23 @@ Run this script after provisioning your Azure OpenAI resource and before running
 import os
 import sys
 import json
+import time
+import hashlib
 import logging
-from typing import Any, Dict, Optional
-
-from azure.identity import AzureCliCredential, ManagedIdentityCredential, ChainedTokenCredential
-from azure.core.exceptions import ClientAuthenticationError
-from azure.appconfiguration import AzureAppConfigurationClient
-from azure.mgmt.cognitiveservices import CognitiveServicesManagementClient
-from azure.mgmt.cognitiveservices.models import (
-    RaiBlocklist,
-    RaiBlocklistProperties,
-    RaiBlocklistItem,
-    RaiBlocklistItemProperties
-)
-from .keyvault import KeyVaultClient
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from ..retry import ARM_ENDPOINT, get_retry_policy, status_of
+from ..runtime import get_credential, get_transport
+from ..snapshot import get_snapshot
+from .tasks import Task, log_timings, run_tasks
+
+# The management SDK and Key Vault client are imported where they are used, so fast-fail paths
+# (missing environment, invalid JSON files) do not pay for loading them.
+if TYPE_CHECKING:
+    from azure.mgmt.cognitiveservices import CognitiveServicesManagementClient
+    from ..credentials import CachedTokenCredential
+    from ..snapshot import AppConfigSnapshot
 
 # ── Constants ─────────────────────────────────────────
 REQUIRED_ENV_VARS = ["APP_CONFIG_ENDPOINT"]
@@ -55,6 +64,10 @@ RAI_POLICIES_JSON_FILE = "config/aifoundry/raipolicies.json"
 RAI_BLOCKLIST_JSON_FILE = "config/aifoundry/raiblocklist.json"
 CANONICAL_DEPLOYMENT_NAME = "CHAT_DEPLOYMENT_NAME"
 SECRET_NAME = "evaluationsModelApiKey"
+BLOCKLIST_BATCH_SIZE = 100
+BLOCKLIST_MAX_WORKERS = int(os.getenv("BLOCKLIST_MAX_WORKERS", "8"))
+MAX_WORKERS = int(os.getenv("AIFOUNDRY_MAX_WORKERS", "4"))   # concurrent setup tasks
+BATCH_FALLBACK_STATUS = {400, 404, 405}   # batch operation not accepted for this account/API version
 
 # ── Logging ───────────────────────────────────────────
 def configure_logging():
@@ -76,19 +89,19 @@ def check_env() -> None:
         sys.exit(1)
 
 # ── Azure App Config Helper ───────────────────────────
-def cfg(client: AzureAppConfigurationClient, key: str, label: str = 'gpt-rag', required: bool = True) -> str:
-    """Fetch a single value from App Configuration; exit if missing or empty."""
+def cfg(snapshot: "AppConfigSnapshot", key: str, required: bool = True) -> str:
+    """Read a value from the shared App Configuration snapshot; exit if missing or empty."""
     try:
-        setting = client.get_configuration_setting(key=key, label=label)
+        value = snapshot.get(key)
     except Exception as e:
-        logging.error("❗️ Could not fetch key '%s': %s", key, e)
+        logging.error("❗️ Could not load App Configuration label '%s': %s", snapshot.label, e)
         if required:
             sys.exit(1)
         return ""
-    if required and (setting is None or not setting.value):
+    if required and not value:
         logging.error("❗️ Key '%s' not found or empty in App Configuration", key)
         sys.exit(1)
-    return setting.value
+    return value or ""
 
 # ── JSON File Utilities ───────────────────────────────
 def load_and_replace(path: str, replacements: Dict[str, str]) -> Dict[str, Any]:
@@ -128,39 +141,167 @@ def validate_json_file(path: str) -> None:
         sys.exit(1)
 
 # ── Azure Authentication ──────────────────────────────
-def get_azure_credential() -> ChainedTokenCredential:
-    """Get Azure credential (Managed Identity preferred, fallback to CLI)."""
-    return ChainedTokenCredential(
-                AzureCliCredential(process_timeout=30),
-                ManagedIdentityCredential(process_timeout=30)
-            )
+def get_azure_credential() -> "CachedTokenCredential":
+    """Return the credential shared by the setup phases (Azure CLI, then Managed Identity)."""
+    return get_credential()
 
 # ── Key Vault Helper ─────────────────────────────────
 def add_ai_foundry_account_api_key_to_key_vault(
-    mgmt_client: CognitiveServicesManagementClient,
+    mgmt_client: "CognitiveServicesManagementClient",
     resource_group: str,
     account_name: str,
     vault_uri: str,
     secret_name: str
-) -> None:
-    """Fetches the AI Foundry Account API key and stores it in Azure Key Vault."""
+) -> bool:
+    """
+    Fetches the AI Foundry Account API key and stores it in Azure Key Vault when it changed (no new
+    secret version otherwise); returns False on failure.
+    """
     try:
         logging.info("🔑 Fetching AI Foundry Account API key for account %s ...", account_name)
-        keys = mgmt_client.accounts.list_keys(resource_group, account_name)
+        keys = get_retry_policy().call(
+            mgmt_client.accounts.list_keys, resource_group, account_name,
+            endpoint=ARM_ENDPOINT, label=f"Listing keys of {account_name}"
+        )
         api_key = keys.key1
         logging.info("🔒 Storing API key in Key Vault at %s ...", vault_uri)
+        from .keyvault import KeyVaultClient
         kv_client = KeyVaultClient(vault_uri)
-        kv_client.set_secret(secret_name, api_key)
-        logging.info("✅ Secret %s set successfully in Key Vault.", secret_name)
+        if kv_client.sync_secret(secret_name, api_key):
+            logging.info("✅ Secret %s set successfully in Key Vault.", secret_name)
+        return True
     except Exception as e:
         logging.error("❗️ Failed to set secret in Key Vault: %s", e)
+        return False
 
 # ── Blocklist Logic ──────────────────────────────────
-def configure_blocklist(client: CognitiveServicesManagementClient, resource_group: str, account_name: str, bl_def: Dict[str, Any], bl_name: str) -> None:
-    """Create or update the RAI blocklist and its items."""
+BlocklistKey = Tuple[str, bool]
+
+def blocklist_item_name(bl_name: str, key: BlocklistKey) -> str:
+    """Stable item name derived from (pattern, isRegex), so reordering the JSON does not rename items."""
+    pattern, is_regex = key
+    digest = hashlib.sha256(f"{int(is_regex)}|{pattern}".encode("utf-8")).hexdigest()[:16]
+    return f"{bl_name}Item{digest}"
+
+def desired_blocklist_items(bl_def: Dict[str, Any]) -> List[BlocklistKey]:
+    """(pattern, isRegex) of every non-empty item in the definition, deduplicated, in file order."""
+    keys: Dict[BlocklistKey, None] = {}
+    for idx, item in enumerate(bl_def.get("blocklistItems", [])):
+        pat = item.get("pattern", "") or ""
+        if not pat.strip():
+            logging.warning(f"⚠️ Skipping blocklist item {idx}: empty pattern")
+            continue
+        keys.setdefault((pat, bool(item.get("isRegex", False))), None)
+    return list(keys)
+
+def _chunks(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def _run_bounded(calls: List[Callable[[], Any]]) -> None:
+    """Run independent calls on a pool of at most BLOCKLIST_MAX_WORKERS threads; the first error is raised."""
+    if len(calls) == 1:
+        calls[0]()
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(BLOCKLIST_MAX_WORKERS, len(calls))), thread_name_prefix="blocklist") as pool:
+        for future in as_completed([pool.submit(call) for call in calls]):
+            future.result()
+
+def _batched(bl_name: str, verb: str, items: List[Any], batch: Callable[[List[Any]], None], single: Callable[[Any], None]) -> None:
+    """
+    Apply ``batch`` to chunks of BLOCKLIST_BATCH_SIZE items, the chunks concurrently. If the first
+    batch is not accepted (400/404/405), every item goes through ``single`` on the bounded pool instead.
+    """
+    chunks = _chunks(items, BLOCKLIST_BATCH_SIZE)
+    try:
+        batch(chunks[0])
+    except Exception as e:
+        if status_of(e) not in BATCH_FALLBACK_STATUS:
+            raise
+        logging.warning(f"⚠️ Batch {verb} on {bl_name} was not accepted ({e}); falling back to single calls.")
+        _run_bounded([lambda item=item: single(item) for item in items])
+        logging.info(f"{len(items)} single {verb} calls on {bl_name} with up to {BLOCKLIST_MAX_WORKERS} in flight")
+        return
+    if len(chunks) > 1:
+        _run_bounded([lambda chunk=chunk: batch(chunk) for chunk in chunks[1:]])
+
+def add_blocklist_items(client: "CognitiveServicesManagementClient", resource_group: str, account_name: str, bl_name: str, keys: List[BlocklistKey]) -> None:
+    """Add items with batch_add; fall back to concurrent single creates if batches are not accepted."""
+    from azure.mgmt.cognitiveservices.models import (
+        RaiBlocklistItem,
+        RaiBlocklistItemBulkRequest,
+        RaiBlocklistItemProperties
+    )
+    retry = get_retry_policy()
+
+    def batch(chunk: List[BlocklistKey]) -> None:
+        retry.call(
+            client.rai_blocklist_items.batch_add,
+            resource_group, account_name, bl_name,
+            [
+                RaiBlocklistItemBulkRequest(
+                    name=blocklist_item_name(bl_name, key),
+                    properties=RaiBlocklistItemProperties(pattern=key[0], is_regex=key[1]),
+                )
+                for key in chunk
+            ],
+            endpoint=ARM_ENDPOINT,
+            label=f"Adding {len(chunk)} items to {bl_name}",
+        )
+
+    def create(key: BlocklistKey) -> None:
+        retry.call(
+            client.rai_blocklist_items.create_or_update,
+            endpoint=ARM_ENDPOINT,
+            label=f"Adding blocklist item {blocklist_item_name(bl_name, key)}",
+            resource_group_name=resource_group,
+            account_name=account_name,
+            rai_blocklist_name=bl_name,
+            rai_blocklist_item_name=blocklist_item_name(bl_name, key),
+            rai_blocklist_item=RaiBlocklistItem(
+                properties=RaiBlocklistItemProperties(pattern=key[0], is_regex=key[1])
+            )
+        )
+
+    _batched(bl_name, "add", keys, batch, create)
+
+def remove_blocklist_items(client: "CognitiveServicesManagementClient", resource_group: str, account_name: str, bl_name: str, names: List[str]) -> None:
+    """Delete items with batch_delete; fall back to concurrent single deletes if batches are not accepted."""
+    retry = get_retry_policy()
+
+    def batch(chunk: List[str]) -> None:
+        retry.call(
+            client.rai_blocklist_items.batch_delete,
+            resource_group, account_name, bl_name, chunk,
+            endpoint=ARM_ENDPOINT,
+            label=f"Removing {len(chunk)} items from {bl_name}",
+        )
+
+    def delete(name: str) -> None:
+        retry.call(
+            lambda: client.rai_blocklist_items.begin_delete(resource_group, account_name, bl_name, name).result(),
+            endpoint=ARM_ENDPOINT,
+            label=f"Deleting blocklist item {name}",
+        )
+
+    _batched(bl_name, "delete", names, batch, delete)
+
+def configure_blocklist(client: "CognitiveServicesManagementClient", resource_group: str, account_name: str, bl_def: Dict[str, Any], bl_name: str) -> None:
+    """
+    Create or update the RAI blocklist and sync its items with the definition.
+
+    Items are compared on (pattern, isRegex): missing ones are added first and stale ones removed
+    afterwards, so the enforced blocklist is never weaker than either the old or the new version.
+    Items that are already present are left alone, whatever their name.
+    """
+    from azure.mgmt.cognitiveservices.models import RaiBlocklist, RaiBlocklistProperties
+    retry = get_retry_policy()
+    start = time.perf_counter()
     try:
         logging.info(f"📑 Creating/updating blocklist {bl_name} …")
-        client.rai_blocklists.create_or_update(
+        retry.call(
+            client.rai_blocklists.create_or_update,
+            endpoint=ARM_ENDPOINT,
+            label=f"Blocklist {bl_name}",
             resource_group_name=resource_group,
             account_name=account_name,
             rai_blocklist_name=bl_name,
@@ -170,103 +311,166 @@ def configure_blocklist(client: CognitiveServicesManagementClient, resource_grou
                 )
             )
         )
-        # Remove existing items
-        for existing in client.rai_blocklist_items.list(resource_group, account_name, bl_name):
-            logging.info(f"🗑️ Deleting blocklist item: {existing.name}")
-            client.rai_blocklist_items.delete(
-                resource_group_name=resource_group,
-                account_name=account_name,
-                rai_blocklist_name=bl_name,
-                rai_blocklist_item_name=existing.name
-            )
-        # Re-add items
-        for idx, item in enumerate(bl_def.get("blocklistItems", [])):
-            pat = item.get("pattern", "") or ""
-            if not pat.strip():
-                logging.warning(f"⚠️ Skipping blocklist item {idx}: empty pattern")
-                continue
-            item_name = f"{bl_name}Item{idx}"
-            logging.info(f"➕ Adding blocklist item {item_name} …")
-            client.rai_blocklist_items.create_or_update(
-                resource_group_name=resource_group,
-                account_name=account_name,
-                rai_blocklist_name=bl_name,
-                rai_blocklist_item_name=item_name,
-                rai_blocklist_item=RaiBlocklistItem(
-                    properties=RaiBlocklistItemProperties(
-                        pattern=pat,
-                        is_regex=item.get("isRegex", False)
-                    )
-                )
-            )
+        existing_items = retry.call(
+            lambda: list(client.rai_blocklist_items.list(resource_group, account_name, bl_name)),
+            endpoint=ARM_ENDPOINT,
+            label=f"Listing items of {bl_name}",
+        )
+        existing: Dict[BlocklistKey, str] = {}
+        stale: List[str] = []
+        for item in existing_items:
+            props = item.properties
+            key = (props.pattern or "", bool(props.is_regex)) if props else ("", False)
+            if key in existing:
+                stale.append(item.name)   # duplicate of an item already kept
+            else:
+                existing[key] = item.name
+
+        desired = desired_blocklist_items(bl_def)
+        to_add = [key for key in desired if key not in existing]
+        desired_set = set(desired)
+        stale += [name for key, name in existing.items() if key not in desired_set]
+
+        if to_add:
+            logging.info(f"➕ Adding {len(to_add)} blocklist items to {bl_name} …")
+            add_blocklist_items(client, resource_group, account_name, bl_name, to_add)
+        if stale:
+            logging.info(f"🗑️ Removing {len(stale)} stale blocklist items from {bl_name} …")
+            remove_blocklist_items(client, resource_group, account_name, bl_name, stale)
+        logging.info(
+            f"📊 Blocklist {bl_name}: {len(to_add)} added, {len(stale)} removed, "
+            f"{len(desired) - len(to_add)} unchanged ({time.perf_counter() - start:.1f}s)"
+        )
     except Exception as e:
         logging.error(f"❗️ Blocklist configuration failed: {e}")
         sys.exit(1)
 
 # ── Policy Logic ─────────────────────────────────────
-def configure_policy(client: CognitiveServicesManagementClient, resource_group: str, account_name: str, pol_def: Dict[str, Any], bl_name: str, policy_name: str) -> str:
-    """Create or update the RAI policy and return its name."""
+def normalize_policy_properties(props: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn the policy JSON into the REST shape (customBlocklists with sources, capitalized enums)."""
+    prompt_bl = props.pop("promptBlocklists", [])
+    comp_bl = props.pop("completionBlocklists", [])
+    for x in prompt_bl: x["source"] = "Prompt"
+    for x in comp_bl: x["source"] = "Completion"
+    props["customBlocklists"] = prompt_bl + comp_bl
+    # Normalize casing
+    for f in props.get("contentFilters", []):
+        if "allowedContentLevel" in f:
+            lvl = f.pop("allowedContentLevel")
+            f["severityThreshold"] = lvl.capitalize()
+        if "source" in f:
+            f["source"] = f["source"].capitalize()
+    if "mode" in props:
+        props["mode"] = props["mode"].capitalize()
+    return props
+
+def matches_live(desired: Any, live: Any) -> bool:
+    """
+    True when every value in ``desired`` is present in ``live``. Fields only the service sets are
+    ignored, strings compare case-insensitively (ARM enums), and lists compare regardless of order.
+    """
+    if isinstance(desired, dict):
+        return isinstance(live, dict) and all(matches_live(v, live.get(k)) for k, v in desired.items())
+    if isinstance(desired, list):
+        if not isinstance(live, list) or len(desired) != len(live):
+            return False
+        remaining = list(live)
+        for item in desired:
+            match = next((i for i, candidate in enumerate(remaining) if matches_live(item, candidate)), None)
+            if match is None:
+                return False
+            remaining.pop(match)
+        return True
+    if isinstance(desired, str) and isinstance(live, str):
+        return desired.casefold() == live.casefold()
+    return desired == live
+
+def configure_policy(client: "CognitiveServicesManagementClient", resource_group: str, account_name: str, pol_def: Dict[str, Any], bl_name: str, policy_name: str) -> Tuple[str, bool]:
+    """Create or update the RAI policy when it differs from the live one; returns (name, updated)."""
     try:
         p_name = pol_def.get("name")
         if not p_name:
             logging.error("❗️ Policy JSON must have top-level 'name'.")
             sys.exit(1)
-        props = pol_def["properties"]
-        prompt_bl = props.pop("promptBlocklists", [])
-        comp_bl = props.pop("completionBlocklists", [])
-        for x in prompt_bl: x["source"] = "Prompt"
-        for x in comp_bl: x["source"] = "Completion"
-        props["customBlocklists"] = prompt_bl + comp_bl
-        # Normalize casing
-        for f in props.get("contentFilters", []):
-            if "allowedContentLevel" in f:
-                lvl = f.pop("allowedContentLevel")
-                f["severityThreshold"] = lvl.capitalize()
-            if "source" in f:
-                f["source"] = f["source"].capitalize()
-        if "mode" in props:
-            props["mode"] = props["mode"].capitalize()
-        logging.info(f"📑 Creating/updating policy {p_name} …")
-        client.rai_policies.create_or_update(
+        props = normalize_policy_properties(pol_def["properties"])
+        retry = get_retry_policy()
+        try:
+            live = retry.call(
+                client.rai_policies.get, resource_group, account_name, p_name,
+                endpoint=ARM_ENDPOINT, label=f"Reading policy {p_name}"
+            )
+        except Exception as e:
+            if status_of(e) != 404:
+                raise
+            live = None
+        if live is not None and live.properties is not None and matches_live(props, live.properties.serialize(keep_readonly=True)):
+            logging.info(f"⏭️ Policy {p_name} is already up to date; skipping update.")
+            return p_name, False
+        logging.info(f"📑 {'Updating' if live is not None else 'Creating'} policy {p_name} …")
+        retry.call(
+            client.rai_policies.create_or_update,
+            endpoint=ARM_ENDPOINT,
+            label=f"Policy {p_name}",
             resource_group_name=resource_group,
             account_name=account_name,
             rai_policy_name=p_name,
             rai_policy={"properties": props}
         )
-        return p_name
+        return p_name, True
     except Exception as e:
         logging.error(f"❗️ Policy configuration failed: {e}")
         sys.exit(1)
 
 # ── Deployment Association ───────────────────────────
-def associate_policy_to_deployment(client: CognitiveServicesManagementClient, resource_group: str, account_name: str, deployment_name: str, policy_name: str) -> None:
-    """Associate the RAI policy to the deployment."""
+def associate_policy_to_deployment(client: "CognitiveServicesManagementClient", resource_group: str, account_name: str, deployment_name: str, policy_name: str) -> bool:
+    """
+    Associate the RAI policy to the deployment; returns False when it already was.
+    The PUT carries only the deployment's writable fields (sku, model, scale/capacity settings, …) with
+    the new raiPolicyName, not the read-only state echoed by the GET.
+    """
     try:
-        logging.info(f"🔗 Associating policy {policy_name} with deployment {deployment_name} …")
-        existing = client.deployments.get(resource_group, account_name, deployment_name)
-        dep_dict = existing.as_dict()
-        dep_dict["properties"]["raiPolicyName"] = policy_name
-        client.deployments.begin_create_or_update(
-            resource_group_name=resource_group,
-            account_name=account_name,
-            deployment_name=deployment_name,
-            deployment=dep_dict
-        ).result()
+        retry = get_retry_policy()
+        existing = retry.call(
+            client.deployments.get, resource_group, account_name, deployment_name,
+            endpoint=ARM_ENDPOINT, label=f"Reading deployment {deployment_name}"
+        )
+        current = existing.properties.rai_policy_name if existing.properties else None
+        if current == policy_name:
+            logging.info(f"⏭️ Deployment {deployment_name} already uses policy {policy_name}; skipping update.")
+            return False
+        logging.info(f"🔗 Associating policy {policy_name} with deployment {deployment_name} (was {current or 'none'}) …")
+        body = existing.serialize()   # writable fields only
+        body.setdefault("properties", {})["raiPolicyName"] = policy_name
+        retry.call(
+            lambda: client.deployments.begin_create_or_update(
+                resource_group_name=resource_group,
+                account_name=account_name,
+                deployment_name=deployment_name,
+                deployment=body
+            ).result(),
+            endpoint=ARM_ENDPOINT,
+            label=f"Updating deployment {deployment_name}",
+        )
+        return True
     except Exception as e:
         logging.error(f"❗️ Failed to associate policy to deployment: {e}")
         sys.exit(1)
 
 # ── Main Logic ───────────────────────────────────────
-def main() -> None:
-    configure_logging()
+def run(credential: Optional["CachedTokenCredential"] = None) -> None:
+    """
+    Configure the RAI blocklist and policy and store the API key; exits on fatal errors.
+    The work runs as dependent tasks on a bounded pool (config/aifoundry/tasks.py) and ends with a
+    per-task timing breakdown.
+    """
     check_env()
     validate_json_file(RAI_POLICIES_JSON_FILE)
     validate_json_file(RAI_BLOCKLIST_JSON_FILE)
     endpoint = os.environ["APP_CONFIG_ENDPOINT"]
-    cred = get_azure_credential()
+    cred = credential or get_azure_credential()
     # Removed explicit token test - let Azure SDK handle authentication lazily
-    # The token will be obtained when actually needed by the App Configuration client
-    app_conf = AzureAppConfigurationClient(endpoint, cred)
+    # The token will be obtained when the App Configuration label is first listed
+    app_conf = get_snapshot(endpoint, cred)
     subscription_id = cfg(app_conf, "SUBSCRIPTION_ID")
     resource_group = cfg(app_conf, "AZURE_RESOURCE_GROUP")
     account_name = cfg(app_conf, "AI_FOUNDRY_ACCOUNT_NAME")
@@ -291,8 +495,10 @@ def main() -> None:
         )
         sys.exit(1)
     logging.info(f"Selected deployment: {deployment_name} (canonical_name={CANONICAL_DEPLOYMENT_NAME})")
-    client = CognitiveServicesManagementClient(cred, subscription_id)
-    # Blocklist
+    from azure.mgmt.cognitiveservices import CognitiveServicesManagementClient
+    # Retries are left to the shared policy (config/retry.py) instead of the SDK's own.
+    client = CognitiveServicesManagementClient(cred, subscription_id, transport=get_transport(), retry_total=0)
+    # Definitions are loaded up front, so invalid files fail before any task starts.
     bl_def = load_and_replace(
         RAI_BLOCKLIST_JSON_FILE,
         {"{{BlocklistName}}": BLOCKLIST_NAME}
@@ -301,8 +507,6 @@ def main() -> None:
     if not bl_name:
         logging.error("❗️ Blocklist JSON must have top-level 'name' or 'blocklistname'.")
         sys.exit(1)
-    configure_blocklist(client, resource_group, account_name, bl_def, bl_name)
-    # Policy
     pol_def = load_and_replace(
         RAI_POLICIES_JSON_FILE,
         {
@@ -310,20 +514,45 @@ def main() -> None:
             "{{BlocklistName}}": bl_name
         }
     )
-    p_name = configure_policy(client, resource_group, account_name, pol_def, bl_name, POLICY_NAME)
-    # Associate policy to deployment
-    associate_policy_to_deployment(client, resource_group, account_name, deployment_name, p_name)
-    # Store API key in Key Vault
-    logging.info("🔑 Adding AI Foundry Account API Key to Key Vault …")
     key_vault_uri = cfg(app_conf, "KEY_VAULT_URI")
-    add_ai_foundry_account_api_key_to_key_vault(
-        client,
-        resource_group,
-        account_name,
-        key_vault_uri,
-        SECRET_NAME
+
+    # ── Tasks: the RAI chain (blocklist → policy → deployment) and the Key Vault path run side by side ──
+    def store_api_key(_):
+        logging.info("🔑 Adding AI Foundry Account API Key to Key Vault …")
+        if not add_ai_foundry_account_api_key_to_key_vault(client, resource_group, account_name, key_vault_uri, SECRET_NAME):
+            raise RuntimeError(f"secret {SECRET_NAME} was not stored")
+
+    tasks = [
+        Task("blocklist", lambda _: configure_blocklist(client, resource_group, account_name, bl_def, bl_name)),
+        Task("policy", lambda _: configure_policy(client, resource_group, account_name, pol_def, bl_name, POLICY_NAME), ("blocklist",)),
+        Task("deployment", lambda values: associate_policy_to_deployment(client, resource_group, account_name, deployment_name, values["policy"][0]), ("policy",)),
+        Task("key-vault", store_api_key, critical=False),
+    ]
+    start = time.perf_counter()
+    results = run_tasks(tasks, MAX_WORKERS)
+    log_timings(results, time.perf_counter() - start)
+
+    # Only completed tasks tell whether their update was needed; failed or skipped ones are reported apart.
+    updated = {}
+    if results["policy"].ok:
+        updated["policy"] = results["policy"].value[1]
+    if results["deployment"].ok:
+        updated["deployment"] = results["deployment"].value
+    skipped = sum(1 for changed in updated.values() if not changed)
+    not_done = [name for name in ("policy", "deployment") if name not in updated]
+    logging.info(
+        f"⏭️ Skipped {skipped} of {len(updated)} completed policy/deployment updates that would not change anything"
+        + (f" ({', '.join(not_done)} failed or did not run)." if not_done else ".")
     )
+    failed = [task.name for task in tasks if task.critical and not results[task.name].ok]
+    if failed:
+        logging.error(f"❗️ AI Foundry setup failed: {', '.join(failed)}")
+        sys.exit(1)
     logging.info("✅ RAI blocklist, policy, deployment association, and secret injection complete.")
 
+def main() -> None:
+    configure_logging()
+    run()
+
 if __name__ == "__main__":
     main()
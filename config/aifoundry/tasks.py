@@ -0,0 +1,88 @@
+"""
+Task runner for the AI Foundry setup.
+
+The setup is declared as named tasks with dependencies (blocklist → policy → deployment, and the
+API key → Key Vault path beside them). ``run_tasks`` starts every task on a bounded thread pool as
+soon as its dependencies have succeeded, so independent ARM calls overlap instead of waiting on
+each other. A task fails when it raises or exits non-zero; a task whose dependency failed is skipped
+and reported as failed. Each task's return value is passed to the tasks that run after it, and its
+duration is recorded for the timing breakdown.
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+
+class Task(NamedTuple):
+    name: str
+    run: Callable[[Dict[str, Any]], Any]   # receives the values of the finished tasks
+    depends_on: Tuple[str, ...] = ()
+    critical: bool = True                  # a failed non-critical task does not fail the phase
+
+
+class TaskResult(NamedTuple):
+    name: str
+    ok: bool
+    seconds: float
+    detail: str
+    value: Any = None
+
+
+def _execute(task: Task, values: Dict[str, Any]) -> TaskResult:
+    start = time.perf_counter()
+    try:
+        value, ok, detail = task.run(values), True, ""
+    except SystemExit as e:
+        value, ok, detail = None, e.code in (None, 0), f"exited with status {e.code}"
+    except Exception as e:
+        logging.error(f"❗️ Task {task.name} failed: {e}", exc_info=True)
+        value, ok, detail = None, False, str(e)
+    return TaskResult(task.name, ok, time.perf_counter() - start, detail if not ok else "", value)
+
+
+def run_tasks(tasks: List[Task], max_workers: int) -> Dict[str, TaskResult]:
+    """Run ``tasks`` on at most ``max_workers`` threads, each once its dependencies succeeded."""
+    by_name = {task.name: task for task in tasks}
+    unknown = {dep for task in tasks for dep in task.depends_on} - set(by_name)
+    if unknown:
+        raise ValueError(f"unknown task dependencies: {', '.join(sorted(unknown))}")
+
+    results: Dict[str, TaskResult] = {}
+    values: Dict[str, Any] = {}
+    pending = dict(by_name)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="aifoundry") as pool:
+        running = {}
+        while pending or running:
+            for name, task in list(pending.items()):
+                if any(dep not in results for dep in task.depends_on):
+                    continue
+                del pending[name]
+                failed = [dep for dep in task.depends_on if not results[dep].ok]
+                if failed:
+                    logging.warning(f"⏭️ Skipping task {name}: dependency {failed[0]} failed")
+                    results[name] = TaskResult(name, False, 0.0, f"dependency {failed[0]} failed")
+                    continue
+                running[pool.submit(_execute, task, dict(values))] = name
+            if not running:
+                if pending:
+                    raise ValueError(f"dependency cycle between tasks: {', '.join(sorted(pending))}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                del running[future]
+                results[result.name] = result
+                values[result.name] = result.value
+    return {task.name: results[task.name] for task in tasks}
+
+
+def log_timings(results: Dict[str, TaskResult], total: float) -> None:
+    logging.info("=" * 60)
+    for result in results.values():
+        status = "✅ ok" if result.ok else f"❗️ failed ({result.detail})"
+        logging.info(f"⏱️ {result.name:<12} {result.seconds:7.1f}s  {status}")
+    busy = sum(result.seconds for result in results.values())
+    logging.info(f"⏱️ {'total':<12} {total:7.1f}s  ({busy:.1f}s of task time)")
+    logging.info("=" * 60)
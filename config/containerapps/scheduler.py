@@ -0,0 +1,155 @@
+"""
+Scheduling helpers for the Container Apps registry updates.
+
+- ``ArmWriteLimiter``: thread-safe adaptive concurrency (AIMD) for ARM writes. It starts at the
+  number of apps (capped by CONTAINER_APP_MAX_WORKERS), halves after a 429 or when the
+  ``x-ms-ratelimit-remaining-subscription-writes`` header runs low, and grows back by one slot
+  after a run of successful writes.
+- ``ArmThrottleObserver``: a response hook for the management client that feeds every write
+  response to the limiter. The client is built with SDK retries disabled; retries come from the
+  shared RetryPolicy (config/retry.py), so each retried attempt is a separate response here.
+- ``wait_for_provisioning``: the updates are started without an SDK poller per app; a single
+  thread then watches all of them with one listing per round (the same listing setup.py plans
+  from) until every app leaves the in-progress states, so waiting costs one request per interval
+  for any number of apps and the run takes about as long as the slowest update.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, NamedTuple, Optional
+
+REMAINING_WRITES_HEADER = "x-ms-ratelimit-remaining-subscription-writes"
+WRITE_METHODS = {"PUT", "PATCH", "POST", "DELETE"}
+DEFAULT_LOW_WATER_WRITES = 100
+IN_PROGRESS_STATES = {"inprogress", "updating", "creating", "accepted", "provisioning", "deleting"}
+FAILED_STATES = {"failed", "canceled", "cancelled"}
+
+
+class ArmWriteLimiter:
+    """Concurrency limit for ARM writes that shrinks on throttling and recovers after successes."""
+
+    def __init__(self, maximum: int, minimum: int = 1, increase_after: int = 3, low_water: int = DEFAULT_LOW_WATER_WRITES):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = self.maximum
+        self.increase_after = increase_after
+        self.low_water = low_water
+        self.throttled = 0
+        self.remaining_writes: Optional[int] = None
+        self._in_flight = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self) -> "ArmWriteLimiter":
+        with self._condition:
+            self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def record_success(self) -> None:
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.increase_after and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+                logging.debug(f"Container Apps write concurrency raised to {self.limit}")
+                self._condition.notify_all()
+
+    def record_throttle(self, reason: str) -> None:
+        with self._condition:
+            self.throttled += 1
+            self._reduce(reason)
+
+    def observe_remaining_writes(self, remaining: int) -> None:
+        with self._condition:
+            self.remaining_writes = remaining
+            if remaining <= self.low_water:
+                self._reduce(f"{remaining} subscription writes left")
+
+    def _reduce(self, reason: str) -> None:
+        self._successes = 0
+        reduced = max(self.minimum, self.limit // 2)
+        if reduced < self.limit:
+            logging.warning(f"⚠️ ARM throttling ({reason}); Container Apps write concurrency reduced {self.limit} -> {reduced}")
+            self.limit = reduced
+
+
+class ArmThrottleObserver:
+    """
+    ``raw_response_hook`` for the management client: reports 429s and the remaining-writes header
+    of every ARM write response to a limiter, including attempts retried by the shared RetryPolicy.
+    """
+
+    def __init__(self, limiter: ArmWriteLimiter):
+        self.limiter = limiter
+
+    def __call__(self, pipeline_response) -> None:
+        http_request = pipeline_response.http_request
+        http_response = pipeline_response.http_response
+        if http_request.method.upper() not in WRITE_METHODS:
+            return
+        if http_response.status_code == 429:
+            self.limiter.record_throttle("429 Too Many Requests")
+            return
+        remaining = http_response.headers.get(REMAINING_WRITES_HEADER)
+        if remaining:
+            try:
+                self.limiter.observe_remaining_writes(int(remaining))
+            except ValueError:
+                pass
+
+
+class ProvisioningResult(NamedTuple):
+    ok: bool
+    state: str
+    app: object
+
+
+def wait_for_provisioning(
+    list_apps: Callable[[], Dict[str, object]],
+    names: Iterable[str],
+    timeout: float,
+    interval: float,
+    on_done: Optional[Callable[[str, ProvisioningResult], None]] = None,
+) -> Dict[str, ProvisioningResult]:
+    """
+    Poll ``list_apps()`` (one listing returning ``{name: app}``) until every app in ``names`` has
+    left the in-progress states or ``timeout`` seconds have passed. Apps still in progress at the
+    deadline are returned with state "Timeout".
+    """
+    pending = set(names)
+    results: Dict[str, ProvisioningResult] = {}
+    deadline = time.monotonic() + timeout
+    while pending:
+        try:
+            apps = list_apps()
+        except Exception as e:
+            logging.warning(f"⚠️ Listing Container Apps to check provisioning failed: {e}")
+            apps = {}
+        for name in sorted(pending):
+            app = apps.get(name)
+            state = str(getattr(app, "provisioning_state", "") or "") if app is not None else ""
+            if not state or state.lower() in IN_PROGRESS_STATES:
+                continue
+            result = ProvisioningResult(state.lower() not in FAILED_STATES, state, app)
+            results[name] = result
+            pending.discard(name)
+            if on_done:
+                on_done(name, result)
+        if not pending:
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            for name in sorted(pending):
+                results[name] = ProvisioningResult(False, "Timeout", None)
+                if on_done:
+                    on_done(name, results[name])
+            break
+        time.sleep(min(interval, remaining))
+    return results
@@ -15,9 +15,17 @@ Prerequisites:
 - Azure CLI or Managed Identity authentication must be available.
 
 This script will:
-- Read container app definitions from Azure App Configuration.
-- For each app, associate the specified Azure Container Registry (ACR) using either system-assigned or user-assigned identity.
-- Update the registry configuration for each Container App in Azure (parallelized).
+- Read container app definitions from Azure App Configuration (one listing of the gpt-rag label, see config/snapshot.py).
+- Load the current state of every app with one listing (list_by_resource_group, or one subscription-wide
+  listing when entries name several resource groups) and check identities and registries in memory, so a
+  run with nothing to change costs a single ARM round-trip.
+- For each app that needs it, associate the specified Azure Container Registry (ACR) using either system-assigned or user-assigned identity.
+- Update the registry configuration for each Container App in Azure with a minimal PATCH of
+  configuration.registries (merged with the existing registries, guarded by the app's ETag), so the
+  template is not resent and registry association does not roll the running revision; the result of each
+  app says whether a new revision was created. The writes run concurrently, as many
+  as there are apps (capped by CONTAINER_APP_MAX_WORKERS), and back off when ARM throttles; the
+  provisioning of all updates is then watched by one thread (see scheduler.py).
 """
 
 import os
@@ -27,17 +35,21 @@ import logging
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from azure.identity import (
-    ManagedIdentityCredential,
-    AzureCliCredential,
-    ChainedTokenCredential
+from ..retry import ARM_ENDPOINT, get_retry_policy
+from ..runtime import get_credential, get_transport
+from ..snapshot import get_snapshot
+from .scheduler import (
+    FAILED_STATES,
+    IN_PROGRESS_STATES,
+    ArmThrottleObserver,
+    ArmWriteLimiter,
+    wait_for_provisioning,
 )
-from azure.appconfiguration import AzureAppConfigurationClient
-from azure.mgmt.appcontainers import ContainerAppsAPIClient
 
 
 POLL_TIMEOUT_SECONDS = int(os.getenv("CONTAINER_APP_POLL_TIMEOUT_SECONDS", "600"))
-MAX_WORKERS = int(os.getenv("CONTAINER_APP_MAX_WORKERS", "2"))   
+POLL_INTERVAL_SECONDS = float(os.getenv("CONTAINER_APP_POLL_INTERVAL_SECONDS", "5"))
+MAX_WORKERS = int(os.getenv("CONTAINER_APP_MAX_WORKERS", "8"))   # upper bound; ARM throttling lowers it
 
 def _get_desired_identity(app, app_name, use_uai):
     """Return the identity string/resource id we expect to use for registry auth."""
@@ -109,18 +121,14 @@ def configure_logging():
 
 
 def get_credentials():
-    """Return a ChainedTokenCredential for Azure authentication (CLI → ManagedIdentity)."""
+    """Return the shared ChainedTokenCredential (CLI → ManagedIdentity), validated with a management token."""
     logging.info("🔐 Creating ChainedTokenCredential (CLI → ManagedIdentity)...")
     
     try:
-        # Create chained credential with CLI first, then Managed Identity
-        credential = ChainedTokenCredential(
-            AzureCliCredential(process_timeout=30),
-            ManagedIdentityCredential(process_timeout=30)
-        )
+        credential = get_credential()
 
         # Test the credential
-        token = credential.get_token("https://management.azure.com/.default")
+        credential.get_token("https://management.azure.com/.default")
         logging.info("✅ ChainedTokenCredential validated successfully")
         return credential
         
@@ -129,102 +137,194 @@ def get_credentials():
         sys.exit(1)
 
 
-def get_config_value(appconfig, key, required=True, max_retries=3):
-    logging.debug(f"Fetching config value for key='{key}', label='gpt-rag'")
-    
-    for attempt in range(max_retries):
-        try:
-            setting = appconfig.get_configuration_setting(key=key, label="gpt-rag")
-            value = setting.value
-            
-            # Mask sensitive values in logs
-            if any(sensitive in key.upper() for sensitive in ["PASSWORD", "SECRET", "KEY", "TOKEN"]):
-                logging.debug(f"  Retrieved '{key}' = <masked>")
-            else:
-                logging.debug(f"  Retrieved '{key}' = '{value}'")
-            
-            return value
-        except Exception as e:
-            if attempt == max_retries - 1:
-                logging.error(f"Failed to fetch '{key}' after {max_retries} attempts: {e}")
-                if required:
-                    sys.exit(1)
-                return None
-            else:
-                logging.warning(f"Attempt {attempt + 1}/{max_retries} failed for '{key}': {e}. Retrying...")
-                time.sleep(2)
-
+def get_config_value(snapshot, key, required=True):
+    """Read a key of the 'gpt-rag' label from the shared App Config snapshot (listed once, retried on failure)."""
+    logging.debug(f"Fetching config value for key='{key}', label='{snapshot.label}'")
 
-def update_single_container_app(subscription_id, resource_group, name, acr_server, use_uai, shared_credential):
-    """Update a single container app registry configuration."""
-    start_time = time.time()
-    logging.info(f"[{name}] Starting Container App update process")
-    logging.debug(f"[{name}] Parameters: subscription={subscription_id}, rg={resource_group}, acr={acr_server}")
-    
     try:
-        # Use the shared credential instead of creating a new one for each thread
-        client = ContainerAppsAPIClient(shared_credential, subscription_id)
-        
-        logging.info(f"[{name}] Associating ACR '{acr_server}'...")
-        
-        # Get current app configuration
-        logging.debug(f"[{name}] Fetching current Container App configuration")
-        app = client.container_apps.get(resource_group, name)
-        logging.debug(f"[{name}] Current provisioning state: {app.provisioning_state}")
-        
-        # Check identity
-        desired_identity = _get_desired_identity(app, name, use_uai)
+        value = snapshot.get(key)
+    except Exception as e:
+        logging.error(f"Failed to load App Configuration label '{snapshot.label}': {e}")
+        if required:
+            sys.exit(1)
+        return None
+
+    if value is None:
+        if required:
+            logging.error(f"Key '{key}' not found in App Configuration (label: {snapshot.label})")
+            sys.exit(1)
+        return None
+
+    # Mask sensitive values in logs
+    if any(sensitive in key.upper() for sensitive in ["PASSWORD", "SECRET", "KEY", "TOKEN"]):
+        logging.debug(f"  Retrieved '{key}' = <masked>")
+    else:
+        logging.debug(f"  Retrieved '{key}' = '{value}'")
+
+    return value
+
+
+def resource_group_of(resource_id):
+    """Return the resource group segment of an ARM resource id, or None."""
+    parts = (resource_id or "").split("/")
+    for idx, part in enumerate(parts[:-1]):
+        if part.lower() == "resourcegroups":
+            return parts[idx + 1]
+    return None
+
+
+def list_container_apps(client, resource_groups):
+    """
+    Load every Container App of ``resource_groups`` in one listing: list_by_resource_group for a
+    single group, otherwise one subscription-wide listing filtered in memory.
+    Returns {(resource group, name): app}, lowercased.
+    """
+    groups = {rg.lower() for rg in resource_groups}
+    if len(groups) == 1:
+        listing = client.container_apps.list_by_resource_group(next(iter(resource_groups)))
+    else:
+        listing = client.container_apps.list_by_subscription()
+
+    apps = {}
+    for app in listing:
+        rg = (resource_group_of(app.id) or "").lower()
+        if rg in groups:
+            apps[(rg, app.name.lower())] = app
+    return apps
+
+
+def plan_container_app_updates(apps, targets, acr_server, use_uai):
+    """
+    Decide in memory which apps need a registry update.
+    ``targets`` is [(label, resource group, name)]; returns (updates, results) where updates is
+    [(label, resource group, app, desired identity)] and results holds the apps already settled.
+    """
+    updates, results = [], []
+    for label, resource_group, name in targets:
+        app = apps.get((resource_group.lower(), name.lower()))
+        if app is None:
+            logging.error(f"[{label}] Container App not found in resource group '{resource_group}'")
+            results.append((label, False, "Not found"))
+            continue
+
+        logging.debug(f"[{label}] Current provisioning state: {app.provisioning_state}")
+        desired_identity = _get_desired_identity(app, label, use_uai)
         if not desired_identity:
-            elapsed = time.time() - start_time
-            logging.error(f"[{name}] Failed: No desired identity found (elapsed: {elapsed:.2f}s)")
-            return name, False, "No desired identity found"
+            logging.error(f"[{label}] Failed: No desired identity found")
+            results.append((label, False, "No desired identity found"))
+            continue
 
-        # Check if already configured
-        logging.debug(f"[{name}] Checking if registry is already configured")
         if _registry_matches(app, acr_server, desired_identity):
-            elapsed = time.time() - start_time
-            logging.info(f"[{name}] ✓ Registry already configured, skipping update (elapsed: {elapsed:.2f}s)")
-            return name, True, "Already configured"
-
-        # Update registry configuration
-        logging.info(f"[{name}] Updating registry configuration with identity: {desired_identity}")
-        app.configuration.registries = [
-            {"server": acr_server, "identity": desired_identity}
-        ]
-        
-        logging.debug(f"[{name}] Starting create_or_update operation (timeout={POLL_TIMEOUT_SECONDS}s)")
-        poller = client.container_apps.begin_create_or_update(resource_group, name, app)
-        
-        try:
-            logging.debug(f"[{name}] Waiting for operation to complete...")
-            result = poller.result(timeout=POLL_TIMEOUT_SECONDS)
-            elapsed = time.time() - start_time
-            
-            logging.info(f"[{name}] ✅ Successfully updated! (elapsed: {elapsed:.2f}s)")
-            logging.debug(f"[{name}] Final provisioning state: {result.provisioning_state}")
-            return name, True, "Success"
-            
-        except Exception as exc:
-            message = str(exc).lower()
-            elapsed = time.time() - start_time
-            
-            if "timeout" in message or "did not complete" in message:
-                logging.warning(
-                    f"[{name}] ⏱️ Operation timed out after {POLL_TIMEOUT_SECONDS}s (total elapsed: {elapsed:.2f}s)"
-                )
-                return name, False, "Timeout"
-            
-            logging.error(f"[{name}] Operation failed: {exc} (elapsed: {elapsed:.2f}s)")
-            raise
+            logging.info(f"[{label}] ✓ Registry already configured, skipping update")
+            results.append((label, True, "Already configured"))
+            continue
+
+        updates.append((label, resource_group, app, desired_identity))
+    return updates, results
+
+
+def _registry_entry(reg):
+    """Registry as the camelCase dict the REST API expects."""
+    if isinstance(reg, dict):
+        return dict(reg)
+    return reg.serialize()
+
+
+def merge_registries(app, server, desired_identity):
+    """The app's registries with ``server`` added (or its credentials switched to the identity); others are kept."""
+    merged, found = [], False
+    for reg in getattr(app.configuration, "registries", None) or []:
+        entry = _registry_entry(reg)
+        if entry.get("server") == server:
+            if found:
+                continue
+            entry, found = {"server": server, "identity": desired_identity}, True
+        merged.append(entry)
+    if not found:
+        merged.append({"server": server, "identity": desired_identity})
+    return merged
+
+
+def _etag(app):
+    # The ContainerApp model has no etag attribute; the service's value lands in additional_properties.
+    return (getattr(app, "additional_properties", None) or {}).get("etag")
+
+
+def start_container_app_update(client, limiter, label, resource_group, app, desired_identity, acr_server):
+    """
+    Start the registry update of one planned app without waiting for it.
+
+    Sends a JSON merge PATCH of configuration.registries only (merged with the existing registries),
+    guarded by If-Match when the app has an ETag, so the template and the running revision are left
+    alone. A 412 (the app changed since it was listed) re-reads the app and retries once.
+    Returns (label, success, message); success is None while the update is still provisioning.
+    """
+    start_time = time.time()
+    name = app.name
+    retry = get_retry_policy()
+
+    try:
+        for attempt in range(2):
+            merged = merge_registries(app, acr_server, desired_identity)
+            etag = _etag(app)
+            body = {"properties": {"configuration": {"registries": merged}}}
+            headers = {"If-Match": etag} if etag else {}
+            logging.info(f"[{label}] Associating ACR '{acr_server}' with identity: {desired_identity} "
+                         f"({len(merged)} registr{'y' if len(merged) == 1 else 'ies'}{', If-Match' if etag else ''})")
+
+            def patch():
+                # Only the write holds a limiter slot (not the backoff between retries);
+                # completion is watched for all apps at once by run().
+                with limiter:
+                    logging.debug(f"[{label}] Starting update (PATCH) operation (write concurrency: {limiter.limit})")
+                    return client.container_apps.begin_update(
+                        resource_group,
+                        name,
+                        json.dumps(body).encode("utf-8"),
+                        content_type="application/json",
+                        headers=headers,
+                        polling=False,
+                    ).result()
+
+            try:
+                result = retry.call(patch, endpoint=ARM_ENDPOINT, label=f"[{label}] Registry update")
+                break
+            except Exception as e:
+                if getattr(e, "status_code", None) != 412 or attempt:
+                    raise
+                logging.warning(f"[{label}] 🔄 App changed since it was listed (412); re-reading it")
+                app = retry.call(client.container_apps.get, resource_group, name, endpoint=ARM_ENDPOINT, label=f"[{label}] Read")
+                if _registry_matches(app, acr_server, desired_identity):
+                    logging.info(f"[{label}] ✓ Registry configured concurrently, skipping update")
+                    return label, True, "Already configured"
+        limiter.record_success()
+
+        state = str(getattr(result, "provisioning_state", "") or "")
+        elapsed = time.time() - start_time
+        if state.lower() in IN_PROGRESS_STATES or not state:
+            logging.info(f"[{label}] 🔄 Update accepted, provisioning (elapsed: {elapsed:.2f}s)")
+            return label, None, "InProgress"
+        if state.lower() in FAILED_STATES:
+            logging.error(f"[{label}] Operation failed: provisioning state {state} (elapsed: {elapsed:.2f}s)")
+            return label, False, f"Provisioning {state}"
+        message = revision_message(app.latest_revision_name, result.latest_revision_name)
+        logging.info(f"[{label}] ✅ Successfully updated, {message}! (elapsed: {elapsed:.2f}s)")
+        return label, True, f"Success, {message}"
             
     except Exception as e:
         elapsed = time.time() - start_time
-        logging.error(f"[{name}] ❌ Unexpected error: {e} (elapsed: {elapsed:.2f}s)", exc_info=True)
-        return name, False, str(e)
+        logging.error(f"[{label}] ❌ Unexpected error: {e} (elapsed: {elapsed:.2f}s)", exc_info=True)
+        return label, False, str(e)
 
 
-def main():
-    configure_logging()
+def revision_message(before, after):
+    if after and after != before:
+        return f"new revision {after}"
+    return "no new revision"
+
+
+def run(shared_credential=None):
+    """Associate every Container App with the registry; returns True when all apps succeeded."""
     overall_start = time.time()
 
     logging.info("="*60)
@@ -238,13 +338,14 @@ def main():
     
     logging.info(f"App Configuration Endpoint: {endpoint}")
     logging.info(f"Max Workers: {MAX_WORKERS}")
-    logging.info(f"Poll Timeout: {POLL_TIMEOUT_SECONDS}s")
+    logging.info(f"Poll Timeout: {POLL_TIMEOUT_SECONDS}s (interval {POLL_INTERVAL_SECONDS}s)")
 
     # Create and test credentials once
-    logging.debug("Creating and testing shared credential")
-    shared_credential = get_credentials()
+    if shared_credential is None:
+        logging.debug("Creating and testing shared credential")
+        shared_credential = get_credentials()
     
-    appconfig = AzureAppConfigurationClient(endpoint, shared_credential)
+    appconfig = get_snapshot(endpoint, shared_credential)
 
     # Read global settings
     logging.info("Fetching configuration from App Configuration...")
@@ -270,61 +371,126 @@ def main():
         logging.error(f"CONTAINER_APPS is not valid JSON: {e}")
         sys.exit(1)
 
-    # Extract app names
-    app_names = [entry.get("name") for entry in apps_list if entry.get("name")]
+    # Extract app names; an entry may name its own resourceGroup, otherwise AZURE_RESOURCE_GROUP is used
+    entries = [
+        (entry["name"], entry.get("resourceGroup") or resource_group)
+        for entry in apps_list if entry.get("name")
+    ]
     
-    if not app_names:
+    if not entries:
         logging.warning("No container apps found to process.")
-        return
+        return True
     
-    logging.info(f"Found {len(app_names)} container apps to process: {', '.join(app_names)}")
+    resource_groups = sorted({rg for _, rg in entries}, key=str.lower)
+    multiple_groups = len({rg.lower() for rg in resource_groups}) > 1
+    targets = [(f"{rg}/{name}" if multiple_groups else name, rg, name) for name, rg in entries]
+    labels = {(rg.lower(), name.lower()): label for label, rg, name in targets}
+    logging.info(f"Found {len(targets)} container apps to process: {', '.join(label for label, _, _ in targets)}")
     
-    if MAX_WORKERS == 2:
-        logging.info("Processing apps ...")
-        logging.info("-"*60)
-        
-        # Process sequentially
-        results = []
-        for i, name in enumerate(app_names, 1):
-            logging.info(f"Processing {i}/{len(app_names)}: {name}")
-            try:
-                result = update_single_container_app(subscription_id, resource_group, name, acr_server, use_uai, shared_credential)
-                results.append(result)
-            except Exception as e:
-                logging.error(f"Failed to process {name}: {e}")
-                results.append((name, False, str(e)))
-    else:
-        logging.info(f"Processing with {MAX_WORKERS} parallel workers...")
+    # The management SDK is imported here so configuration errors fail fast without loading it.
+    from azure.mgmt.appcontainers import ContainerAppsAPIClient
+
+    # Concurrency follows the number of apps and ARM throttling, capped by CONTAINER_APP_MAX_WORKERS;
+    # one client (and connection pool) serves every app, and its responses drive the limiter.
+    # Retries are left to the shared policy (config/retry.py) instead of the SDK's own.
+    limiter = ArmWriteLimiter(min(len(targets), MAX_WORKERS))
+    client = ContainerAppsAPIClient(
+        shared_credential,
+        subscription_id,
+        transport=get_transport(),
+        raw_response_hook=ArmThrottleObserver(limiter),
+        retry_total=0,
+    )
+
+    def list_targets():
+        return {labels[key]: app for key, app in list_container_apps(client, resource_groups).items() if key in labels}
+
+    # ── Plan: one listing, identity and registry checks in memory ──
+    plan_start = time.time()
+    try:
+        current = get_retry_policy().call(
+            list_container_apps, client, resource_groups, endpoint=ARM_ENDPOINT, label="Listing Container Apps"
+        )
+    except Exception as e:
+        logging.error(f"❌ Could not list Container Apps in {', '.join(resource_groups)}: {e}", exc_info=True)
+        return False
+    updates, planned = plan_container_app_updates(current, targets, acr_server, use_uai)
+    logging.info(
+        f"📊 Planned {len(targets)} apps from one listing in {time.time() - plan_start:.2f}s: "
+        f"{len(updates)} to update, {len(planned)} settled"
+    )
+    outcomes = {label: (label, success, message) for label, success, message in planned}
+
+    # ── Update: only the apps that need it ──
+    started = {}
+    previous_revisions = {label: app.latest_revision_name for label, _, app, _ in updates}
+    if updates:
+        logging.info(f"Processing with up to {limiter.maximum} concurrent writes...")
         logging.info("-"*60)
-        
-        # Process in parallel with shared credential
-        results = []
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+
+        with ThreadPoolExecutor(max_workers=min(limiter.maximum, len(updates)), thread_name_prefix="containerapp") as executor:
             logging.debug("Submitting tasks to thread pool")
             futures = {
                 executor.submit(
-                    update_single_container_app,
-                    subscription_id,
-                    resource_group,
-                    name,
+                    start_container_app_update,
+                    client,
+                    limiter,
+                    label,
+                    rg,
+                    app,
+                    desired_identity,
                     acr_server,
-                    use_uai,
-                    shared_credential
-                ): name
-                for name in app_names
+                ): label
+                for label, rg, app, desired_identity in updates
             }
             
             completed_count = 0
             for future in as_completed(futures):
                 completed_count += 1
-                name = futures[future]
+                label = futures[future]
                 try:
-                    app_name, success, message = future.result()
-                    results.append((app_name, success, message))
-                    logging.info(f"Progress: {completed_count}/{len(app_names)} apps processed")
+                    app_label, success, message = future.result()
+                    if success is None:
+                        started[app_label] = (time.time(), previous_revisions[app_label])
+                    else:
+                        outcomes[app_label] = (app_label, success, message)
+                    logging.info(f"Progress: {completed_count}/{len(updates)} updates started")
                 except Exception as e:
-                    logging.error(f"Unexpected error processing '{name}': {e}", exc_info=True)
-                    results.append((name, False, str(e)))
+                    logging.error(f"Unexpected error processing '{label}': {e}", exc_info=True)
+                    outcomes[label] = (label, False, str(e))
+
+    if started:
+        # One thread and one listing per round for every provisioning app, instead of a poller per app.
+        logging.info(f"⏳ Waiting for {len(started)} update(s) (timeout={POLL_TIMEOUT_SECONDS}s)...")
+
+        def on_done(label, result):
+            start_time, previous_revision = started[label]
+            elapsed = time.time() - start_time
+            if result.ok:
+                message = revision_message(previous_revision, result.app.latest_revision_name)
+                logging.info(f"[{label}] ✅ Successfully updated, {message}! (provisioned in {elapsed:.2f}s)")
+            elif result.state == "Timeout":
+                logging.warning(f"[{label}] ⏱️ Operation timed out after {POLL_TIMEOUT_SECONDS}s")
+            else:
+                logging.error(f"[{label}] Operation failed: provisioning state {result.state} (elapsed: {elapsed:.2f}s)")
+
+        provisioned = wait_for_provisioning(
+            list_targets,
+            started,
+            timeout=POLL_TIMEOUT_SECONDS,
+            interval=POLL_INTERVAL_SECONDS,
+            on_done=on_done,
+        )
+        for label, result in provisioned.items():
+            if result.ok:
+                message = f"Success, {revision_message(started[label][1], result.app.latest_revision_name)}"
+            else:
+                message = "Timeout" if result.state == "Timeout" else f"Provisioning {result.state}"
+            outcomes[label] = (label, result.ok, message)
+
+    if limiter.throttled:
+        logging.info(f"⚠️ ARM throttled {limiter.throttled} write(s); final write concurrency {limiter.limit}")
+    results = [outcomes[label] for label, _, _ in targets if label in outcomes]
     
     # Summary
     overall_elapsed = time.time() - overall_start
@@ -345,6 +511,12 @@ def main():
     
     logging.info(f"⏱️  Total execution time: {overall_elapsed:.2f}s ({overall_elapsed/60:.2f}m)")
     logging.info("="*60)
+    return not failed
+
+
+def main():
+    configure_logging()
+    run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,263 @@
+"""
+Token caching credential shared by the setup phases.
+
+``AzureCliCredential`` runs ``az account get-access-token`` (1-3 s) on every ``get_token`` call and
+keeps nothing between credential instances or processes. ``CachedTokenCredential`` wraps the
+CLI → Managed Identity chain and caches the tokens per scope (and tenant):
+
+- in memory, shared by every client of the process, with one in-flight fetch per scope;
+- on disk, encrypted by the OS through msal-extensions (installed with azure-identity): DPAPI on
+  Windows, the Keychain on macOS, libsecret (a running Secret Service) on Linux, with its files
+  under ``~/.cache/gpt-rag/`` (CONFIG_TOKEN_CACHE_DIR), so the next run or another setup process
+  reuses them. Where no OS encryption is available (e.g. a headless Linux jumpbox) tokens stay in
+  memory, unless CONFIG_TOKEN_CACHE_PLAINTEXT=true opts in to a plaintext JSON file protected only
+  by its permissions (0600 in a 0700 directory). The cache is keyed by the active Azure CLI profile
+  and managed identity, so ``az login``/``az account set`` start from an empty cache;
+- tokens close to expiry are refreshed ahead of time in the background while the still-valid
+  token is returned, and ``prefetch`` fetches the known scopes concurrently at startup.
+
+Set CONFIG_TOKEN_CACHE=false to keep tokens in memory only.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Tuple
+
+if TYPE_CHECKING:
+    from azure.core.credentials import AccessToken, AccessTokenInfo
+
+ARM_SCOPE = "https://management.azure.com/.default"
+SEARCH_SCOPE = "https://search.azure.com/.default"
+APP_CONFIG_SCOPE = "https://azconfig.io/.default"
+KEY_VAULT_SCOPE = "https://vault.azure.net/.default"
+KNOWN_SCOPES = (ARM_SCOPE, SEARCH_SCOPE, APP_CONFIG_SCOPE, KEY_VAULT_SCOPE)
+
+REFRESH_AHEAD_SECONDS = 600   # refresh in the background once a token has less than this left
+MIN_VALIDITY_SECONDS = 120    # never hand out a token with less than this left
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "gpt-rag"
+ENCRYPTED_FILE_NAME = "token-cache.secure"   # DPAPI ciphertext, or the Keychain/libsecret signal file
+PLAINTEXT_FILE_NAME = "token-cache.json"
+LOCK_FILE_NAME = "token-cache.lock"
+LEGACY_FILE_NAMES = ("token-cache.bin", "token-cache.key")   # earlier Fernet store and its key
+
+
+def token_cache_enabled() -> bool:
+    return os.getenv("CONFIG_TOKEN_CACHE", "true").strip().lower() not in {"0", "false", "f", "no", "n"}
+
+
+def plaintext_token_cache_allowed() -> bool:
+    return os.getenv("CONFIG_TOKEN_CACHE_PLAINTEXT", "false").strip().lower() in {"1", "true", "t", "yes", "y"}
+
+
+def identity_fingerprint() -> str:
+    """Hash of what decides which identity the chain signs in as (CLI profile, managed identity settings)."""
+    parts = [os.getenv(name, "") for name in ("AZURE_CLIENT_ID", "AZURE_TENANT_ID", "IDENTITY_ENDPOINT", "MSI_ENDPOINT")]
+    config_dir = Path(os.getenv("AZURE_CONFIG_DIR") or Path.home() / ".azure")
+    try:
+        parts.append((config_dir / "azureProfile.json").read_text(encoding="utf-8-sig"))
+    except OSError:
+        parts.append("")
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class PersistedTokenStore:
+    """``{cache key: {token, expires_on}}`` in an msal-extensions persistence, shared by setup processes."""
+
+    def __init__(self, persistence, directory: Path):
+        self.persistence = persistence
+        self.directory = directory
+        self.path = Path(persistence.get_location())
+        self.encrypted = bool(getattr(persistence, "is_encrypted", False))
+        self._lock = threading.Lock()
+
+    def _process_lock(self):
+        from msal_extensions import CrossPlatLock
+
+        return CrossPlatLock(str(self.directory / LOCK_FILE_NAME))
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        from msal_extensions.persistence import PersistenceNotFound
+
+        try:
+            if not self.encrypted and os.name == "posix" and self.path.stat().st_mode & 0o077:
+                logging.warning(f"❗️ Ignoring token cache {self.path}: it is readable by other users.")
+                return {}
+            return json.loads(self.persistence.load())
+        except (FileNotFoundError, PersistenceNotFound):
+            return {}
+        except Exception as e:
+            logging.warning(f"❗️ Ignoring unreadable token cache {self.path}: {e}")
+            return {}
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock, self._process_lock():
+            return self._load()
+
+    def save(self, key: str, token: "AccessToken") -> None:
+        """Merge one token into the store, dropping expired entries; locked against concurrent processes."""
+        with self._lock, self._process_lock():
+            now = time.time()
+            entries = {k: v for k, v in self._load().items() if v.get("expires_on", 0) > now}
+            entries[key] = {"token": token.token, "expires_on": token.expires_on}
+            try:
+                self.persistence.save(json.dumps(entries))
+                # Drop the Fernet files of earlier versions, and any plaintext copy once encrypted.
+                stale = LEGACY_FILE_NAMES + ((PLAINTEXT_FILE_NAME,) if self.encrypted else ())
+                for name in stale:
+                    (self.directory / name).unlink(missing_ok=True)
+            except Exception as e:
+                logging.warning(f"❗️ Could not write token cache {self.path}: {e}")
+
+
+def build_token_store(directory: Optional[Path] = None) -> Optional[PersistedTokenStore]:
+    """
+    OS-encrypted token store, or a plaintext one when that is unavailable and
+    CONFIG_TOKEN_CACHE_PLAINTEXT=true; None (memory only) otherwise.
+    """
+    directory = Path(directory or os.getenv("CONFIG_TOKEN_CACHE_DIR") or DEFAULT_CACHE_DIR)
+    try:
+        directory.mkdir(parents=True, exist_ok=True, mode=0o700)
+        from msal_extensions import build_encrypted_persistence
+
+        return PersistedTokenStore(build_encrypted_persistence(str(directory / ENCRYPTED_FILE_NAME)), directory)
+    except Exception as e:
+        reason = f"{type(e).__name__}: {e}".splitlines()[0]
+    if not plaintext_token_cache_allowed():
+        logging.info(f"🔐 No OS-backed encryption for the token cache ({reason}); keeping tokens in memory only "
+                     "(CONFIG_TOKEN_CACHE_PLAINTEXT=true allows a plaintext file).")
+        return None
+    from msal_extensions import FilePersistence
+
+    logging.warning(f"⚠️ Token cache stored in plaintext at {directory / PLAINTEXT_FILE_NAME} "
+                    "(CONFIG_TOKEN_CACHE_PLAINTEXT=true); it is protected by file permissions only.")
+    return PersistedTokenStore(FilePersistence(str(directory / PLAINTEXT_FILE_NAME)), directory)
+
+
+class CachedTokenCredential:
+    """TokenCredential that caches the tokens of ``inner`` per scope, in memory and in a persisted store."""
+
+    def __init__(self, inner, store: Optional[PersistedTokenStore] = None):
+        self._inner = inner
+        self._store = store
+        self._fingerprint = identity_fingerprint()
+        self._tokens: Dict[str, "AccessToken"] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self._store_loaded = False
+        self.fetches = 0
+
+    # ── TokenCredential protocol ─────────────────────────────────────────────
+    def get_token(self, *scopes: str, claims: Optional[str] = None, tenant_id: Optional[str] = None, **kwargs: Any) -> "AccessToken":
+        if claims:
+            # A claims challenge needs a fresh token; never answer it from the cache.
+            return self._inner.get_token(*scopes, claims=claims, tenant_id=tenant_id, **kwargs)
+        return self._get_cached(scopes, tenant_id, kwargs)
+
+    def get_token_info(self, *scopes: str, options: Optional[dict] = None) -> "AccessTokenInfo":
+        from azure.core.credentials import AccessTokenInfo
+
+        options = options or {}
+        token = self.get_token(*scopes, claims=options.get("claims"), tenant_id=options.get("tenant_id"))
+        return AccessTokenInfo(token.token, token.expires_on)
+
+    def close(self) -> None:
+        close = getattr(self._inner, "close", None)
+        if close:
+            close()
+
+    def __enter__(self) -> "CachedTokenCredential":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # ── Prefetch ─────────────────────────────────────────────────────────────
+    def prefetch(self, scopes: Iterable[str] = KNOWN_SCOPES) -> Dict[str, bool]:
+        """Fetch (or load from cache) a token for every scope concurrently; returns success per scope."""
+        scopes = list(scopes)
+        start = time.perf_counter()
+
+        def fetch(scope: str) -> bool:
+            try:
+                self.get_token(scope)
+                return True
+            except Exception as e:
+                logging.warning(f"⚠️ Could not prefetch a token for {scope}: {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=max(1, len(scopes)), thread_name_prefix="token") as pool:
+            results = dict(zip(scopes, pool.map(fetch, scopes)))
+        logging.info(f"🔐 Tokens ready for {sum(results.values())}/{len(scopes)} scopes in {time.perf_counter() - start:.2f}s "
+                     f"({self.fetches} fetched from the credential)")
+        return results
+
+    # ── Cache ────────────────────────────────────────────────────────────────
+    def _cache_key(self, scopes: Tuple[str, ...], tenant_id: Optional[str], kwargs: dict) -> str:
+        cae = "cae" if kwargs.get("enable_cae") else ""
+        return "|".join((self._fingerprint, tenant_id or "", cae, " ".join(sorted(scopes))))
+
+    def _get_cached(self, scopes: Tuple[str, ...], tenant_id: Optional[str], kwargs: dict) -> "AccessToken":
+        key = self._cache_key(scopes, tenant_id, kwargs)
+        token = self._lookup(key)
+        remaining = token.expires_on - time.time() if token else 0
+        if token and remaining > MIN_VALIDITY_SECONDS:
+            if remaining < REFRESH_AHEAD_SECONDS:
+                self._refresh_in_background(key, scopes, tenant_id, kwargs)
+            return token
+
+        with self._key_lock(key):
+            # Another thread may have fetched it while this one waited.
+            token = self._tokens.get(key)
+            if token and token.expires_on - time.time() > MIN_VALIDITY_SECONDS:
+                return token
+            return self._fetch(key, scopes, tenant_id, kwargs)
+
+    def _lookup(self, key: str) -> Optional["AccessToken"]:
+        with self._lock:
+            if not self._store_loaded and self._store is not None:
+                from azure.core.credentials import AccessToken
+
+                self._store_loaded = True
+                for cached_key, entry in self._store.load().items():
+                    self._tokens.setdefault(cached_key, AccessToken(entry["token"], int(entry["expires_on"])))
+            return self._tokens.get(key)
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _fetch(self, key: str, scopes: Tuple[str, ...], tenant_id: Optional[str], kwargs: dict) -> "AccessToken":
+        start = time.perf_counter()
+        token = self._inner.get_token(*scopes, tenant_id=tenant_id, **kwargs)
+        logging.debug(f"Fetched a token for {' '.join(scopes)} in {time.perf_counter() - start:.2f}s")
+        with self._lock:
+            self._tokens[key] = token
+            self.fetches += 1
+        if self._store is not None:
+            self._store.save(key, token)
+        return token
+
+    def _refresh_in_background(self, key: str, scopes: Tuple[str, ...], tenant_id: Optional[str], kwargs: dict) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh() -> None:
+            try:
+                with self._key_lock(key):
+                    self._fetch(key, scopes, tenant_id, kwargs)
+            except Exception as e:
+                logging.debug(f"Background token refresh for {' '.join(scopes)} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name="token-refresh", daemon=True).start()
@@ -0,0 +1,319 @@
+"""
+Retry policy shared by the setup phases.
+
+One ``RetryPolicy`` (``get_retry_policy``) is used for ARM (Container Apps, Cognitive Services),
+App Configuration, Key Vault and Azure AI Search calls:
+
+- exponential backoff with full jitter, or the delay the service asked for (``Retry-After``,
+  ``retry-after-ms``, ``x-ms-retry-after-ms``), capped at CONFIG_RETRY_MAX_DELAY seconds;
+- ``classify`` sorts failures into throttled (429/503), transient (408/5xx, transport errors, ARM
+  and Key Vault "operation in progress" conflicts) and fatal (everything else, never retried);
+- a circuit breaker per endpoint: after CONFIG_RETRY_BREAKER_THRESHOLD consecutive transient
+  failures, calls to that endpoint fail fast with ``CircuitOpenError`` for
+  CONFIG_RETRY_BREAKER_COOLDOWN seconds, then one trial call decides whether it closes again.
+  Throttled answers do not count: the endpoint is up and asked callers to wait, so they back off
+  (honouring Retry-After) instead of failing fast;
+- counters (attempts, retries, throttled responses, seconds spent waiting) per endpoint, logged by
+  ``python -m config`` at the end of a run.
+
+Blocking callers use ``policy.call(fn, ...)``. The async Search engine drives its own loop with
+``policy.delay``, ``policy.breaker`` and ``policy.record_*``, so both share one set of rules.
+SDK clients whose calls go through the policy are created with ``retry_total=0``, so attempts are
+not multiplied by the SDK's own retry policy.
+"""
+
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Mapping, Optional, TypeVar
+from urllib.parse import urlparse
+
+T = TypeVar("T")
+
+THROTTLE_STATUS = {429, 503}
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# Error codes ARM and Key Vault return for conflicts that clear up on their own.
+RETRYABLE_ERROR_CODES = {
+    "AnotherOperationInProgress",
+    "RequestConflict",
+    "OperationNotAllowedWhileUpdating",
+    "ObjectIsBeingDeleted",
+    "Throttled",
+    "TooManyRequests",
+    "ServerBusy",
+}
+TRANSPORT_ERRORS = {
+    "ServiceRequestError",
+    "ServiceResponseError",
+    "ServiceRequestTimeoutError",
+    "ServiceResponseTimeoutError",
+    "IncompleteReadError",
+    "ConnectionError",
+    "Timeout",
+    "ChunkedEncodingError",
+}
+
+ARM_ENDPOINT = "management.azure.com"
+
+THROTTLED = "throttled"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY_SECONDS = 1.0
+DEFAULT_MAX_DELAY_SECONDS = 60.0
+DEFAULT_BREAKER_THRESHOLD = 8
+DEFAULT_BREAKER_COOLDOWN_SECONDS = 30.0
+
+
+# ── Classification ───────────────────────────────────────────────────────────
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Return the server-requested delay in seconds, or None when no usable header is present."""
+    if not headers:
+        return None
+    for name in ("retry-after-ms", "x-ms-retry-after-ms"):
+        value = headers.get(name)
+        if value:
+            try:
+                return max(0.0, float(value) / 1000.0)
+            except ValueError:
+                pass
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = DEFAULT_BASE_DELAY_SECONDS, cap: float = DEFAULT_MAX_DELAY_SECONDS) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def status_of(error: BaseException) -> Optional[int]:
+    """HTTP status of an Azure SDK or requests error, if it carries one."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def headers_of(error: BaseException) -> Optional[Mapping[str, str]]:
+    return getattr(getattr(error, "response", None), "headers", None)
+
+
+def error_code_of(error: BaseException) -> Optional[str]:
+    """ARM/Key Vault error code (``error.code`` of an HttpResponseError), if any."""
+    return getattr(getattr(error, "error", None), "code", None) or getattr(error, "code", None)
+
+
+def classify(error: Optional[BaseException] = None, status: Optional[int] = None) -> str:
+    """Return THROTTLED, TRANSIENT or FATAL for a failed call (an exception and/or an HTTP status)."""
+    if error is not None and status is None:
+        status = status_of(error)
+    if status in THROTTLE_STATUS:
+        return THROTTLED
+    if status in RETRYABLE_STATUS:
+        return TRANSIENT
+    if error is None:
+        return FATAL
+    if status == 409 and error_code_of(error) in RETRYABLE_ERROR_CODES:
+        return TRANSIENT
+    if error_code_of(error) in {"Throttled", "TooManyRequests"}:
+        return THROTTLED
+    if status is None:
+        if isinstance(error, (ConnectionError, TimeoutError)):
+            return TRANSIENT
+        if any(cls.__name__ in TRANSPORT_ERRORS for cls in type(error).__mro__):
+            return TRANSIENT
+    return FATAL
+
+
+def endpoint_of(url: str) -> str:
+    """Breaker and counter key of a URL: its host."""
+    return urlparse(url).netloc or url
+
+
+# ── Circuit breaker ──────────────────────────────────────────────────────────
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an endpoint whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Per-endpoint breaker: opens after consecutive transient failures, half-opens after a cool-down."""
+
+    def __init__(self, threshold: int = DEFAULT_BREAKER_THRESHOLD, cooldown: float = DEFAULT_BREAKER_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._trial: set = set()
+        self._lock = threading.Lock()
+
+    def before_call(self, endpoint: str) -> None:
+        """Raise CircuitOpenError while the endpoint's circuit is open; let one trial call through after the cool-down."""
+        with self._lock:
+            opened_at = self._opened_at.get(endpoint)
+            if opened_at is None:
+                return
+            if time.monotonic() - opened_at < self.cooldown or endpoint in self._trial:
+                raise CircuitOpenError(f"circuit open for {endpoint} after {self._failures.get(endpoint, 0)} consecutive failures")
+            self._trial.add(endpoint)
+
+    def record_success(self, endpoint: str) -> None:
+        with self._lock:
+            if endpoint in self._opened_at:
+                logging.info(f"🟢 {endpoint} is answering again; circuit closed.")
+            self._failures.pop(endpoint, None)
+            self._opened_at.pop(endpoint, None)
+            self._trial.discard(endpoint)
+
+    def record_throttled(self, endpoint: str) -> None:
+        """A throttled answer shows the endpoint is up: it ends a failure streak instead of extending it."""
+        self.record_success(endpoint)
+
+    def record_failure(self, endpoint: str) -> None:
+        with self._lock:
+            failures = self._failures.get(endpoint, 0) + 1
+            self._failures[endpoint] = failures
+            if endpoint in self._trial or (failures >= self.threshold and endpoint not in self._opened_at):
+                logging.warning(f"⚠️ {failures} consecutive failures from {endpoint}; failing fast for {self.cooldown:.0f}s.")
+                self._opened_at[endpoint] = time.monotonic()
+            self._trial.discard(endpoint)
+
+
+# ── Counters ─────────────────────────────────────────────────────────────────
+class RetryStats:
+    """Attempts, retries, throttled responses and wait time, per endpoint."""
+
+    FIELDS = ("attempts", "retries", "throttled", "failures", "wait_seconds")
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, **values: float) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(endpoint, dict.fromkeys(self.FIELDS, 0))
+            for name, value in values.items():
+                counters[name] += value
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {endpoint: dict(counters) for endpoint, counters in self._counters.items()}
+
+    def summary(self) -> str:
+        parts = []
+        for endpoint, c in sorted(self.snapshot().items()):
+            if c["retries"] or c["failures"]:
+                parts.append(f"{endpoint}: {c['attempts']:.0f} attempts, {c['retries']:.0f} retries "
+                             f"({c['throttled']:.0f} throttled), {c['wait_seconds']:.1f}s waiting")
+        return "; ".join(parts)
+
+
+# ── Policy ───────────────────────────────────────────────────────────────────
+class RetryPolicy:
+    """Backoff, Retry-After, classification, circuit breaking and counters for one process."""
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY_SECONDS,
+        max_delay: float = DEFAULT_MAX_DELAY_SECONDS,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = RetryStats()
+
+    def delay(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+        """Seconds to wait before retry ``attempt`` (0-based): Retry-After if given, else full-jitter backoff."""
+        requested = parse_retry_after(headers)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return backoff_delay(attempt, self.base_delay, self.max_delay)
+
+    def record_attempt(self, endpoint: str) -> None:
+        self.stats.add(endpoint, attempts=1)
+
+    def record_success(self, endpoint: str) -> None:
+        self.breaker.record_success(endpoint)
+
+    def _record_breaker(self, endpoint: str, kind: str) -> None:
+        if kind == THROTTLED:
+            self.breaker.record_throttled(endpoint)
+        elif kind == TRANSIENT:
+            self.breaker.record_failure(endpoint)
+
+    def record_retry(self, endpoint: str, kind: str, wait_seconds: float) -> None:
+        self._record_breaker(endpoint, kind)
+        self.stats.add(endpoint, retries=1, throttled=int(kind == THROTTLED), wait_seconds=wait_seconds)
+
+    def record_failure(self, endpoint: str, kind: str) -> None:
+        self._record_breaker(endpoint, kind)
+        self.stats.add(endpoint, failures=1, throttled=int(kind == THROTTLED))
+
+    def call(self, fn: Callable[..., T], *args: Any, endpoint: str = "default", label: str = "", **kwargs: Any) -> T:
+        """
+        Call ``fn(*args, **kwargs)``, retrying throttled and transient failures. Fatal errors and the
+        last failure are raised unchanged; CircuitOpenError is raised while the endpoint's circuit is open.
+        """
+        label = label or getattr(fn, "__name__", "call")
+        for attempt in range(self.max_attempts):
+            self.breaker.before_call(endpoint)
+            self.record_attempt(endpoint)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify(e)
+                if kind == FATAL or attempt == self.max_attempts - 1:
+                    self.record_failure(endpoint, kind)
+                    raise
+                wait = self.delay(attempt, headers_of(e))
+                logging.warning(f"⚠️ {label} failed ({kind}: {e}); retrying in {wait:.1f}s "
+                                f"(attempt {attempt + 1}/{self.max_attempts})")
+                self.record_retry(endpoint, kind, wait)
+                time.sleep(wait)
+                continue
+            self.record_success(endpoint)
+            return result
+        raise AssertionError("unreachable")
+
+
+_lock = threading.Lock()
+_policy: Optional[RetryPolicy] = None
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Return the process-wide policy (tunable with the CONFIG_RETRY_* environment variables)."""
+    global _policy
+    with _lock:
+        if _policy is None:
+            _policy = RetryPolicy(
+                max_attempts=int(_env_number("CONFIG_RETRY_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)),
+                base_delay=_env_number("CONFIG_RETRY_BASE_DELAY", DEFAULT_BASE_DELAY_SECONDS),
+                max_delay=_env_number("CONFIG_RETRY_MAX_DELAY", DEFAULT_MAX_DELAY_SECONDS),
+                breaker=CircuitBreaker(
+                    threshold=int(_env_number("CONFIG_RETRY_BREAKER_THRESHOLD", DEFAULT_BREAKER_THRESHOLD)),
+                    cooldown=_env_number("CONFIG_RETRY_BREAKER_COOLDOWN", DEFAULT_BREAKER_COOLDOWN_SECONDS),
+                ),
+            )
+        return _policy
@@ -0,0 +1,90 @@
+"""
+Process-wide resources shared by the setup phases.
+
+When the phases run in one interpreter (``python -m config``) they share:
+- one credential (Azure CLI first, then Managed Identity) whose tokens are cached per scope in
+  memory and in an OS-encrypted on-disk store, see ``get_credential`` and config/credentials.py;
+- one pooled ``requests.Session``: every Azure SDK client gets a transport on top of it
+  (``get_transport``) and the Search REST client uses it directly, so TLS connections to
+  management.azure.com, App Config and Key Vault are reused across phases.
+
+Run on their own (``python -m config.search.setup``) the phases use the same helpers, so the
+behavior only differs in how much is shared.
+"""
+
+import os
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from .credentials import CachedTokenCredential, build_token_store, token_cache_enabled
+
+# requests, azure.core and azure.identity are imported on first use, so `python -m config`
+# can fail fast (e.g. on a missing APP_CONFIG_ENDPOINT) without loading them.
+if TYPE_CHECKING:
+    import requests
+    from azure.core.pipeline.transport import RequestsTransport
+
+DEFAULT_HTTP_POOL_SIZE = 32
+CREDENTIAL_PROCESS_TIMEOUT = 30
+
+_lock = threading.Lock()
+_credential: Optional[CachedTokenCredential] = None
+_session: Optional["requests.Session"] = None
+
+
+def get_http_pool_size() -> int:
+    try:
+        return max(1, int(os.getenv("CONFIG_HTTP_POOL_SIZE") or DEFAULT_HTTP_POOL_SIZE))
+    except ValueError:
+        return DEFAULT_HTTP_POOL_SIZE
+
+
+def get_credential() -> CachedTokenCredential:
+    """Return the shared token-caching credential over the Azure CLI → Managed Identity chain."""
+    global _credential
+    with _lock:
+        if _credential is None:
+            from azure.identity import AzureCliCredential, ChainedTokenCredential, ManagedIdentityCredential
+
+            chain = ChainedTokenCredential(
+                AzureCliCredential(process_timeout=CREDENTIAL_PROCESS_TIMEOUT),
+                ManagedIdentityCredential(process_timeout=CREDENTIAL_PROCESS_TIMEOUT),
+            )
+            _credential = CachedTokenCredential(chain, build_token_store() if token_cache_enabled() else None)
+        return _credential
+
+
+def get_http_session() -> "requests.Session":
+    """Return the shared keep-alive session; retries are left to the callers' own policies."""
+    global _session
+    with _lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            pool_size = get_http_pool_size()
+            adapter = HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=Retry(total=False, redirect=False, raise_on_status=False),
+            )
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def get_transport() -> "RequestsTransport":
+    """Return an Azure SDK transport over the shared session; closing the client leaves the session open."""
+    from azure.core.pipeline.transport import RequestsTransport
+
+    return RequestsTransport(session=get_http_session(), session_owner=False)
+
+
+def close_http_session() -> None:
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,110 @@
+"""
+Content-addressed cache for the search templates.
+
+Each template (search.settings.j2, search.j2) is keyed by a SHA-256 of its source plus the values of
+the context keys it actually references (found with ``jinja2.meta.find_undeclared_variables``), so
+an unrelated App Config change does not invalidate it. For every template the cache keeps:
+
+- the rendered JSON of the last render, so an unchanged template is not rendered again;
+- the digest of the last state that was successfully applied (settings written back to App Config,
+  or definitions provisioned to the Search service).
+
+When the current digest matches the applied one, the write-back or provisioning step is skipped.
+Applied digests are stored in ``config/search/.cache/render-cache.json`` and, with
+SEARCH_RENDER_CACHE_APPCONFIG=true, also in the App Config key SEARCH_RENDER_STATE so other machines
+(e.g. CI runners) share them. SEARCH_RENDER_CACHE=false disables the cache and SEARCH_FORCE_APPLY=true
+(environment or App Config) forces a full run, e.g. after resources were changed outside this script.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from jinja2 import Environment, meta
+
+from .settings import is_truthy_setting, parse_json_like_setting, write_json_setting
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / ".cache" / "render-cache.json"
+REMOTE_STATE_KEY = "SEARCH_RENDER_STATE"
+RENDER_HASH_KEY = "SEARCH_RENDER_HASH"
+
+
+def cache_enabled(context: dict) -> bool:
+    return is_truthy_setting(context.get("SEARCH_RENDER_CACHE", "true"))
+
+
+def force_apply(context: dict) -> bool:
+    return is_truthy_setting(os.getenv("SEARCH_FORCE_APPLY") or context.get("SEARCH_FORCE_APPLY"))
+
+
+def referenced_variables(env: Environment, template_name: str) -> set:
+    source = env.loader.get_source(env, template_name)[0]
+    return meta.find_undeclared_variables(env.parse(source))
+
+
+def template_digest(env: Environment, template_name: str, context: dict) -> str:
+    """Hash of the template source and the values of the context keys it references."""
+    source = env.loader.get_source(env, template_name)[0]
+    inputs = {key: context.get(key) for key in sorted(referenced_variables(env, template_name))}
+    payload = json.dumps({"template": source, "inputs": inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """Rendered output and last applied digest per template, persisted to a local JSON file."""
+
+    def __init__(self, path: Optional[Path] = None, remote_state: Optional[Dict[str, Any]] = None):
+        self.path = Path(path or DEFAULT_CACHE_PATH)
+        self.remote_state = remote_state if isinstance(remote_state, dict) else {}
+        self._entries: Dict[str, dict] = {}
+        try:
+            self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"❗️ Ignoring unreadable render cache {self.path}: {e}")
+
+    @classmethod
+    def from_context(cls, context: dict, path: Optional[Path] = None) -> Optional["RenderCache"]:
+        """Return the cache for this run, or None when it is disabled or a full apply is forced."""
+        if not cache_enabled(context) or force_apply(context):
+            return None
+        return cls(path, parse_json_like_setting(context.get(REMOTE_STATE_KEY) or {}))
+
+    def rendered(self, template_name: str, digest: str) -> Optional[dict]:
+        entry = self._entries.get(template_name) or {}
+        return entry.get("rendered") if entry.get("digest") == digest else None
+
+    def store(self, template_name: str, digest: str, rendered: dict) -> None:
+        entry = self._entries.setdefault(template_name, {})
+        entry.update(digest=digest, rendered=rendered)
+        self._save()
+
+    def is_applied(self, template_name: str, digest: str) -> bool:
+        local = (self._entries.get(template_name) or {}).get("applied")
+        remote = (self.remote_state.get(template_name) or {}).get("applied")
+        return digest in (local, remote)
+
+    def mark_applied(self, template_name: str, digest: str, context: dict, credential=None, label: Optional[str] = None) -> None:
+        """Record ``digest`` as applied locally and, when enabled and changed, in App Config."""
+        self._entries.setdefault(template_name, {})["applied"] = digest
+        self._save()
+        if not is_truthy_setting(context.get("SEARCH_RENDER_CACHE_APPCONFIG")) or credential is None:
+            return
+        if (self.remote_state.get(template_name) or {}).get("applied") == digest:
+            return
+        self.remote_state.setdefault(template_name, {})["applied"] = digest
+        try:
+            write_json_setting(REMOTE_STATE_KEY, self.remote_state, credential, label)
+        except Exception as e:
+            logging.warning(f"❗️ Failed to save {REMOTE_STATE_KEY}: {e}")
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self._entries, indent=2, sort_keys=True), encoding="utf-8")
+        except OSError as e:
+            logging.warning(f"❗️ Could not write render cache {self.path}: {e}")
@@ -0,0 +1,123 @@
+"""
+Pooled HTTP client for the Azure AI Search REST API.
+
+One instance is shared by every provisioning call in a run so that:
+- TLS connections are kept alive and reused through a single ``requests.Session`` whose
+  connection pool is sized for the number of concurrent workers (or the session shared by all
+  setup phases, see config/runtime.py).
+- The bearer token is fetched once and reused until shortly before ``expires_on`` instead of
+  calling ``get_token`` (an ``az`` subprocess with AzureCliCredential) on every request.
+- Every call's latency is recorded and can be summarized at the end of a run.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+SEARCH_SCOPE = "https://search.azure.com/.default"
+DEFAULT_POOL_SIZE = 8
+DEFAULT_TIMEOUT_SECONDS = 120
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+
+class CallRecord(NamedTuple):
+    method: str
+    path: str
+    status: int
+    seconds: float
+
+
+class SearchClient:
+    """Keep-alive, token-caching client for ``{endpoint}/{rtype}/{rname}?api-version=...`` calls."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        credential,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        session: Optional[requests.Session] = None,
+    ):
+        self.endpoint = endpoint.rstrip("/")
+        self.timeout = timeout
+        self._credential = credential
+        self._token: Optional[str] = None
+        self._token_expires_on = 0.0
+        self._token_lock = threading.Lock()
+        self._calls: List[CallRecord] = []
+        self._calls_lock = threading.Lock()
+
+        # A session passed in (e.g. the one shared by all setup phases) is used as-is and not closed here.
+        self._owns_session = session is None
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size), pool_block=True)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self._session = session
+
+    def __enter__(self) -> "SearchClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._owns_session:
+            self._session.close()
+
+    # ── Authentication ───────────────────────────────────────────────────────
+    def get_token(self) -> str:
+        """Return a cached bearer token, refreshing it shortly before it expires."""
+        with self._token_lock:
+            if self._token is None or time.time() >= self._token_expires_on - TOKEN_REFRESH_MARGIN_SECONDS:
+                access_token = self._credential.get_token(SEARCH_SCOPE)
+                self._token = access_token.token
+                self._token_expires_on = float(access_token.expires_on)
+            return self._token
+
+    def invalidate_token(self) -> None:
+        """Force the next request to fetch a new token (e.g. after a 401)."""
+        with self._token_lock:
+            self._token = None
+
+    # ── Requests ─────────────────────────────────────────────────────────────
+    def request(self, method: str, rtype: str, rname: str, api_version: str, body: Any = None) -> requests.Response:
+        """Send one request and record its latency. Raises on transport errors."""
+        path = f"{rtype}/{rname}"
+        url = f"{self.endpoint}/{path}?api-version={api_version}"
+        headers = {"Authorization": f"Bearer {self.get_token()}", "Content-Type": "application/json"}
+        start = time.perf_counter()
+        resp = self._session.request(method.upper(), url, headers=headers, json=body, timeout=self.timeout)
+        elapsed = time.perf_counter() - start
+        with self._calls_lock:
+            self._calls.append(CallRecord(method.upper(), path, resp.status_code, elapsed))
+        logging.debug(f"{method.upper()} {path} -> {resp.status_code} in {elapsed * 1000:.0f} ms")
+        return resp
+
+    # ── Metrics ──────────────────────────────────────────────────────────────
+    @property
+    def calls(self) -> List[CallRecord]:
+        with self._calls_lock:
+            return list(self._calls)
+
+    def latency_summary(self) -> Dict[str, float]:
+        """Count, total, p50, p95 and max latency (seconds) of every call made so far."""
+        durations = sorted(call.seconds for call in self.calls)
+        if not durations:
+            return {"count": 0, "total": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+
+        def percentile(p: float) -> float:
+            return durations[min(len(durations) - 1, int(round(p * (len(durations) - 1))))]
+
+        return {
+            "count": len(durations),
+            "total": sum(durations),
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "max": durations[-1],
+        }
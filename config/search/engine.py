@@ -0,0 +1,148 @@
+"""
+Asyncio request engine for the Azure AI Search provisioning calls.
+
+Wraps the pooled SearchClient with:
+- an adaptive concurrency limit (AIMD): it halves after a throttled response (429/503) and grows
+  by one slot after a run of successful calls, never exceeding the configured maximum;
+- the shared retry policy (config/retry.py): ``Retry-After`` headers, full-jitter backoff for
+  transient responses and transport errors, a circuit breaker for the search endpoint and the
+  retry counters;
+- a token refresh and retry after a 401.
+
+The blocking HTTP calls run in worker threads (``asyncio.to_thread``) so the shared keep-alive
+session keeps serving them, while scheduling, waiting and backoff happen on the event loop.
+"""
+
+import asyncio
+import logging
+from typing import Any, Optional
+
+import requests
+
+from ..retry import FATAL, THROTTLED, CircuitOpenError, RetryPolicy, classify, endpoint_of, get_retry_policy
+from .client import SearchClient
+
+DEFAULT_MAX_RETRIES = 5
+
+
+class AdaptiveLimiter:
+    """Async concurrency limit that shrinks on throttling and recovers after successes."""
+
+    def __init__(self, maximum: int, minimum: int = 1, increase_after: int = 5):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = self.maximum
+        self.increase_after = increase_after
+        self._in_flight = 0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self) -> "AdaptiveLimiter":
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def record_success(self) -> None:
+        self._successes += 1
+        if self._successes >= self.increase_after and self.limit < self.maximum:
+            self.limit += 1
+            self._successes = 0
+            logging.debug(f"Search concurrency raised to {self.limit}")
+
+    def record_throttle(self) -> None:
+        self._successes = 0
+        reduced = max(self.minimum, self.limit // 2)
+        if reduced < self.limit:
+            logging.warning(f"⚠️ Search service is throttling; concurrency reduced {self.limit} -> {reduced}")
+            self.limit = reduced
+
+
+class SearchEngine:
+    """Retrying, throttling-aware async front end for a SearchClient."""
+
+    def __init__(
+        self,
+        client: SearchClient,
+        max_concurrency: int,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        policy: Optional[RetryPolicy] = None,
+    ):
+        self.client = client
+        self.limiter = AdaptiveLimiter(max_concurrency)
+        self.max_retries = max_retries
+        self.policy = policy or get_retry_policy()
+        self.endpoint = endpoint_of(client.endpoint)
+        self.retries = 0
+        self.throttled = 0
+
+    async def _wait_before_retry(self, kind: str, delay: float) -> None:
+        self.retries += 1
+        self.policy.record_retry(self.endpoint, kind, delay)
+        await asyncio.sleep(delay)
+
+    async def request(self, method: str, rtype: str, rname: str, api_version: str, body: Any = None) -> Optional[requests.Response]:
+        """
+        Send a request, retrying throttled, transient and authentication failures.
+        Returns the final response (which may still be an error), or None if every attempt raised
+        or the endpoint's circuit is open.
+        """
+        label = f"{method.upper()} {rtype}/{rname}"
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                self.policy.breaker.before_call(self.endpoint)
+            except CircuitOpenError as e:
+                logging.error(f"❗️ Skipping {label}: {e}")
+                return None
+            self.policy.record_attempt(self.endpoint)
+            try:
+                async with self.limiter:
+                    resp = await asyncio.to_thread(self.client.request, method, rtype, rname, api_version, body)
+            except Exception as e:
+                kind = classify(e)
+                if last_attempt or kind == FATAL:
+                    self.policy.record_failure(self.endpoint, kind)
+                    logging.error(f"❗️ Exception during {label}: {e}")
+                    return None
+                delay = self.policy.delay(attempt)
+                logging.warning(f"⚠️ Attempt {attempt + 1}/{self.max_retries + 1} failed for {label}: {e}; retrying in {delay:.1f}s")
+                await self._wait_before_retry(kind, delay)
+                continue
+
+            if resp.status_code == 401 and not last_attempt:
+                logging.warning(f"⚠️ {label} returned 401; refreshing token.")
+                self.client.invalidate_token()
+                self.retries += 1
+                continue
+
+            kind = classify(status=resp.status_code) if resp.status_code >= 400 else None
+            if kind and kind != FATAL and not last_attempt:
+                if kind == THROTTLED:
+                    self.throttled += 1
+                    self.limiter.record_throttle()
+                delay = self.policy.delay(attempt, resp.headers)
+                logging.warning(
+                    f"⚠️ {label} returned {resp.status_code}; retrying in {delay:.1f}s "
+                    f"(attempt {attempt + 1}/{self.max_retries + 1})"
+                )
+                await self._wait_before_retry(kind, delay)
+                continue
+
+            if kind and kind != FATAL:
+                self.policy.record_failure(self.endpoint, kind)
+            else:
+                self.policy.record_success(self.endpoint)
+            # Only calls the service served count towards raising the limit; a final 429 lowers it.
+            if kind == THROTTLED:
+                self.throttled += 1
+                self.limiter.record_throttle()
+            elif resp.status_code < 400 or resp.status_code == 404:
+                self.limiter.record_success()
+            return resp
+        return None  # Should never reach here, but just in case
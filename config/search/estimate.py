@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Offline index size and vector quota estimator for the rendered search definitions.
+
+Estimates, for every index rendered from search.j2 and a given document count:
+- vector index size per vector field (the part counted against the service's vector quota), from
+  ``dimensions``, the element type, the profile's compression (scalar/binary, truncationDimension)
+  and the HNSW ``m`` of its algorithm;
+- raw vector storage on disk (full-precision originals kept for search or rescoring, plus the
+  retrievable copy unless the field is ``stored: false``);
+- a rough size for text content and its inverted index.
+
+Totals are compared with the per-partition storage and vector quotas of a service tier (or explicit
+limits) and flagged when they would be exceeded. Nothing here calls Azure.
+
+Usage:
+    python -m config.search.estimate --context appconfig.json --documents 20000 --chunks-per-document 12
+    python -m config.search.estimate --definitions rendered.json --docs rag=500000 --tier standard2 --json
+
+``--context`` accepts a JSON object of App Config keys or the list produced by
+``az appconfig kv list --label gpt-rag``; ``--definitions`` accepts already rendered definitions
+(the first value returned by ``prepare_context_and_render``).
+"""
+
+import argparse
+import json
+import logging
+import math
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from .vectors import VECTOR_INDEX_ROLES
+
+GB = 1024 ** 3
+
+ELEMENT_BYTES = {
+    "Edm.Single": 4,
+    "Edm.Half": 2,
+    "Edm.Int16": 2,
+    "Edm.SByte": 1,
+    "Edm.Byte": 1,
+}
+
+# HNSW keeps 2*m neighbor ids (4 bytes each) per vector on layer 0; the upper layers add roughly
+# another 1/(m-1) of that, approximated here as a flat 10%.
+HNSW_NEIGHBOR_ID_BYTES = 4
+HNSW_UPPER_LAYER_FACTOR = 1.1
+DEFAULT_HNSW_M = 4
+
+# Inverted index size relative to the searchable text it covers (typical Lucene ratio).
+INVERTED_INDEX_RATIO = 0.5
+
+DEFAULT_CHUNK_TEXT_BYTES = 4000
+DEFAULT_NL2SQL_DOCUMENTS = 1000
+DEFAULT_NL2SQL_TEXT_BYTES = 1500
+
+# Per-partition (storage GB, vector index GB) limits. Approximate; check the current service limits
+# for your region and override with --storage-quota-gb / --vector-quota-gb when they differ.
+TIER_QUOTAS = {
+    "basic": (15, 5),
+    "standard": (160, 35),
+    "standard2": (512, 150),
+    "standard3": (1024, 300),
+    "storage_optimized_l1": (2048, 150),
+    "storage_optimized_l2": (4096, 300),
+}
+
+
+def _vector_element_type(field_type: str) -> Optional[str]:
+    if field_type.startswith("Collection(") and field_type.endswith(")"):
+        element = field_type[len("Collection("):-1]
+        if element in ELEMENT_BYTES:
+            return element
+    return None
+
+
+def _vector_settings(index: dict) -> Tuple[Dict[str, dict], Dict[str, dict], Dict[str, dict]]:
+    vector_search = index.get("vectorSearch") or {}
+    profiles = {p.get("name"): p for p in vector_search.get("profiles") or []}
+    algorithms = {a.get("name"): a for a in vector_search.get("algorithms") or []}
+    compressions = {c.get("name"): c for c in vector_search.get("compressions") or []}
+    return profiles, algorithms, compressions
+
+
+def estimate_vector_field(field: dict, index: dict, documents: int) -> Optional[Dict[str, Any]]:
+    """Size estimate (bytes) for one vector field, or None when the field is not a vector."""
+    element = _vector_element_type(field.get("type", ""))
+    if element is None or not field.get("dimensions"):
+        return None
+    dimensions = int(field["dimensions"])
+    element_bytes = ELEMENT_BYTES[element]
+
+    profiles, algorithms, compressions = _vector_settings(index)
+    profile = profiles.get(field.get("vectorSearchProfile")) or {}
+    algorithm = algorithms.get(profile.get("algorithm")) or {}
+    compression = compressions.get(profile.get("compression")) or {}
+
+    m = int((algorithm.get("hnswParameters") or {}).get("m") or DEFAULT_HNSW_M)
+    kind = compression.get("kind")
+    indexed_dimensions = int(compression.get("truncationDimension") or dimensions)
+    if kind == "scalarQuantization":
+        indexed_vector_bytes = indexed_dimensions  # int8
+    elif kind == "binaryQuantization":
+        indexed_vector_bytes = math.ceil(indexed_dimensions / 8)
+    else:
+        indexed_vector_bytes = dimensions * element_bytes
+
+    graph_bytes = 0
+    if algorithm.get("kind", "hnsw") == "hnsw":
+        graph_bytes = 2 * m * HNSW_NEIGHBOR_ID_BYTES * HNSW_UPPER_LAYER_FACTOR
+
+    full_vector_bytes = dimensions * element_bytes
+    rescoring = compression.get("rescoringOptions") or {}
+    keeps_originals = not kind or rescoring.get("rescoreStorageMethod", "preserveOriginals") == "preserveOriginals"
+    stored_copy = field.get("stored", True) is not False
+
+    vector_index = documents * (indexed_vector_bytes + graph_bytes)
+    raw_storage = documents * full_vector_bytes * (int(keeps_originals) + int(stored_copy))
+    return {
+        "field": field.get("name"),
+        "type": field.get("type"),
+        "dimensions": dimensions,
+        "compression": kind or "none",
+        "m": m,
+        "vector_index_bytes": vector_index,
+        "raw_vector_bytes": raw_storage,
+    }
+
+
+def estimate_index(index: dict, documents: int, text_bytes_per_document: int) -> Dict[str, Any]:
+    """Vector, raw vector and text size estimates (bytes) for one rendered index."""
+    vector_fields = []
+    has_searchable_text = False
+    for field in index.get("fields") or []:
+        vector = estimate_vector_field(field, index, documents)
+        if vector:
+            vector_fields.append(vector)
+        elif field.get("type") in ("Edm.String", "Collection(Edm.String)") and field.get("searchable", True):
+            has_searchable_text = True
+
+    text_bytes = documents * text_bytes_per_document
+    inverted_bytes = text_bytes * INVERTED_INDEX_RATIO if has_searchable_text else 0
+    vector_index = sum(v["vector_index_bytes"] for v in vector_fields)
+    raw_vectors = sum(v["raw_vector_bytes"] for v in vector_fields)
+    return {
+        "index": index.get("name"),
+        "documents": documents,
+        "vector_fields": vector_fields,
+        "vector_index_bytes": vector_index,
+        "raw_vector_bytes": raw_vectors,
+        "text_bytes": text_bytes,
+        "inverted_index_bytes": inverted_bytes,
+        "storage_bytes": vector_index + raw_vectors + text_bytes + inverted_bytes,
+    }
+
+
+def estimate_definitions(
+    defs: dict,
+    document_counts: Dict[str, int],
+    text_bytes: Dict[str, int],
+    partitions: int = 1,
+    storage_quota_gb: Optional[float] = None,
+    vector_quota_gb: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Estimate every index in ``defs``. ``document_counts`` and ``text_bytes`` are keyed by index name.
+    Quotas are per partition; the totals are flagged when they exceed ``partitions`` times the quota.
+    """
+    indexes = [
+        estimate_index(index, document_counts.get(index.get("name"), 0), text_bytes.get(index.get("name"), 0))
+        for index in defs.get("indexes") or []
+    ]
+    totals = {
+        "vector_index_bytes": sum(i["vector_index_bytes"] for i in indexes),
+        "storage_bytes": sum(i["storage_bytes"] for i in indexes),
+    }
+    warnings = []
+    for label, used, quota in (
+        ("vector index", totals["vector_index_bytes"], vector_quota_gb),
+        ("storage", totals["storage_bytes"], storage_quota_gb),
+    ):
+        if quota is None:
+            continue
+        limit = quota * partitions * GB
+        if used > limit:
+            warnings.append(
+                f"Estimated {label} size {used / GB:.2f} GB exceeds the quota of "
+                f"{limit / GB:.2f} GB ({partitions} partition(s) x {quota} GB)"
+            )
+    return {"indexes": indexes, "totals": totals, "partitions": partitions, "warnings": warnings}
+
+
+# ── Command line ────────────────────────────────────────────────────────────
+def load_context_file(path: str) -> dict:
+    """Read an App Config export: a {key: value} object or a list of {key, value} items."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return {item["key"]: item.get("value") for item in data if isinstance(item, dict) and "key" in item}
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} must contain a JSON object or a list of key/value items")
+    return data
+
+
+def _parse_assignments(values: List[str], option: str) -> Dict[str, int]:
+    result = {}
+    for value in values or []:
+        key, sep, number = value.partition("=")
+        if not sep:
+            raise ValueError(f"{option} expects NAME=COUNT, got '{value}'")
+        result[key.strip()] = int(number)
+    return result
+
+
+def _index_roles(defs: dict, context: dict) -> Dict[str, str]:
+    """Map roles (rag, queries, tables, measures) to index names, from the context or by naming convention."""
+    names = [index.get("name") for index in defs.get("indexes") or []]
+    roles = {}
+    for role, name_key in VECTOR_INDEX_ROLES.items():
+        if context.get(name_key):
+            roles[role] = context[name_key]
+        elif role == "rag":
+            roles[role] = next((n for n in names if n.startswith("ragindex")), names[0] if names else role)
+        else:
+            roles[role] = next((n for n in names if n.endswith(f"-{role}")), role)
+    return roles
+
+
+def _format_report(report: dict) -> str:
+    lines = []
+    header = f"{'index / field':<56} {'docs':>10} {'vector idx GB':>14} {'raw vec GB':>11} {'text+inv GB':>12} {'total GB':>9}"
+    lines.append(header)
+    lines.append("-" * len(header))
+    for index in report["indexes"]:
+        text = index["text_bytes"] + index["inverted_index_bytes"]
+        lines.append(
+            f"{index['index']:<56} {index['documents']:>10} {index['vector_index_bytes'] / GB:>14.3f} "
+            f"{index['raw_vector_bytes'] / GB:>11.3f} {text / GB:>12.3f} {index['storage_bytes'] / GB:>9.3f}"
+        )
+        for field in index["vector_fields"]:
+            label = f"  {field['field']} ({field['dimensions']}d, {field['compression']}, m={field['m']})"
+            lines.append(
+                f"{label:<56} {'':>10} {field['vector_index_bytes'] / GB:>14.3f} {field['raw_vector_bytes'] / GB:>11.3f}"
+            )
+    totals = report["totals"]
+    lines.append("-" * len(header))
+    lines.append(
+        f"{'total':<56} {'':>10} {totals['vector_index_bytes'] / GB:>14.3f} {'':>11} {'':>12} {totals['storage_bytes'] / GB:>9.3f}"
+    )
+    for warning in report["warnings"]:
+        lines.append(f"❗️ {warning}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Estimate search index size and vector quota offline.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--context", help="App Config export (JSON) used to render search.j2 locally")
+    source.add_argument("--definitions", help="Already rendered search definitions (JSON)")
+    parser.add_argument("--documents", type=int, default=0, help="Expected number of source documents")
+    parser.add_argument("--chunks-per-document", type=float, default=1.0, help="Average chunks per document in the RAG index")
+    parser.add_argument("--docs", action="append", metavar="INDEX=COUNT",
+                        help="Document count for an index name or role (rag, queries, tables, measures); repeatable")
+    parser.add_argument("--text-bytes", action="append", metavar="INDEX=BYTES",
+                        help="Average text bytes per document for an index name or role; repeatable")
+    parser.add_argument("--tier", choices=sorted(TIER_QUOTAS), help="Service tier whose per-partition quotas apply")
+    parser.add_argument("--partitions", type=int, default=1, help="Number of partitions")
+    parser.add_argument("--storage-quota-gb", type=float, help="Per-partition storage quota (overrides --tier)")
+    parser.add_argument("--vector-quota-gb", type=float, help="Per-partition vector index quota (overrides --tier)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.definitions:
+        with open(args.definitions, "r", encoding="utf-8") as f:
+            defs = json.load(f)
+        context = {}
+    else:
+        from .setup import render_offline
+
+        defs, context = render_offline(load_context_file(args.context))
+        if defs is None:
+            return 1
+
+    roles = _index_roles(defs, context)
+    rag_index = roles["rag"]
+    document_counts = {name: DEFAULT_NL2SQL_DOCUMENTS for name in (index.get("name") for index in defs.get("indexes") or [])}
+    text_bytes = {name: DEFAULT_NL2SQL_TEXT_BYTES for name in document_counts}
+    document_counts[rag_index] = int(args.documents * args.chunks_per_document)
+    text_bytes[rag_index] = DEFAULT_CHUNK_TEXT_BYTES
+    for name, count in _parse_assignments(args.docs, "--docs").items():
+        document_counts[roles.get(name, name)] = count
+    for name, size in _parse_assignments(args.text_bytes, "--text-bytes").items():
+        text_bytes[roles.get(name, name)] = size
+
+    storage_quota, vector_quota = TIER_QUOTAS.get(args.tier, (None, None))
+    report = estimate_definitions(
+        defs,
+        document_counts,
+        text_bytes,
+        partitions=max(1, args.partitions),
+        storage_quota_gb=args.storage_quota_gb if args.storage_quota_gb is not None else storage_quota,
+        vector_quota_gb=args.vector_quota_gb if args.vector_quota_gb is not None else vector_quota,
+    )
+    print(json.dumps(report, indent=2) if args.json else _format_report(report))
+    return 1 if report["warnings"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
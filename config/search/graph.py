@@ -0,0 +1,157 @@
+"""
+Dependency graph for Azure AI Search resources.
+
+Turns the rendered search definitions into an explicit DAG so independent resources (for example
+the RAG and NL2SQL indexes) can be provisioned concurrently while dependent ones still wait:
+
+- indexer        → datasource, target index, skillset
+- skillset       → index projection target indexes
+- knowledgeSource → search index
+- knowledgeBase   → knowledge sources
+
+Creates run in topological order (dependencies first); deletes run in reverse topological order
+(dependents first).
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+Node = Tuple[str, str]  # (REST resource type, resource name)
+
+# Top-level keys in search.j2 and the REST collection each one maps to.
+DEFINITION_KEYS = {
+    "datasources": "datasources",
+    "indexes": "indexes",
+    "skillsets": "skillsets",
+    "indexers": "indexers",
+    "knowledgeSources": "knowledgesources",
+    "knowledgeBases": "knowledgebases",
+}
+
+
+class ResourceGraph:
+    """Search resources keyed by (type, name) plus the edges between them."""
+
+    def __init__(self):
+        self.definitions: Dict[Node, dict] = {}
+        self.dependencies: Dict[Node, Set[Node]] = {}
+        self.dependents: Dict[Node, Set[Node]] = {}
+
+    @property
+    def nodes(self) -> List[Node]:
+        return list(self.definitions)
+
+    def add_node(self, node: Node, definition: dict) -> None:
+        self.definitions[node] = definition
+        self.dependencies.setdefault(node, set())
+        self.dependents.setdefault(node, set())
+
+    def add_edge(self, node: Node, depends_on: Node) -> None:
+        """Record that ``node`` needs ``depends_on``; references to undefined resources are ignored."""
+        if depends_on not in self.definitions or depends_on == node:
+            return
+        self.dependencies[node].add(depends_on)
+        self.dependents[depends_on].add(node)
+
+    def with_dependents(self, nodes: Iterable[Node]) -> Set[Node]:
+        """Return ``nodes`` plus every resource that transitively depends on them."""
+        result: Set[Node] = set()
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            if node in result:
+                continue
+            result.add(node)
+            stack.extend(self.dependents.get(node, ()))
+        return result
+
+    def topological_order(self) -> List[Node]:
+        """Dependencies before dependents; raises ValueError on a cycle."""
+        remaining = {node: len(deps) for node, deps in self.dependencies.items()}
+        ready = [node for node, count in remaining.items() if count == 0]
+        order: List[Node] = []
+        while ready:
+            node = ready.pop()
+            order.append(node)
+            for dependent in self.dependents[node]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(self.definitions):
+            cyclic = sorted(node for node, count in remaining.items() if count > 0)
+            raise ValueError(f"Dependency cycle between search resources: {cyclic}")
+        return order
+
+
+def build_resource_graph(defs: dict) -> ResourceGraph:
+    """Build the dependency graph from the rendered search.j2 definitions."""
+    graph = ResourceGraph()
+    for key, rtype in DEFINITION_KEYS.items():
+        for definition in defs.get(key) or []:
+            graph.add_node((rtype, definition["name"]), definition)
+
+    for (rtype, name), definition in graph.definitions.items():
+        node = (rtype, name)
+        if rtype == "indexers":
+            body = definition.get("body", definition)
+            if body.get("dataSourceName"):
+                graph.add_edge(node, ("datasources", body["dataSourceName"]))
+            if body.get("targetIndexName"):
+                graph.add_edge(node, ("indexes", body["targetIndexName"]))
+            if body.get("skillsetName"):
+                graph.add_edge(node, ("skillsets", body["skillsetName"]))
+        elif rtype == "skillsets":
+            for selector in (definition.get("indexProjections") or {}).get("selectors", []):
+                if selector.get("targetIndexName"):
+                    graph.add_edge(node, ("indexes", selector["targetIndexName"]))
+        elif rtype == "knowledgesources":
+            index_name = (definition.get("searchIndexParameters") or {}).get("searchIndexName")
+            if index_name:
+                graph.add_edge(node, ("indexes", index_name))
+        elif rtype == "knowledgebases":
+            for ks in definition.get("knowledgeSources") or []:
+                if ks.get("name"):
+                    graph.add_edge(node, ("knowledgesources", ks["name"]))
+
+    graph.topological_order()  # fail fast on cycles
+    return graph
+
+
+async def run_graph(
+    graph: ResourceGraph,
+    action: Callable[[Node], Awaitable[bool]],
+    reverse: bool = False,
+    only: Optional[Set[Node]] = None,
+) -> Dict[Node, bool]:
+    """
+    Run the coroutine ``action`` for every node as soon as its prerequisites have finished.
+
+    Prerequisites are a node's dependencies, or its dependents when ``reverse`` is set (deletes).
+    Nodes outside ``only`` are treated as already done. When a prerequisite fails, the node is not
+    run and is reported as failed. Concurrency is bounded by whatever ``action`` awaits (the
+    search engine's limiter). Returns {node: success}.
+    """
+    selected = set(graph.nodes) if only is None else set(only) & set(graph.nodes)
+    prerequisites = graph.dependents if reverse else graph.dependencies
+    finished = {node: asyncio.Event() for node in selected}
+    results: Dict[Node, bool] = {}
+
+    async def run(node: Node) -> None:
+        required = [p for p in prerequisites[node] if p in selected]
+        for prerequisite in required:
+            await finished[prerequisite].wait()
+        failed = [p for p in required if not results[p]]
+        if failed:
+            logging.warning(f"⏭️ Skipping {node[0]}/{node[1]}: prerequisite {failed[0][0]}/{failed[0][1]} failed")
+            results[node] = False
+        else:
+            try:
+                results[node] = bool(await action(node))
+            except Exception as e:
+                logging.error(f"❗️ {node[0]}/{node[1]} failed: {e}")
+                results[node] = False
+        finished[node].set()
+
+    await asyncio.gather(*(run(node) for node in selected))
+    return results
@@ -0,0 +1,265 @@
+"""
+Azure AI Search definition diffing.
+
+Compares a rendered resource definition (index, datasource, skillset, indexer, knowledge source
+or knowledge base) with the live definition returned by the Search service and decides the
+cheapest safe action:
+
+- ``create``:   the resource does not exist yet.
+- ``skip``:     both sides are equivalent once server-only fields and defaults are normalized.
+- ``update``:   the difference can be applied in place with a PUT (e.g. a new field or profile).
+- ``recreate``: the Search API forbids the change in place (e.g. a field type or ``dimensions``
+                change), so the resource must be deleted and created again.
+"""
+
+from typing import Any, Dict, Optional
+
+ACTION_CREATE = "create"
+ACTION_SKIP = "skip"
+ACTION_UPDATE = "update"
+ACTION_RECREATE = "recreate"
+
+# Keys only the service sets; they never take part in the comparison.
+SERVER_ONLY_KEYS = {"@odata.etag", "@odata.context"}
+
+# Keys rendered as strings by the Jinja templates but returned as numbers by the service.
+NUMERIC_KEYS = {
+    "dimensions",
+    "m",
+    "efConstruction",
+    "efSearch",
+    "maxAgeInSeconds",
+    "truncationDimension",
+    "defaultOversampling",
+}
+
+# Field attributes that cannot be changed on an existing index field.
+IMMUTABLE_FIELD_ATTRIBUTES = (
+    "type",
+    "key",
+    "searchable",
+    "filterable",
+    "sortable",
+    "facetable",
+    "stored",
+    "analyzer",
+    "indexAnalyzer",
+    "normalizer",
+    "dimensions",
+    "vectorSearchProfile",
+    "vectorEncoding",
+    "permissionFilter",
+)
+
+VECTOR_ELEMENT_TYPES = {"Edm.Single", "Edm.Half", "Edm.Int16", "Edm.SByte", "Edm.Byte"}
+
+# Index sections the service never fills in on its own: when one is set live but missing from the
+# template it was removed from the template, which ``_contains`` (desired ⊆ live) cannot see.
+OWNED_INDEX_KEYS = (
+    "semantic",
+    "scoringProfiles",
+    "defaultScoringProfile",
+    "suggesters",
+    "analyzers",
+    "tokenizers",
+    "tokenFilters",
+    "charFilters",
+    "normalizers",
+)
+OWNED_VECTOR_SEARCH_KEYS = ("compressions", "vectorizers")
+OWNED_VECTOR_PROFILE_KEYS = ("compression", "vectorizer")
+
+
+def _coerce_number(value: Any) -> Any:
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            return int(text)
+        except ValueError:
+            try:
+                return float(text)
+            except ValueError:
+                return value
+    return value
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == [] or value == {}
+
+
+def _clean(value: Any) -> Any:
+    """Drop server-only keys, nulls and empty containers; coerce numeric strings."""
+    if isinstance(value, dict):
+        cleaned = {}
+        for key, item in value.items():
+            if key in SERVER_ONLY_KEYS:
+                continue
+            item = _clean(item)
+            if key in NUMERIC_KEYS:
+                item = _coerce_number(item)
+            if _is_empty(item):
+                continue
+            cleaned[key] = item
+        return cleaned
+    if isinstance(value, list):
+        return [item for item in (_clean(v) for v in value) if not _is_empty(item)]
+    return value
+
+
+def _field_defaults(field_type: str) -> Dict[str, Any]:
+    """Attribute values the Search service assumes when a field omits them."""
+    if "ComplexType" in field_type:
+        return {}
+    is_collection = field_type.startswith("Collection(")
+    element_type = field_type[len("Collection("):-1] if is_collection else field_type
+    if is_collection and element_type in VECTOR_ELEMENT_TYPES:
+        return {
+            "key": False,
+            "retrievable": True,
+            "stored": True,
+            "filterable": False,
+            "sortable": False,
+            "facetable": False,
+        }
+    return {
+        "key": False,
+        "searchable": element_type == "Edm.String",
+        "filterable": True,
+        "sortable": not is_collection,
+        "facetable": element_type != "Edm.GeographyPoint",
+        "retrievable": True,
+        "stored": True,
+    }
+
+
+def _apply_field_defaults(fields: list) -> list:
+    result = []
+    for field in fields:
+        field = dict(field)
+        for attr, default in _field_defaults(field.get("type", "")).items():
+            field.setdefault(attr, default)
+        if field.get("fields"):
+            field["fields"] = _apply_field_defaults(field["fields"])
+        result.append(field)
+    return result
+
+
+def normalize_definition(rtype: str, definition: Optional[dict]) -> dict:
+    """Return a canonical copy of a Search resource definition suitable for comparison."""
+    normalized = _clean(definition or {})
+    if rtype == "indexes" and normalized.get("fields"):
+        normalized["fields"] = _apply_field_defaults(normalized["fields"])
+    return normalized
+
+
+def _is_named_list(value: list) -> bool:
+    return bool(value) and all(isinstance(item, dict) and "name" in item for item in value)
+
+
+def _contains(desired: Any, live: Any) -> bool:
+    """True when every value set in ``desired`` has the same value in ``live``.
+
+    Extra keys on the live side are tolerated (the service echoes back optional
+    properties), but extra items in named lists such as fields or skills are not.
+    """
+    if isinstance(desired, dict):
+        if not isinstance(live, dict):
+            return False
+        return all(key in live and _contains(value, live[key]) for key, value in desired.items())
+    if isinstance(desired, list):
+        if not isinstance(live, list) or len(desired) != len(live):
+            return False
+        if _is_named_list(desired) and _is_named_list(live):
+            live_by_name = {item["name"]: item for item in live}
+            return all(
+                item["name"] in live_by_name and _contains(item, live_by_name[item["name"]])
+                for item in desired
+            )
+        return all(_contains(d, l) for d, l in zip(desired, live))
+    return desired == live
+
+
+def _removed_index_sections(desired: dict, live: dict) -> bool:
+    """True when a section or vector profile setting is set live but no longer in the template."""
+    if any(key in live and key not in desired for key in OWNED_INDEX_KEYS):
+        return True
+    desired_vs = desired.get("vectorSearch") or {}
+    live_vs = live.get("vectorSearch") or {}
+    if any(key in live_vs and key not in desired_vs for key in OWNED_VECTOR_SEARCH_KEYS):
+        return True
+    desired_profiles = {p.get("name"): p for p in desired_vs.get("profiles") or []}
+    for profile in live_vs.get("profiles") or []:
+        desired_profile = desired_profiles.get(profile.get("name"))
+        if desired_profile is not None and any(
+            key in profile and key not in desired_profile for key in OWNED_VECTOR_PROFILE_KEYS
+        ):
+            return True
+    return False
+
+
+def _fields_require_recreate(desired_fields: list, live_fields: list) -> bool:
+    live_by_name = {f.get("name"): f for f in live_fields}
+    desired_names = {f.get("name") for f in desired_fields}
+    # Fields can never be removed from an existing index.
+    if any(name not in desired_names for name in live_by_name):
+        return True
+    for field in desired_fields:
+        live = live_by_name.get(field.get("name"))
+        if live is None:
+            continue  # new fields are additive
+        live_with_defaults = dict(_field_defaults(live.get("type", "")), **live)
+        # Only attributes the template sets explicitly are compared, so an unexpected
+        # service default can at worst trigger an in-place PUT, never a rebuild.
+        for attr in IMMUTABLE_FIELD_ATTRIBUTES:
+            if attr in field and field[attr] != live_with_defaults.get(attr):
+                return True
+        if field.get("fields") and _fields_require_recreate(field["fields"], live.get("fields") or []):
+            return True
+    return False
+
+
+def _profile_compressions(definition: dict) -> Dict[str, Any]:
+    profiles = (definition.get("vectorSearch") or {}).get("profiles") or []
+    return {profile.get("name"): profile.get("compression") for profile in profiles}
+
+
+def _vector_compression_changed(desired: dict, live: dict) -> bool:
+    """Compression of a profile already used by an existing vector field cannot be changed."""
+    desired_profiles = _profile_compressions(desired)
+    live_profiles = _profile_compressions(live)
+    live_fields = {f.get("name") for f in live.get("fields", [])}
+    for field in desired.get("fields", []):
+        profile = field.get("vectorSearchProfile")
+        if not profile or field.get("name") not in live_fields or profile not in live_profiles:
+            continue
+        if desired_profiles.get(profile) != live_profiles[profile]:
+            return True
+    return False
+
+
+def requires_recreate(rtype: str, desired: dict, live: dict) -> bool:
+    """True when the change between ``live`` and ``desired`` cannot be applied in place."""
+    if rtype == "indexes":
+        return (
+            _fields_require_recreate(desired.get("fields", []), live.get("fields", []))
+            or _vector_compression_changed(desired, live)
+        )
+    if rtype == "datasources":
+        return desired.get("type") != live.get("type")
+    if rtype == "knowledgesources":
+        return desired.get("kind") != live.get("kind")
+    return False
+
+
+def plan_action(rtype: str, desired: dict, live: Optional[dict]) -> str:
+    """Decide how to bring ``live`` in line with ``desired``."""
+    if live is None:
+        return ACTION_CREATE
+    desired_norm = _clean(desired)
+    live_norm = _clean(live)
+    removed = rtype == "indexes" and _removed_index_sections(desired_norm, live_norm)
+    if not removed and _contains(normalize_definition(rtype, desired_norm), normalize_definition(rtype, live_norm)):
+        return ACTION_SKIP
+    if requires_recreate(rtype, desired_norm, live_norm):
+        return ACTION_RECREATE
+    return ACTION_UPDATE
@@ -0,0 +1,100 @@
+"""
+Change-only write-back of the values rendered from search.settings.j2 into App Configuration.
+
+Every rendered value is compared with the setting already loaded from App Config (same label):
+
+- equal values (including JSON that only differs in formatting) are not written, so they create
+  no new revision and no change notification for the apps watching App Config;
+- changed values are written with ``If-Match: <etag>`` and new keys with ``If-None-Match: *``, so a
+  concurrent run that changed the same key in the meantime makes the write fail instead of being
+  silently overwritten;
+- the remaining writes run concurrently on a bounded thread pool (SEARCH_SETTINGS_WRITE_WORKERS).
+"""
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from azure.appconfiguration import AzureAppConfigurationClient, ConfigurationSetting
+
+DEFAULT_WRITE_WORKERS = 8
+
+
+class SeedSummary(NamedTuple):
+    changed: List[str]
+    unchanged: List[str]
+    failed: List[str]
+
+
+def serialize_setting_value(value: Any) -> str:
+    return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+
+
+def _same_value(current: Optional[str], desired: str) -> bool:
+    if current == desired:
+        return True
+    if current is None:
+        return False
+    try:
+        return json.loads(current) == json.loads(desired)
+    except (TypeError, ValueError):
+        return False
+
+
+def get_write_workers(context: dict) -> int:
+    try:
+        return max(1, int(context.get("SEARCH_SETTINGS_WRITE_WORKERS") or DEFAULT_WRITE_WORKERS))
+    except (TypeError, ValueError):
+        return DEFAULT_WRITE_WORKERS
+
+
+def seed_settings(
+    ac_client: "AzureAppConfigurationClient",
+    values: Dict[str, Any],
+    existing: Dict[str, "ConfigurationSetting"],
+    label: str,
+    max_workers: int = DEFAULT_WRITE_WORKERS,
+) -> SeedSummary:
+    """
+    Write the keys of ``values`` whose value differs from ``existing`` (the settings loaded for
+    ``label``, keyed by name) and return which keys changed, were unchanged or failed.
+    """
+    from azure.appconfiguration import ConfigurationSetting
+    from azure.core import MatchConditions
+    from azure.core.exceptions import ResourceExistsError, ResourceModifiedError
+
+    unchanged, pending = [], []
+    for key, value in values.items():
+        final_val = serialize_setting_value(value)
+        current = existing.get(key)
+        if current is not None and _same_value(current.value, final_val):
+            unchanged.append(key)
+        else:
+            pending.append((key, final_val, current))
+
+    def write(key: str, final_val: str, current: Optional["ConfigurationSetting"]) -> bool:
+        setting = ConfigurationSetting(key=key, label=label, value=final_val, content_type="text/plain")
+        try:
+            if current is None:
+                ac_client.set_configuration_setting(setting, match_condition=MatchConditions.IfMissing)
+            else:
+                ac_client.set_configuration_setting(setting, match_condition=MatchConditions.IfNotModified, etag=current.etag)
+            logging.info(f"📝 Set App Config '{key}' = '{final_val}'")
+            return True
+        except (ResourceModifiedError, ResourceExistsError):
+            logging.error(f"❗️ '{key}' was changed by someone else since it was read; not overwriting it.")
+        except Exception as e:
+            logging.error(f"❗️ Failed to set '{key}': {e}")
+        return False
+
+    changed, failed = [], []
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as pool:
+            outcomes = list(pool.map(lambda item: write(*item), pending))
+        for (key, _, _), ok in zip(pending, outcomes):
+            (changed if ok else failed).append(key)
+
+    logging.info(f"App Config seeding: {len(changed)} changed, {len(unchanged)} unchanged, {len(failed)} failed")
+    return SeedSummary(changed, unchanged, failed)
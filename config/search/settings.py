@@ -0,0 +1,51 @@
+"""
+Helpers for interpreting App Configuration values used by the search templates.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict
+
+from ..snapshot import get_snapshot
+
+
+def parse_json_like_setting(value: Any) -> Any:
+    if isinstance(value, str) and value.strip().startswith(("{", "[")):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            if '\\"' in value:
+                try:
+                    return json.loads(value.replace('\\"', '"'))
+                except json.JSONDecodeError:
+                    return value
+            return value
+    return value
+
+
+def normalize_json_like_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: parse_json_like_setting(value) for key, value in settings.items()}
+
+
+def is_truthy_setting(value: Any) -> bool:
+    return str(value).strip().lower() in {"1", "true", "t", "yes", "y"}
+
+
+def write_json_setting(key: str, value: Any, credential, label: str) -> bool:
+    """Store ``value`` as a JSON App Config setting under ``label``; returns False when APP_CONFIG_ENDPOINT is not set."""
+    endpoint = os.getenv("APP_CONFIG_ENDPOINT")
+    if not endpoint:
+        logging.warning(f"❗️ APP_CONFIG_ENDPOINT not set; {key} was not saved.")
+        return False
+    from azure.appconfiguration import ConfigurationSetting
+
+    client = get_snapshot(endpoint, credential, label).client
+    client.set_configuration_setting(ConfigurationSetting(
+        key=key,
+        label=label,
+        value=json.dumps(value),
+        content_type="application/json",
+    ))
+    logging.info(f"📝 Saved {key} to App Config")
+    return True
@@ -15,10 +15,25 @@ Prerequisites:
 - The Jinja2 templates for search (search.j2, search.settings.j2) must exist and be valid in the config/search directory.
 
 Features:
-- Loads settings from Azure App Configuration (optionally filtered by label).
+- Loads settings from Azure App Configuration through the shared label snapshot, which is cached locally and revalidated
+  with page ETags on the next run (see config/snapshot.py).
 - Renders Jinja2 templates for search resource definitions, supporting variable expansion from App Config.
-- Seeds variables from a secondary template (e.g., search.settings.j2) back into App Configuration.
-- Provisions or updates Azure Search datasources, indexes, skillsets, and indexers in a safe order, cleaning up dependencies as needed.
+- Seeds variables from a secondary template (e.g., search.settings.j2) back into App Configuration, writing only changed
+  keys with ETag-conditional requests on a bounded thread pool; see seeding.py.
+- Provisions or updates Azure Search datasources, indexes, skillsets, indexers, knowledge sources and knowledge bases along
+  their dependency graph, running independent resources concurrently (SEARCH_SETUP_MAX_WORKERS, default 4).
+- Reconcile mode (SEARCH_PROVISIONING_MODE=reconcile, the default) compares each live definition with the rendered one and
+  skips unchanged resources, updates additive changes in place, and only recreates resources (dropping indexed data) when
+  the Search API forbids the change. Set SEARCH_PROVISIONING_MODE=recreate to always delete and recreate.
+- Runs the Search REST calls on an asyncio engine that follows Retry-After headers, backs off with jitter on
+  transient 5xx errors, and lowers its concurrency while the service throttles.
+- Optional blue/green index rebuilds (SEARCH_INDEX_VERSIONING=true): a rebuild creates `<index>-vN` next to the live index
+  and repoints the `<index>` alias once it is ready, instead of deleting the live index first. Requires
+  SEARCH_INDEX_READINESS, and an ingestion that fills the pending index per the contract in versioning.py.
+- Caches rendered templates keyed by their source and referenced inputs; unchanged settings are not written back and
+  unchanged definitions are not provisioned again (SEARCH_FORCE_APPLY=true overrides); see cache.py.
+- Applies vector storage options from App Config (SEARCH_VECTOR_*: scalar/binary compression with rescoring, non-stored
+  vectors, Edm.Half elements, truncation) to the rendered indexes; see vectors.py.
 - Handles authentication via Managed Identity or Azure CLI.
 - Logs all actions and errors, and continues on non-fatal errors (fail gracefully).
 
@@ -28,16 +43,29 @@ Run this script after provisioning your Azure Search service and App Configurati
 
 import os
 import time
+import asyncio
 import json
 import logging
 from pathlib import Path
-import requests
-from typing import Any, Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
-from azure.identity import ManagedIdentityCredential, AzureCliCredential, ChainedTokenCredential
-from azure.appconfiguration import AzureAppConfigurationClient, ConfigurationSetting
 from jinja2 import Environment, FileSystemLoader, StrictUndefined, TemplateError
 
+from ..runtime import get_credential, get_http_session
+from ..snapshot import AppConfigSnapshot, get_snapshot
+from .cache import RENDER_HASH_KEY, RenderCache, template_digest
+from .client import SearchClient
+from .engine import SearchEngine
+from .graph import DEFINITION_KEYS, Node, ResourceGraph, build_resource_graph, run_graph
+from .reconcile import ACTION_CREATE, ACTION_RECREATE, ACTION_SKIP, ACTION_UPDATE, plan_action
+from .seeding import get_write_workers, seed_settings
+from .settings import is_truthy_setting, normalize_json_like_settings, parse_json_like_setting
+from .vectors import resolve_vector_options
+from .versioning import has_pending_versions, stage_versioned_indexes, versioning_enabled
+
+if TYPE_CHECKING:
+    from azure.appconfiguration import ConfigurationSetting
+
 # ── Silence verbose logging ─────────────────────────────────────────────────
 for logger_name in (
     "azure.core.pipeline.policies.http_logging_policy",
@@ -52,30 +80,11 @@ TEMPLATE_NAME = "search.j2"
 VARS_TEMPLATE = "search.settings.j2"
 LABEL_FILTER = "gpt-rag"
 DEFAULT_KNOWLEDGE_API_VERSION = "2026-05-01-preview"
+PROVISIONING_MODE_RECONCILE = "reconcile"
+DEFAULT_MAX_WORKERS = 4
+KNOWLEDGE_RESOURCE_TYPES = ("knowledgesources", "knowledgebases")
 
 # ── App Config Loader ───────────────────────────────────────────────────────
-def parse_json_like_setting(value: Any) -> Any:
-    if isinstance(value, str) and value.strip().startswith(("{", "[")):
-        try:
-            return json.loads(value)
-        except json.JSONDecodeError:
-            if '\\"' in value:
-                try:
-                    return json.loads(value.replace('\\"', '"'))
-                except json.JSONDecodeError:
-                    return value
-            return value
-    return value
-
-
-def normalize_json_like_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
-    return {key: parse_json_like_setting(value) for key, value in settings.items()}
-
-
-def is_truthy_setting(value: Any) -> bool:
-    return str(value).strip().lower() in {"1", "true", "t", "yes", "y"}
-
-
 def normalize_foundry_iq_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
     kind = str(settings.get("FOUNDRY_IQ_KNOWLEDGE_SOURCE_KIND") or "").lower()
     is_adls_gen2 = is_truthy_setting(settings.get("FOUNDRY_IQ_IS_ADLS_GEN2"))
@@ -89,128 +98,109 @@ def normalize_foundry_iq_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
     return settings
 
 
-def load_appconfig_settings(ac_client: AzureAppConfigurationClient, label_filter: Optional[str] = None) -> Dict[str, Any]:
+def load_appconfig_settings(
+    snapshot: AppConfigSnapshot,
+    raw_settings: Optional[Dict[str, "ConfigurationSetting"]] = None,
+) -> Dict[str, Any]:
     """
-    Reads all settings from App Configuration under given label_filter (or None for no label).
+    Reads all settings of the snapshot's label from App Configuration (or the revalidated local cache).
     Returns a dict: { key: parsed_value_or_string }.
     If a value is JSON (starts with { or [), attempts json.loads; on failure, keeps as string.
+    When raw_settings is given, it is filled with the ConfigurationSetting objects (value and etag) by key.
     """
     ctx = {}
     try:
-        for setting in ac_client.list_configuration_settings(key_filter="*", label_filter=label_filter):
-            ctx[setting.key] = parse_json_like_setting(setting.value)
+        for key, setting in snapshot.load().items():
+            ctx[key] = parse_json_like_setting(setting.value)
+            if raw_settings is not None:
+                raw_settings[key] = setting
     except Exception as e:
         logging.error(f"Error listing App Configuration settings: {e}")
     return ctx
 
-# ── Template Rendering ─────────────────────────────────────────────────────-
-def prepare_context_and_render(template_name: str, template_dir: str, label_filter: str = LABEL_FILTER) -> Tuple[Optional[dict], dict]:
-    """
-    Loads settings from App Config, renders templates, and returns (rendered_definitions, context).
-    Returns (None, context) on fatal error.
-    """
-    ac_endpoint = os.getenv("APP_CONFIG_ENDPOINT")
-    if not ac_endpoint:
-        logging.error("APP_CONFIG_ENDPOINT not set")
-        return None, {}
-
-    cred = ChainedTokenCredential(
-            AzureCliCredential(process_timeout=30),
-            ManagedIdentityCredential(process_timeout=30)
-        )
+# ── Model Info ──────────────────────────────────────────────────────────────
+def extract_embedding_model_info(ctx: dict) -> dict:
+    """Extract embedding model information from MODEL_DEPLOYMENTS JSON"""
     try:
-        ac_client = AzureAppConfigurationClient(ac_endpoint, cred)
-    except Exception as e:
-        logging.error(f"Failed to create AzureAppConfigurationClient: {e}")
-        return None, {}
-
-    context = load_appconfig_settings(ac_client, label_filter=label_filter)
-    
-    # ── Extract embedding model info from MODEL_DEPLOYMENTS ──────────────────────────────────────
-    def extract_embedding_model_info(ctx: dict) -> dict:
-        """Extract embedding model information from MODEL_DEPLOYMENTS JSON"""
-        try:
-            model_deployments_str = ctx.get("MODEL_DEPLOYMENTS", "[]")
-            if isinstance(model_deployments_str, str):
-                model_deployments = json.loads(model_deployments_str)
-            else:
-                model_deployments = model_deployments_str
-            
-            # Find the embedding model by canonical_name
-            for model in model_deployments:
-                if model.get("canonical_name") == "EMBEDDING_DEPLOYMENT_NAME":
-                    embedding_info = {
-                        "deployment_name": model.get("name", "text-embedding"),
-                        "model_name": model.get("model", {}).get("name", "text-embedding-3-large") if isinstance(model.get("model"), dict) else model.get("model", "text-embedding-3-large"),
-                        "endpoint": model.get("endpoint", ""),
-                        "api_version": model.get("apiVersion", "2025-01-01-preview")
-                    }
-                    logging.info(f"✅ Found embedding model: {embedding_info['deployment_name']} at {embedding_info['endpoint']}")
-                    return embedding_info
-            
-            logging.warning("❗️ Embedding model with canonical_name 'EMBEDDING_DEPLOYMENT_NAME' not found in MODEL_DEPLOYMENTS")
-            return {}
-            
-        except (json.JSONDecodeError, KeyError, TypeError) as e:
-            logging.error(f"❗️ Could not extract embedding model info: {e}")
-            return {}
-
-    # ── Extract GPT model info from MODEL_DEPLOYMENTS ──────────────────────────────────────
-    def extract_gpt_model_info(ctx: dict) -> dict:
-        """Extract GPT model information from MODEL_DEPLOYMENTS JSON for knowledge agents"""
-        try:
-            model_deployments_str = ctx.get("MODEL_DEPLOYMENTS", "[]")
-            if isinstance(model_deployments_str, str):
-                model_deployments = json.loads(model_deployments_str)
-            else:
-                model_deployments = model_deployments_str
-            
-            # Find the GPT model by canonical_name (same approach as embedding model)
-            for model in model_deployments:
-                if model.get("canonical_name") == "CHAT_DEPLOYMENT_NAME":
-                    model_obj = model.get("model")
-                    if isinstance(model_obj, dict):
-                        model_name = model_obj.get("name")
-                        model_format = model_obj.get("format")
-                    else:
-                        model_name = model_obj
-                        model_format = None
-
-                    gpt_info = {
-                        "deployment_name": model.get("name"),
-                        "model_name": model_name,
-                        "model_format": model_format,
-                        "endpoint": model.get("endpoint", ""),
-                        "api_version": model.get("apiVersion", "2025-01-01-preview")
-                    }
-
-                    model_format_l = (gpt_info.get("model_format") or "").lower()
-                    if model_format_l != "openai":
-                        logging.info(
-                            "ℹ️ CHAT_DEPLOYMENT_NAME ignored because model.format is not OpenAI "
-                            f"(format='{gpt_info.get('model_format')}', model='{gpt_info.get('model_name')}')"
-                        )
-                        return {}
-
+        model_deployments_str = ctx.get("MODEL_DEPLOYMENTS", "[]")
+        if isinstance(model_deployments_str, str):
+            model_deployments = json.loads(model_deployments_str)
+        else:
+            model_deployments = model_deployments_str
+
+        # Find the embedding model by canonical_name
+        for model in model_deployments:
+            if model.get("canonical_name") == "EMBEDDING_DEPLOYMENT_NAME":
+                embedding_info = {
+                    "deployment_name": model.get("name", "text-embedding"),
+                    "model_name": model.get("model", {}).get("name", "text-embedding-3-large") if isinstance(model.get("model"), dict) else model.get("model", "text-embedding-3-large"),
+                    "endpoint": model.get("endpoint", ""),
+                    "api_version": model.get("apiVersion", "2025-01-01-preview")
+                }
+                logging.info(f"✅ Found embedding model: {embedding_info['deployment_name']} at {embedding_info['endpoint']}")
+                return embedding_info
+
+        logging.warning("❗️ Embedding model with canonical_name 'EMBEDDING_DEPLOYMENT_NAME' not found in MODEL_DEPLOYMENTS")
+        return {}
+
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        logging.error(f"❗️ Could not extract embedding model info: {e}")
+        return {}
+
+
+def extract_gpt_model_info(ctx: dict) -> dict:
+    """Extract GPT model information from MODEL_DEPLOYMENTS JSON for knowledge agents"""
+    try:
+        model_deployments_str = ctx.get("MODEL_DEPLOYMENTS", "[]")
+        if isinstance(model_deployments_str, str):
+            model_deployments = json.loads(model_deployments_str)
+        else:
+            model_deployments = model_deployments_str
+
+        # Find the GPT model by canonical_name (same approach as embedding model)
+        for model in model_deployments:
+            if model.get("canonical_name") == "CHAT_DEPLOYMENT_NAME":
+                model_obj = model.get("model")
+                if isinstance(model_obj, dict):
+                    model_name = model_obj.get("name")
+                    model_format = model_obj.get("format")
+                else:
+                    model_name = model_obj
+                    model_format = None
+
+                gpt_info = {
+                    "deployment_name": model.get("name"),
+                    "model_name": model_name,
+                    "model_format": model_format,
+                    "endpoint": model.get("endpoint", ""),
+                    "api_version": model.get("apiVersion", "2025-01-01-preview")
+                }
+
+                model_format_l = (gpt_info.get("model_format") or "").lower()
+                if model_format_l != "openai":
                     logging.info(
-                        f"✅ Found GPT model: {gpt_info['deployment_name']} ({gpt_info['model_name']}, format={gpt_info.get('model_format')}) at {gpt_info['endpoint']}"
+                        "ℹ️ CHAT_DEPLOYMENT_NAME ignored because model.format is not OpenAI "
+                        f"(format='{gpt_info.get('model_format')}', model='{gpt_info.get('model_name')}')"
                     )
-                    return gpt_info
-            
-            logging.warning("❗️ GPT model with canonical_name 'CHAT_DEPLOYMENT_NAME' not found in MODEL_DEPLOYMENTS")
-            return {}
-            
-        except (json.JSONDecodeError, KeyError, TypeError) as e:
-            logging.error(f"❗️ Could not extract GPT model info: {e}")
-            return {}
-
-    # Add embedding model info to context for agentic retrieval
-    embedding_model_info = extract_embedding_model_info(context)
-    context["EMBEDDING_MODEL_INFO"] = embedding_model_info or {}
-
-    # Add GPT model info to context for knowledge agents
-    gpt_model_info = extract_gpt_model_info(context)
-    context["GPT_MODEL_INFO"] = gpt_model_info or {}
+                    return {}
+
+                logging.info(
+                    f"✅ Found GPT model: {gpt_info['deployment_name']} ({gpt_info['model_name']}, format={gpt_info.get('model_format')}) at {gpt_info['endpoint']}"
+                )
+                return gpt_info
+
+        logging.warning("❗️ GPT model with canonical_name 'CHAT_DEPLOYMENT_NAME' not found in MODEL_DEPLOYMENTS")
+        return {}
+
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        logging.error(f"❗️ Could not extract GPT model info: {e}")
+        return {}
+
+
+def add_model_info(context: dict) -> dict:
+    """Add EMBEDDING_MODEL_INFO and GPT_MODEL_INFO (used by vectorizers and knowledge agents) to the context."""
+    context["EMBEDDING_MODEL_INFO"] = extract_embedding_model_info(context) or {}
+    context["GPT_MODEL_INFO"] = extract_gpt_model_info(context) or {}
 
     # Debug logging
     if context.get("EMBEDDING_MODEL_INFO"):
@@ -222,274 +212,386 @@ def prepare_context_and_render(template_name: str, template_dir: str, label_filt
         logging.info(f"🔍 GPT_MODEL_INFO = {context['GPT_MODEL_INFO']}")
     else:
         logging.info("ℹ️ GPT_MODEL_INFO is empty")
+    return context
 
-    env = Environment(
+# ── Template Rendering ─────────────────────────────────────────────────────-
+def create_template_environment(template_dir: str) -> Environment:
+    return Environment(
         loader=FileSystemLoader(template_dir),
         undefined=StrictUndefined,
         keep_trailing_newline=True,
     )
 
-    def render_and_parse_json(template_name_inner: str, ctx: dict) -> Optional[dict]:
-        try:
-            tmpl = env.get_template(template_name_inner)
-            rendered = tmpl.render(**ctx)
-        except TemplateError as te:
-            logging.error(f"Jinja2 rendering error for {template_name_inner}: {te}")
-            return None
-        try:
-            parsed = json.loads(rendered)
-        except json.JSONDecodeError as je:
-            logging.error(f"Rendered JSON from {template_name_inner} is invalid: {je}\nRendered content:\n{rendered}")
-            return None
-        if not isinstance(parsed, dict):
-            logging.error(f"Expected JSON object from {template_name_inner}, got: {type(parsed)}")
-            return None
-        return parsed
-
-    # Process a vars template first
+
+def render_and_parse_json(env: Environment, template_name: str, ctx: dict) -> Optional[dict]:
+    try:
+        tmpl = env.get_template(template_name)
+        rendered = tmpl.render(**ctx)
+    except TemplateError as te:
+        logging.error(f"Jinja2 rendering error for {template_name}: {te}")
+        return None
+    try:
+        parsed = json.loads(rendered)
+    except json.JSONDecodeError as je:
+        logging.error(f"Rendered JSON from {template_name} is invalid: {je}\nRendered content:\n{rendered}")
+        return None
+    if not isinstance(parsed, dict):
+        logging.error(f"Expected JSON object from {template_name}, got: {type(parsed)}")
+        return None
+    return parsed
+
+
+def render_cached(env: Environment, template_name: str, context: dict, cache: Optional[RenderCache] = None) -> Optional[dict]:
+    """Render a template, reusing the cached output when its source and referenced inputs are unchanged."""
+    if cache is None:
+        return render_and_parse_json(env, template_name, context)
+    digest = template_digest(env, template_name, context)
+    context.setdefault(RENDER_HASH_KEY, {})[template_name] = digest
+    rendered = cache.rendered(template_name, digest)
+    if rendered is not None:
+        logging.info(f"♻️ {template_name} inputs unchanged; using cached render.")
+        return rendered
+    rendered = render_and_parse_json(env, template_name, context)
+    if rendered is not None:
+        cache.store(template_name, digest, rendered)
+    return rendered
+
+
+def render_settings(env: Environment, template_dir: str, context: dict, cache: Optional[RenderCache] = None) -> Optional[dict]:
+    """Render the vars template (search.settings.j2) and merge its values into the context."""
     vars_path = Path(template_dir) / VARS_TEMPLATE
-    if vars_path.exists():
-        logging.info(f"Processing variable template {VARS_TEMPLATE}")
-        vars_dict = render_and_parse_json(VARS_TEMPLATE, context)
-        if vars_dict:
-            vars_dict = normalize_foundry_iq_settings(normalize_json_like_settings(vars_dict))
-            context.update(vars_dict)
-            for key, val in vars_dict.items():
-                if isinstance(val, (dict, list)):
-                    final_val = json.dumps(val)
-                else:
-                    final_val = str(val)
-                try:
-                    setting = ConfigurationSetting(
-                        key=key,
-                        label=label_filter,
-                        value=final_val,
-                        content_type="text/plain"
-                    )
-                    ac_client.set_configuration_setting(setting)
-                    logging.info(f"📝 Set App Config '{key}' = '{final_val}'")
-                except Exception as e:
-                    logging.error(f"❗️ Failed to set '{key}': {e}")
-    else:
+    if not vars_path.exists():
         logging.info(f"{VARS_TEMPLATE} not found; skipping variable template step.")
-
-    # Process the main template
-    result = render_and_parse_json(template_name, context)
+        return None
+    logging.info(f"Processing variable template {VARS_TEMPLATE}")
+    vars_dict = render_cached(env, VARS_TEMPLATE, context, cache)
+    if vars_dict:
+        vars_dict = normalize_foundry_iq_settings(normalize_json_like_settings(vars_dict))
+        context.update(vars_dict)
+    return vars_dict
+
+
+def render_definitions(env: Environment, template_name: str, context: dict, cache: Optional[RenderCache] = None) -> Optional[dict]:
+    """Render the main template with the per-index vector options resolved from the context."""
+    context["VECTOR_OPTIONS"] = resolve_vector_options(context)
+    result = render_cached(env, template_name, context, cache)
     if result is None:
         logging.error(f"Template {template_name} could not be rendered or parsed.")
     logging.debug(f"Rendered definitions: {json.dumps(result, indent=2) if result else 'None'}")
-    return result, context
+    return result
+
+
+def render_offline(context: dict, template_name: str = TEMPLATE_NAME, template_dir: Optional[str] = None) -> Tuple[Optional[dict], dict]:
+    """
+    Render the search definitions from a local context (e.g. an exported App Config snapshot)
+    without touching App Configuration. Returns (rendered_definitions, context).
+    """
+    template_dir = template_dir or str(Path(__file__).resolve().parent)
+    context = normalize_foundry_iq_settings(normalize_json_like_settings(dict(context)))
+    add_model_info(context)
+    env = create_template_environment(template_dir)
+    render_settings(env, template_dir, context)
+    return render_definitions(env, template_name, context), context
+
+
+def prepare_context_and_render(
+    template_name: str,
+    template_dir: str,
+    label_filter: str = LABEL_FILTER,
+    credential=None,
+) -> Tuple[Optional[dict], dict]:
+    """
+    Loads settings from App Config, renders templates, and returns (rendered_definitions, context).
+    Returns (None, context) on fatal error.
+    """
+    ac_endpoint = os.getenv("APP_CONFIG_ENDPOINT")
+    if not ac_endpoint:
+        logging.error("APP_CONFIG_ENDPOINT not set")
+        return None, {}
+
+    cred = credential or get_credential()
+    try:
+        snapshot = get_snapshot(ac_endpoint, cred, label_filter)
+    except Exception as e:
+        logging.error(f"Failed to create AzureAppConfigurationClient: {e}")
+        return None, {}
+
+    raw_settings: Dict[str, "ConfigurationSetting"] = {}
+    context = load_appconfig_settings(snapshot, raw_settings=raw_settings)
+    add_model_info(context)
+    env = create_template_environment(template_dir)
+    cache = RenderCache.from_context(context)
+
+    # Process a vars template first and seed its values back into App Config
+    vars_dict = render_settings(env, template_dir, context, cache)
+    settings_digest = (context.get(RENDER_HASH_KEY) or {}).get(VARS_TEMPLATE)
+    if cache and settings_digest and cache.is_applied(VARS_TEMPLATE, settings_digest):
+        logging.info(f"✅ {VARS_TEMPLATE} values already applied to App Config; skipping write-back.")
+    else:
+        summary = seed_settings(snapshot.client, vars_dict or {}, raw_settings, label_filter, get_write_workers(context))
+        if summary.changed or summary.failed:
+            snapshot.invalidate()
+        if cache and vars_dict and not summary.failed:
+            # The next run reads the values just written, so record the digest of the merged context.
+            applied_digest = template_digest(env, VARS_TEMPLATE, context)
+            cache.store(VARS_TEMPLATE, applied_digest, vars_dict)
+            cache.mark_applied(VARS_TEMPLATE, applied_digest, context, cred, label_filter)
+
+    # Process the main template
+    return render_definitions(env, template_name, context, cache), context
 
 # ── Azure Search API Call ─────────────────────────────────────────────────--
-def call_search_api(endpoint: str, api_version: str, rtype: str, rname: str, method: str, cred: ChainedTokenCredential, body: Any = None, max_retries: int = 3) -> bool:
+async def call_search_api(engine: SearchEngine, api_version: str, rtype: str, rname: str, method: str, body: Any = None) -> bool:
     """
-    Call Azure Search REST API with retry logic for authentication failures.
+    Call Azure Search REST API through the engine, which retries throttled and transient failures.
     """
-    for attempt in range(max_retries):
-        try:
-            # Get fresh token on each attempt
-            token = cred.get_token("https://search.azure.com/.default").token
-            headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-            url = f"{endpoint}/{rtype}/{rname}?api-version={api_version}"
-            resp = getattr(requests, method.lower())(url, headers=headers, json=body)
-            
-            if method.lower() == "delete" and resp.status_code == 404:
-                logging.info(f"✅ {rtype.capitalize()} '{rname}' does not exist; skipping deletion.")
-                return True
-            
-            if resp.status_code >= 400:
-                logging.warning(f"❗️ {method.upper()} {rtype}/{rname} failed {resp.status_code}: {resp.text}")
-                return False
-            else:
-                logging.info(f"✅ {method.upper()} {rtype}/{rname} succeeded ({resp.status_code})")
-                return True
-                
-        except Exception as e:
-            if attempt == max_retries - 1:
-                logging.error(f"❗️ Exception during {method.upper()} {rtype}/{rname}: {e}")
-                return False
-            else:
-                logging.warning(f"⚠️ Attempt {attempt + 1}/{max_retries} failed for {method.upper()} {rtype}/{rname}: {e}")
-                logging.warning(f"    Retrying in 2 seconds...")
-                time.sleep(2)
-                # Continue to next attempt - cred.get_token() will be called again
+    resp = await engine.request(method, rtype, rname, api_version, body)
+    if resp is None:
+        return False
 
-    return False  # Should never reach here, but just in case
+    if method.lower() == "delete" and resp.status_code == 404:
+        logging.info(f"✅ {rtype.capitalize()} '{rname}' does not exist; skipping deletion.")
+        return True
 
-# ── Resource Provisioning ─────────────────────────────────────────────────--
-def provision_datasources(defs: dict, context: dict, cred: ChainedTokenCredential, ds_to_indexers: dict, search_endpoint: str, api_version: str):
-    logging.info("Creating datasources...")
-    for ds in defs.get("datasources", []):
-        name = ds["name"]
-        body = {k: v for k, v in ds.items() if k != "name"}
-        for ix_name in ds_to_indexers.get(name, []):
-            call_search_api(search_endpoint, api_version, "indexers", ix_name, "delete", cred)
-        call_search_api(search_endpoint, api_version, "datasources", name, "delete", cred)
-        call_search_api(search_endpoint, api_version, "datasources", name, "put", cred, body)
-
-def provision_indexes(defs: dict, context: dict, cred: ChainedTokenCredential, search_endpoint: str, api_version: str):
-    logging.info("Creating indexes...")
-    for idx in defs.get("indexes", []):
-        body = idx
-        name = body["name"]
-        call_search_api(search_endpoint, api_version, "indexes", name, "delete", cred)
-        call_search_api(search_endpoint, api_version, "indexes", name, "put", cred, body)
-
-def provision_skillsets(defs: dict, context: dict, cred: ChainedTokenCredential, search_endpoint: str, api_version: str):
-    logging.info("Creating skillsets...")
-    for sk in defs.get("skillsets", []):
-        body = sk
-        for s in body.get("skills", []):
-            uri = s.get("uri", "")
-            if uri and not uri.startswith("http"):
-                s["uri"] = "https://" + uri.lstrip("/")
-        name = body["name"]
-        call_search_api(search_endpoint, api_version, "skillsets", name, "delete", cred)
-        call_search_api(search_endpoint, api_version, "skillsets", name, "put", cred, body)
-
-def provision_indexers(defs: dict, context: dict, cred: ChainedTokenCredential, search_endpoint: str, api_version: str):
-    logging.info("Creating indexers...")
-    for ix in defs.get("indexers", []):
-        name = ix["name"]
-        body = ix["body"]
-        call_search_api(search_endpoint, api_version, "indexers", name, "delete", cred)
-        call_search_api(search_endpoint, api_version, "indexers", name, "put", cred, body)
+    if resp.status_code >= 400:
+        logging.warning(f"❗️ {method.upper()} {rtype}/{rname} failed {resp.status_code}: {resp.text}")
+        return False
+    logging.info(f"✅ {method.upper()} {rtype}/{rname} succeeded ({resp.status_code})")
+    return True
+
+async def get_search_resource(engine: SearchEngine, api_version: str, rtype: str, rname: str) -> Tuple[bool, Optional[dict]]:
+    """
+    GET the live definition of a Search resource.
+    Returns (ok, definition); definition is None when the resource does not exist.
+    """
+    resp = await engine.request("get", rtype, rname, api_version)
+    if resp is None:
+        return False, None
+    if resp.status_code == 404:
+        return True, None
+    if resp.status_code >= 400:
+        logging.warning(f"❗️ GET {rtype}/{rname} failed {resp.status_code}: {resp.text}")
+        return False, None
+    try:
+        return True, resp.json()
+    except ValueError as e:
+        logging.warning(f"❗️ GET {rtype}/{rname} returned invalid JSON: {e}")
+        return False, None
+
+# ── Provisioning Options ──────────────────────────────────────────────────--
+def is_reconcile_mode(context: dict) -> bool:
+    return str(context.get("SEARCH_PROVISIONING_MODE") or PROVISIONING_MODE_RECONCILE).strip().lower() == PROVISIONING_MODE_RECONCILE
+
+def get_max_workers(context: dict) -> int:
+    try:
+        return max(1, int(context.get("SEARCH_SETUP_MAX_WORKERS") or DEFAULT_MAX_WORKERS))
+    except (TypeError, ValueError):
+        logging.warning(f"❗️ Invalid SEARCH_SETUP_MAX_WORKERS; using {DEFAULT_MAX_WORKERS}.")
+        return DEFAULT_MAX_WORKERS
 
 def get_knowledge_api_version(context: dict) -> str:
     return str(context.get("FOUNDRY_IQ_API_VERSION") or DEFAULT_KNOWLEDGE_API_VERSION)
 
+def get_resource_api_version(rtype: str, context: dict, api_version: str) -> str:
+    return get_knowledge_api_version(context) if rtype in KNOWLEDGE_RESOURCE_TYPES else api_version
+
+def get_resource_body(rtype: str, definition: dict) -> dict:
+    """Return the REST request body for a rendered definition."""
+    if rtype == "datasources":
+        return {k: v for k, v in definition.items() if k != "name"}
+    if rtype == "indexers":
+        return definition["body"]
+    if rtype == "skillsets":
+        for s in definition.get("skills", []):
+            uri = s.get("uri", "")
+            if uri and not uri.startswith("http"):
+                s["uri"] = "https://" + uri.lstrip("/")
+    return definition
 
-def cleanup_knowledge_resources(defs: dict, context: dict, cred: ChainedTokenCredential, search_endpoint: str):
+# ── Resource Provisioning ─────────────────────────────────────────────────--
+async def plan_resources(graph: ResourceGraph, context: dict, engine: SearchEngine, api_version: str) -> Dict[Node, str]:
+    """GET every resource concurrently and decide whether to skip, update in place or recreate it."""
+
+    async def plan(node: Node) -> str:
+        rtype, name = node
+        ok, live = await get_search_resource(engine, get_resource_api_version(rtype, context, api_version), rtype, name)
+        if not ok:
+            # Could not read the live state; fall back to a plain PUT rather than a destructive delete.
+            return ACTION_UPDATE
+        action = plan_action(rtype, get_resource_body(rtype, graph.definitions[node]), live)
+        if action == ACTION_RECREATE:
+            logging.warning(f"♻️ {rtype.capitalize()} '{name}' has changes that cannot be applied in place; it will be recreated.")
+        return action
+
+    nodes = graph.nodes
+    return dict(zip(nodes, await asyncio.gather(*(plan(node) for node in nodes))))
+
+async def cleanup_knowledge_resources(defs: dict, context: dict, engine: SearchEngine, stale_only: bool = False):
     """Clean up knowledge base resources in the correct order:
     1) Delete knowledge bases (they reference knowledge sources)
     2) Delete knowledge sources (they reference indexes)
     This ensures indexes can be deleted without conflicts.
+
+    With stale_only=True, only the well-known knowledge source names that are no longer
+    defined in the template are deleted (e.g. after switching FOUNDRY_IQ_PATTERN).
     """
 
     knowledge_bases = defs.get("knowledgeBases", [])
-    if knowledge_bases:
+    if knowledge_bases and not stale_only:
         logging.info("🧹 Cleaning up existing knowledge bases...")
-        for kb in knowledge_bases:
-            kb_name = kb["name"]
-            call_search_api(search_endpoint, get_knowledge_api_version(context), "knowledgebases", kb_name, "delete", cred)
+        await asyncio.gather(*(
+            call_search_api(engine, get_knowledge_api_version(context), "knowledgebases", kb["name"], "delete")
+            for kb in knowledge_bases
+        ))
 
-    knowledge_sources = list(defs.get("knowledgeSources", []))
+    knowledge_sources = [] if stale_only else list(defs.get("knowledgeSources", []))
     search_index_ks_name = f"{context.get('SEARCH_RAG_INDEX_NAME')}-rag-ks"
     blob_ks_name = f"{context.get('SEARCH_RAG_INDEX_NAME')}-blob-ks"
-    existing_ks_names = {ks["name"] for ks in knowledge_sources if ks.get("name")}
+    existing_ks_names = {ks["name"] for ks in defs.get("knowledgeSources", []) if ks.get("name")}
     for name in (search_index_ks_name, blob_ks_name):
         if name and name not in existing_ks_names:
             knowledge_sources.append({"name": name})
             existing_ks_names.add(name)
     if knowledge_sources:
         logging.info("🧹 Cleaning up existing knowledge sources...")
-        for ks in knowledge_sources:
-            ks_name = ks["name"]
-            call_search_api(search_endpoint, get_knowledge_api_version(context), "knowledgesources", ks_name, "delete", cred)
+        await asyncio.gather(*(
+            call_search_api(engine, get_knowledge_api_version(context), "knowledgesources", ks["name"], "delete")
+            for ks in knowledge_sources
+        ))
 
+# ── Main Provisioning to AI Search elements (datasources, indexes, skillset and indexers) ─────────────────────
+def execute_setup(defs: Optional[dict], context: dict, credential=None) -> bool:
+    """Synchronous entry point; runs execute_setup_async on a fresh event loop."""
+    return asyncio.run(execute_setup_async(defs, context, credential))
 
-def provision_knowledge_sources(defs: dict, context: dict, cred: ChainedTokenCredential, search_endpoint: str):
-    """Create or update Foundry IQ knowledge sources.
 
-    Knowledge sources are top-level objects. For searchIndex knowledge sources, the referenced index must already exist.
-    Native Blob/ADLS knowledge sources require the 2026-05-01-preview API when ingesting permissions.
+async def execute_setup_async(defs: Optional[dict], context: dict, credential=None) -> bool:
     """
+    Provision every rendered Search resource along its dependency graph.
 
-    knowledge_sources = defs.get("knowledgeSources", [])
-    if not knowledge_sources:
-        logging.info("🧠 No knowledge sources defined in template; skipping creation")
-        return True
-
-    knowledge_api_version = get_knowledge_api_version(context)
-    logging.info(f"🧠 Creating knowledge sources ({knowledge_api_version})...")
-    success_count = 0
-    for ks in knowledge_sources:
-        ks_name = ks["name"]
-        body = ks
-        success = call_search_api(search_endpoint, knowledge_api_version, "knowledgesources", ks_name, "put", cred, body)
-        if success:
-            success_count += 1
-        else:
-            logging.error(f"❗️ Failed to create knowledge source '{ks_name}'")
-
-    logging.info(f"🧠 Knowledge sources creation completed: {success_count}/{len(knowledge_sources)} successful")
-    return success_count == len(knowledge_sources)
-
-
-def provision_knowledge_bases(defs: dict, context: dict, cred: ChainedTokenCredential, search_endpoint: str):
-    """Create or update Foundry IQ knowledge bases.
-
-    This repo uses outputMode=extractiveData and retrievalReasoningEffort=minimal so it doesn't depend on an LLM.
+    Independent resources run concurrently (up to SEARCH_SETUP_MAX_WORKERS in flight, reduced
+    automatically while the service throttles); deletes run dependents first and creates run
+    dependencies first, so wall-clock time follows the longest dependency chain.
+    Returns True when every resource was provisioned (or nothing had to change).
     """
-
-    knowledge_bases = defs.get("knowledgeBases", [])
-    if not knowledge_bases:
-        logging.info("📚 No knowledge bases defined in template; skipping creation")
-        return True
-
-    knowledge_api_version = get_knowledge_api_version(context)
-    logging.info(f"📚 Creating knowledge bases ({knowledge_api_version})...")
-    success_count = 0
-    for kb in knowledge_bases:
-        kb_name = kb["name"]
-        body = kb
-        success = call_search_api(search_endpoint, knowledge_api_version, "knowledgebases", kb_name, "put", cred, body)
-        if success:
-            success_count += 1
-        else:
-            logging.error(f"❗️ Failed to create knowledge base '{kb_name}'")
-
-    logging.info(f"📚 Knowledge bases creation completed: {success_count}/{len(knowledge_bases)} successful")
-    return success_count == len(knowledge_bases)
-
-# ── Main Provisioning to AI Search elements (datasources, indexes, skillset and indexers) ─────────────────────
-def execute_setup(defs: Optional[dict], context: dict):
     if defs is None:
         logging.error("No search definitions to provision. Skipping setup.")
-        return
-    cred = ChainedTokenCredential(AzureCliCredential(),ManagedIdentityCredential())
-    indexers = defs.get("indexers", [])
-    ds_to_indexers = {}
-    for ix in indexers:
-        ds_name = ix["body"]["dataSourceName"]
-        ds_to_indexers.setdefault(ds_name, []).append(ix["name"])
+        return False
+    cred = credential or get_credential()
     search_endpoint = context.get("SEARCH_SERVICE_QUERY_ENDPOINT")
     api_version = context.get("SEARCH_API_VERSION")
     if not search_endpoint:
         logging.error("❗️ SEARCH_SERVICE_QUERY_ENDPOINT not found in App Configuration; skipping Azure Search setup.")
-        return
+        return False
     if not api_version:
         logging.error("❗️ SEARCH_API_VERSION not found in search.env; skipping Azure Search setup.")
-        return
-    
-    # Step 1: Clean up knowledge base resources in correct order (KB -> KS)
-    cleanup_knowledge_resources(defs, context, cred, search_endpoint)
-    
-    # Step 2: Provision standard search resources (now indexes can be deleted safely)
-    provision_datasources(defs, context, cred, ds_to_indexers, search_endpoint, api_version)
-    provision_indexes(defs, context, cred, search_endpoint, api_version)
-    provision_skillsets(defs, context, cred, search_endpoint, api_version)
-    provision_indexers(defs, context, cred, search_endpoint, api_version)
-    
-    # Step 3: Provision knowledge base resources (KS -> KB)
-    knowledge_sources_ok = provision_knowledge_sources(defs, context, cred, search_endpoint)
-    knowledge_bases_ok = provision_knowledge_bases(defs, context, cred, search_endpoint)
-    if context.get("RETRIEVAL_BACKEND") == "foundry_iq" and (not knowledge_sources_ok or not knowledge_bases_ok):
-        raise RuntimeError("Foundry IQ knowledge source/base provisioning failed")
-    
+        return False
+
+    cache = RenderCache.from_context(context)
+    digest = (context.get(RENDER_HASH_KEY) or {}).get(TEMPLATE_NAME)
+    if cache and digest and cache.is_applied(TEMPLATE_NAME, digest) and not has_pending_versions(context):
+        logging.info("✅ Search definitions are unchanged since the last successful run; skipping provisioning "
+                     "(set SEARCH_FORCE_APPLY=true to force it).")
+        return True
+
+    max_workers = get_max_workers(context)
+    with SearchClient(search_endpoint, cred, pool_size=max_workers, session=get_http_session()) as client:
+        engine = SearchEngine(client, max_workers)
+        versioned_results = {}
+        if versioning_enabled(context):
+            if is_reconcile_mode(context):
+                # Versioned indexes are rebuilt blue/green behind an alias and left out of the graph.
+                defs, versioned_results = await stage_versioned_indexes(
+                    defs, context, engine, api_version, cred, LABEL_FILTER,
+                    knowledge_api_version=get_knowledge_api_version(context),
+                )
+            else:
+                logging.warning("❗️ SEARCH_INDEX_VERSIONING requires SEARCH_PROVISIONING_MODE=reconcile; ignoring it.")
+        graph = build_resource_graph(defs)
+        succeeded = await _provision_graph(graph, defs, context, engine, api_version)
+        summary = client.latency_summary()
+    logging.info(
+        f"⏱️ {summary['count']} Search calls: total {summary['total']:.2f}s, "
+        f"p50 {summary['p50'] * 1000:.0f} ms, p95 {summary['p95'] * 1000:.0f} ms, max {summary['max'] * 1000:.0f} ms; "
+        f"{engine.retries} retries ({engine.throttled} throttled)"
+    )
+    for alias, ok in versioned_results.items():
+        if not ok:
+            logging.warning(f"❗️ Versioned index '{alias}' could not be fully provisioned.")
+    succeeded = succeeded and all(versioned_results.values())
+    if cache and digest and succeeded:
+        cache.mark_applied(TEMPLATE_NAME, digest, context, cred, LABEL_FILTER)
     logging.info("All components have been provisioned.")
+    return succeeded
+
+
+async def _provision_graph(graph: ResourceGraph, defs: dict, context: dict, engine: SearchEngine, api_version: str) -> bool:
+    """Plan, delete and create the graph's resources through the Search engine; True when every resource succeeded."""
+    reconcile = is_reconcile_mode(context)
+    logging.info(f"Provisioning mode: {'reconcile' if reconcile else 'recreate'} ({len(graph.nodes)} resources, up to {engine.limiter.maximum} concurrent calls)")
+
+    # Step 1: Decide what to delete. In reconcile mode only resources whose change cannot be applied
+    # in place are dropped, together with everything that depends on them.
+    if reconcile:
+        plans = await plan_resources(graph, context, engine, api_version)
+        to_delete = graph.with_dependents(node for node, action in plans.items() if action == ACTION_RECREATE)
+    else:
+        # Knowledge bases/sources (including stale names) go first so indexes can be deleted safely.
+        await cleanup_knowledge_resources(defs, context, engine)
+        plans = {node: ACTION_CREATE for node in graph.nodes}
+        to_delete = {node for node in graph.nodes if node[0] not in KNOWLEDGE_RESOURCE_TYPES}
+
+    async def delete_resource(node: Node) -> bool:
+        rtype, name = node
+        return await call_search_api(engine, get_resource_api_version(rtype, context, api_version), rtype, name, "delete")
+
+    async def apply_resource(node: Node) -> bool:
+        rtype, name = node
+        action = plans[node]
+        if action == ACTION_SKIP and node not in to_delete:
+            logging.info(f"✅ {rtype.capitalize()} '{name}' is up to date; skipping.")
+            return True
+        if action == ACTION_UPDATE:
+            logging.info(f"🔄 {rtype.capitalize()} '{name}' changed; updating in place.")
+        body = get_resource_body(rtype, graph.definitions[node])
+        return await call_search_api(engine, get_resource_api_version(rtype, context, api_version), rtype, name, "put", body)
+
+    # Step 2: Delete in reverse topological order (dependents before dependencies).
+    if to_delete:
+        logging.info(f"🧹 Deleting {len(to_delete)} resource(s) before recreation...")
+        await run_graph(graph, delete_resource, reverse=True, only=to_delete)
+
+    # Step 3: Create or update in topological order (dependencies before dependents).
+    results = await run_graph(graph, apply_resource)
+    if reconcile:
+        # Knowledge bases no longer reference stale sources at this point, so they can be removed.
+        await cleanup_knowledge_resources(defs, context, engine, stale_only=True)
+
+    for key, rtype in DEFINITION_KEYS.items():
+        outcomes = [ok for (node_type, _), ok in results.items() if node_type == rtype]
+        if outcomes:
+            logging.info(f"{key}: {sum(outcomes)}/{len(outcomes)} successful")
+
+    knowledge_failures = [node for node, ok in results.items() if node[0] in KNOWLEDGE_RESOURCE_TYPES and not ok]
+    if context.get("RETRIEVAL_BACKEND") == "foundry_iq" and knowledge_failures:
+        raise RuntimeError("Foundry IQ knowledge source/base provisioning failed")
+    return all(results.values())
 
 # ── Entry Point ─────────────────────────────────────────────────────────────
+def run(credential=None) -> bool:
+    """Render the templates from App Config and provision the Search resources; True on success."""
+    template_dir = Path(os.getcwd()) / "config" / "search"
+    if not template_dir.exists():
+        logging.error(f"Template directory {template_dir} does not exist.")
+        return False
+    search_definitions, context = prepare_context_and_render(TEMPLATE_NAME, str(template_dir), label_filter=LABEL_FILTER, credential=credential)
+    if search_definitions is not None:
+        logging.info("🔍 Search definitions rendered successfully")
+    return execute_setup(search_definitions, context, credential)
+
+
 if __name__ == "__main__":
     logging.info("🔍 Starting search setup.")
     t0 = time.time()
-    cwd = Path(os.getcwd())
-    template_dir = cwd / "config" / "search"
-    if not template_dir.exists():
-        logging.error(f"Template directory {template_dir} does not exist.")
-    else:
-        search_definitions, context = prepare_context_and_render(TEMPLATE_NAME, str(template_dir), label_filter=LABEL_FILTER)
-        if search_definitions is not None:
-            logging.info("🔍 Search definitions rendered successfully")
-        execute_setup(search_definitions, context)
+    run()
     logging.info(f"✅ Setup script finished in {round(time.time() - t0, 2)} seconds.")
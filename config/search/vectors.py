@@ -0,0 +1,143 @@
+"""
+Vector field storage options for the indexes rendered from search.j2.
+
+Options come from App Configuration (seeded with backward-compatible defaults by
+search.settings.j2) and can be overridden per index through SEARCH_VECTOR_OPTIONS, a JSON object
+keyed by index role ("rag", "queries", "tables", "measures") or by index name:
+
+    SEARCH_VECTOR_COMPRESSION            none | scalar | binary
+    SEARCH_VECTOR_RESCORE                rescore compressed results with the original vectors
+    SEARCH_VECTOR_OVERSAMPLING           default oversampling factor used when rescoring
+    SEARCH_VECTOR_STORED                 false drops the retrievable copy of the vectors
+    SEARCH_VECTOR_ELEMENT_TYPE           Edm.Single | Edm.Half
+    SEARCH_VECTOR_TRUNCATION_DIMENSION   Matryoshka truncation (requires compression)
+    SEARCH_HNSW_PARAMETERS               {"m": 4, "efConstruction": 400, "efSearch": 500, "metric": "cosine"}
+    SEARCH_VECTOR_OPTIONS                {"rag": {"compression": "binary", "stored": false}, ...}
+
+HNSW parameters can be measured for a given corpus with ``python util/hnsw_benchmark.py`` and may also be
+overridden per index with an ``hnsw_parameters`` entry in SEARCH_VECTOR_OPTIONS.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from .settings import is_truthy_setting, parse_json_like_setting
+
+# Index role -> App Config key holding the index name.
+VECTOR_INDEX_ROLES = {
+    "rag": "SEARCH_RAG_INDEX_NAME",
+    "queries": "SEARCH_QUERIES_INDEX_NAME",
+    "tables": "SEARCH_TABLES_INDEX_NAME",
+    "measures": "SEARCH_MEASURES_INDEX_NAME",
+}
+
+COMPRESSION_KINDS = {"none", "scalar", "binary"}
+ELEMENT_TYPES = {"Edm.Single", "Edm.Half"}
+
+DEFAULT_HNSW_PARAMETERS = {"m": 4, "efConstruction": 400, "efSearch": 500, "metric": "cosine"}
+HNSW_METRICS = {"cosine", "euclidean", "dotProduct", "hamming"}
+# Ranges accepted by the Search service for each HNSW parameter.
+HNSW_PARAMETER_RANGES = {"m": (4, 10), "efConstruction": (100, 1000), "efSearch": (100, 1000)}
+
+DEFAULT_VECTOR_OPTIONS = {
+    "compression": "none",
+    "rescore": True,
+    "oversampling": None,
+    "stored": True,
+    "element_type": "Edm.Single",
+    "truncation_dimension": None,
+    "hnsw_parameters": DEFAULT_HNSW_PARAMETERS,
+}
+
+
+def _optional_number(value: Any, cast) -> Optional[Any]:
+    if value is None or str(value).strip() == "":
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        logging.warning(f"❗️ Ignoring invalid vector option value {value!r}")
+        return None
+
+
+def _validate_hnsw(parameters: Any, index: str) -> Dict[str, Any]:
+    parameters = parse_json_like_setting(parameters)
+    if not isinstance(parameters, dict):
+        logging.warning(f"❗️ HNSW parameters for {index} must be a JSON object; using defaults")
+        parameters = {}
+    result = dict(DEFAULT_HNSW_PARAMETERS)
+    for name, (low, high) in HNSW_PARAMETER_RANGES.items():
+        value = _optional_number(parameters.get(name), int)
+        if value is None:
+            continue
+        if not low <= value <= high:
+            logging.warning(f"❗️ HNSW {name}={value} for {index} is outside [{low}, {high}]; clamping")
+            value = min(high, max(low, value))
+        result[name] = value
+    metric = parameters.get("metric") or result["metric"]
+    if metric not in HNSW_METRICS:
+        logging.warning(f"❗️ Unknown HNSW metric '{metric}' for {index}; using '{result['metric']}'")
+    else:
+        result["metric"] = metric
+    return result
+
+
+def _validate(options: Dict[str, Any], index: str) -> Dict[str, Any]:
+    compression = str(options.get("compression") or "none").strip().lower()
+    if compression not in COMPRESSION_KINDS:
+        logging.warning(f"❗️ Unknown vector compression '{compression}' for {index}; using 'none'")
+        compression = "none"
+    element_type = str(options.get("element_type") or "Edm.Single").strip()
+    if element_type not in ELEMENT_TYPES:
+        logging.warning(f"❗️ Unsupported vector element type '{element_type}' for {index}; using 'Edm.Single'")
+        element_type = "Edm.Single"
+    truncation = _optional_number(options.get("truncation_dimension"), int)
+    if truncation and compression == "none":
+        logging.warning(f"❗️ truncationDimension requires compression; ignoring it for {index}")
+        truncation = None
+    return {
+        "compression": compression,
+        "rescore": is_truthy_setting(options.get("rescore")),
+        "oversampling": _optional_number(options.get("oversampling"), float),
+        "stored": is_truthy_setting(options.get("stored")),
+        "element_type": element_type,
+        "truncation_dimension": truncation,
+        "hnsw_parameters": _validate_hnsw(options.get("hnsw_parameters"), index),
+    }
+
+
+def resolve_vector_options(context: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Return {role: options} for every index in search.j2, applying per-index overrides."""
+    base = dict(DEFAULT_VECTOR_OPTIONS)
+    for option, key in (
+        ("compression", "SEARCH_VECTOR_COMPRESSION"),
+        ("rescore", "SEARCH_VECTOR_RESCORE"),
+        ("oversampling", "SEARCH_VECTOR_OVERSAMPLING"),
+        ("stored", "SEARCH_VECTOR_STORED"),
+        ("element_type", "SEARCH_VECTOR_ELEMENT_TYPE"),
+        ("truncation_dimension", "SEARCH_VECTOR_TRUNCATION_DIMENSION"),
+        ("hnsw_parameters", "SEARCH_HNSW_PARAMETERS"),
+    ):
+        if context.get(key) not in (None, ""):
+            base[option] = context[key]
+
+    overrides = parse_json_like_setting(context.get("SEARCH_VECTOR_OPTIONS") or {})
+    if not isinstance(overrides, dict):
+        logging.warning("❗️ SEARCH_VECTOR_OPTIONS must be a JSON object; ignoring it")
+        overrides = {}
+
+    resolved = {}
+    for role, name_key in VECTOR_INDEX_ROLES.items():
+        options = dict(base)
+        index_name = context.get(name_key)
+        for override_key in (role, index_name):
+            override = overrides.get(override_key) if override_key else None
+            if not isinstance(override, dict):
+                continue
+            for option, value in override.items():
+                current = parse_json_like_setting(options.get(option))
+                if option == "hnsw_parameters" and isinstance(current, dict) and isinstance(value, dict):
+                    value = {**current, **value}
+                options[option] = value
+        resolved[role] = _validate(options, index_name or role)
+    return resolved
@@ -0,0 +1,420 @@
+"""
+Blue/green rebuilds for Azure AI Search indexes.
+
+With SEARCH_INDEX_VERSIONING enabled (reconcile mode only), the indexes listed in
+SEARCH_VERSIONED_INDEXES (roles such as "rag" or index names; default the RAG index) are never
+deleted in place when a schema change forces a rebuild. Instead, for an index configured as ``A``:
+
+1. A new physical index ``A-vN`` is created next to the one currently serving queries and
+   recorded as ``pending``. It starts empty: nothing in this repository writes documents, so it
+   is filled by the ingestion service following the contract below.
+2. The pending index is checked against a readiness condition. SEARCH_INDEX_READINESS has no
+   default and must be set when versioning is enabled (the versioned indexes are left untouched
+   otherwise):
+   - ``signal``: its name is listed in SEARCH_INDEX_READY_SIGNAL (set by the ingestion job or an
+     operator once the re-ingestion finished);
+   - ``document_count``: its document count reached SEARCH_INDEX_READY_RATIO times the active one
+     (only meaningful when ingestion writes into the pending index);
+   - ``immediate``: cut over right away, serving an empty index until ingestion refills it.
+   SEARCH_INDEX_READY_TIMEOUT_SECONDS lets a run poll for readiness; otherwise a later run picks
+   the pending index up again. A version pending for longer than SEARCH_INDEX_PENDING_MAX_HOURS
+   (default 72) is reported with a warning on every run until it goes live.
+3. The Search alias ``A`` is repointed to the new index in one call, so clients and knowledge
+   sources that use ``A`` follow it without an outage.
+4. Versions retired for longer than SEARCH_INDEX_RETENTION_HOURS are deleted.
+
+The state of every alias (active, pending and retired versions) is kept in the App Config key
+SEARCH_INDEX_VERSIONS, which also serves as the pointer for clients that cannot use aliases.
+
+Contract for ingestion. SEARCH_INDEX_VERSIONS (label ``gpt-rag``) holds, per alias::
+
+    {"<alias>": {"active": "<index>", "pending": "<index>" | null,
+                 "versions": {"<index>": {"created": "<iso>", "retired": "<iso>"}}}}
+
+Queries always go to the alias. While ``pending`` is set, ingestion must write every document to
+the pending index as well as to the alias (a write to the alias only reaches the active index), and
+re-ingest the existing corpus into the pending index. With ``signal`` readiness it then adds the
+pending index name to SEARCH_INDEX_READY_SIGNAL; the next setup run repoints the alias. An
+ingestion that only writes to the alias (or, before the first cutover, to the legacy index) never
+fills the pending index, so ``document_count`` would never cut over.
+
+An existing non-versioned index named ``A`` keeps serving until the first rebuild; at that cutover
+it has to be deleted right before the alias ``A`` is created, because aliases and indexes share a
+namespace. The knowledge bases and searchIndex knowledge sources that reference ``A`` are deleted
+first (the service refuses to delete an index a knowledge source uses); they stay in the rendered
+definitions, so the graph step of the same run creates them again against the alias ``A``.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .engine import SearchEngine
+from .reconcile import ACTION_CREATE, ACTION_RECREATE, ACTION_SKIP, plan_action
+from .settings import is_truthy_setting, parse_json_like_setting, write_json_setting
+from .vectors import VECTOR_INDEX_ROLES
+
+VERSION_STATE_KEY = "SEARCH_INDEX_VERSIONS"
+READINESS_DOCUMENT_COUNT = "document_count"
+READINESS_SIGNAL = "signal"
+READINESS_IMMEDIATE = "immediate"
+DEFAULT_READY_RATIO = 1.0
+DEFAULT_RETENTION_HOURS = 24.0
+READY_POLL_SECONDS = 30
+READINESS_MODES = (READINESS_SIGNAL, READINESS_DOCUMENT_COUNT, READINESS_IMMEDIATE)
+DEFAULT_PENDING_MAX_HOURS = 72.0
+
+# (engine, api_version, pending index, active index) -> ready?
+ReadinessCheck = Callable[[SearchEngine, str, str, Optional[str]], Awaitable[bool]]
+# Deletes what references a legacy index before it is replaced by the alias; returns success.
+ReleaseDependents = Callable[[], Awaitable[bool]]
+
+
+def versioning_enabled(context: dict) -> bool:
+    return is_truthy_setting(context.get("SEARCH_INDEX_VERSIONING"))
+
+
+def readiness_mode(context: dict) -> Optional[str]:
+    """The configured SEARCH_INDEX_READINESS, or None when it is missing or unknown."""
+    mode = str(context.get("SEARCH_INDEX_READINESS") or "").strip().lower()
+    return mode if mode in READINESS_MODES else None
+
+
+def version_name(alias: str, version: int) -> str:
+    return f"{alias}-v{version}"
+
+
+def parse_version(alias: str, name: Optional[str]) -> Optional[int]:
+    match = re.fullmatch(re.escape(alias) + r"-v(\d+)", name or "")
+    return int(match.group(1)) if match else None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def get_versioned_index_names(context: dict) -> List[str]:
+    configured = parse_json_like_setting(context.get("SEARCH_VERSIONED_INDEXES") or ["rag"])
+    if isinstance(configured, str):
+        configured = [item.strip() for item in configured.split(",") if item.strip()]
+    names = []
+    for item in configured or []:
+        name = context.get(VECTOR_INDEX_ROLES[item]) if item in VECTOR_INDEX_ROLES else item
+        if name:
+            names.append(name)
+    return names
+
+
+def load_version_state(context: dict) -> Dict[str, dict]:
+    state = parse_json_like_setting(context.get(VERSION_STATE_KEY) or {})
+    return state if isinstance(state, dict) else {}
+
+
+def has_pending_versions(context: dict) -> bool:
+    return any((entry or {}).get("pending") for entry in load_version_state(context).values())
+
+
+def save_version_state(state: Dict[str, dict], credential, label: str) -> None:
+    """Persist the alias state to App Configuration (next to the settings it was loaded with)."""
+    write_json_setting(VERSION_STATE_KEY, state, credential, label)
+
+
+# ── Search calls ────────────────────────────────────────────────────────────
+async def _get(engine: SearchEngine, api_version: str, rtype: str, name: str) -> Tuple[bool, Optional[dict]]:
+    resp = await engine.request("get", rtype, name, api_version)
+    if resp is None or (resp.status_code >= 400 and resp.status_code != 404):
+        logging.warning(f"❗️ GET {rtype}/{name} failed: {resp.text if resp is not None else 'no response'}")
+        return False, None
+    return True, (None if resp.status_code == 404 else resp.json())
+
+
+async def _send(engine: SearchEngine, api_version: str, method: str, rtype: str, name: str, body: Optional[dict] = None) -> bool:
+    resp = await engine.request(method, rtype, name, api_version, body)
+    if resp is None:
+        return False
+    if resp.status_code >= 400 and not (method == "delete" and resp.status_code == 404):
+        logging.warning(f"❗️ {method.upper()} {rtype}/{name} failed {resp.status_code}: {resp.text}")
+        return False
+    logging.info(f"✅ {method.upper()} {rtype}/{name} succeeded ({resp.status_code})")
+    return True
+
+
+async def get_document_count(engine: SearchEngine, api_version: str, index: str) -> Optional[int]:
+    resp = await engine.request("get", "indexes", f"{index}/docs/$count", api_version)
+    if resp is None or resp.status_code >= 400:
+        return None
+    try:
+        return int(resp.text.strip().lstrip("\ufeff"))
+    except ValueError:
+        return None
+
+
+# ── Readiness ───────────────────────────────────────────────────────────────
+def default_readiness_check(context: dict) -> ReadinessCheck:
+    """Build the readiness check selected by SEARCH_INDEX_READINESS (which must be valid)."""
+    mode = readiness_mode(context)
+    if mode is None:
+        raise ValueError(f"SEARCH_INDEX_READINESS must be one of {', '.join(READINESS_MODES)}")
+    try:
+        ratio = float(context.get("SEARCH_INDEX_READY_RATIO") or DEFAULT_READY_RATIO)
+    except (TypeError, ValueError):
+        ratio = DEFAULT_READY_RATIO
+
+    async def check(engine: SearchEngine, api_version: str, pending: str, active: Optional[str]) -> bool:
+        if mode == READINESS_IMMEDIATE or active is None:
+            return True
+        if mode == READINESS_SIGNAL:
+            signal = parse_json_like_setting(context.get("SEARCH_INDEX_READY_SIGNAL") or [])
+            return pending in (signal if isinstance(signal, list) else [signal])
+        pending_count = await get_document_count(engine, api_version, pending)
+        active_count = await get_document_count(engine, api_version, active)
+        if pending_count is None or active_count is None:
+            return False
+        logging.info(f"📊 {pending}: {pending_count} documents; {active}: {active_count} (ready at {ratio:.0%})")
+        return pending_count >= active_count * ratio and (pending_count > 0 or active_count == 0)
+
+    return check
+
+
+async def _wait_until_ready(
+    check: ReadinessCheck, engine: SearchEngine, api_version: str, pending: str, active: Optional[str], timeout: float
+) -> bool:
+    deadline = time.monotonic() + timeout
+    while True:
+        if await check(engine, api_version, pending, active):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(min(READY_POLL_SECONDS, max(0.0, deadline - time.monotonic())))
+
+
+# ── Blue/green provisioning ─────────────────────────────────────────────────
+async def _resolve_current(engine: SearchEngine, api_version: str, alias: str, entry: dict) -> Tuple[bool, Optional[str], bool, bool]:
+    """
+    Return (ok, index currently serving ``alias``, whether it is a legacy index named ``alias``,
+    whether the alias exists).
+    """
+    ok, live_alias = await _get(engine, api_version, "aliases", alias)
+    if not ok:
+        return False, None, False, False
+    if live_alias and live_alias.get("indexes"):
+        return True, live_alias["indexes"][0], False, True
+    if entry.get("active"):
+        return True, entry["active"], False, False
+    ok, legacy = await _get(engine, api_version, "indexes", alias)
+    if not ok:
+        return False, None, False, False
+    return True, (alias if legacy else None), bool(legacy), False
+
+
+def knowledge_dependents(defs: dict, index: str) -> Tuple[List[str], List[str]]:
+    """(knowledge bases, knowledge sources) of ``defs`` that reference ``index``, plus its well-known searchIndex source."""
+    sources = [
+        ks["name"] for ks in defs.get("knowledgeSources") or []
+        if (ks.get("searchIndexParameters") or {}).get("searchIndexName") == index
+    ]
+    if f"{index}-rag-ks" not in sources:
+        sources.append(f"{index}-rag-ks")
+    bases = [
+        kb["name"] for kb in defs.get("knowledgeBases") or []
+        if any(ks.get("name") in sources for ks in kb.get("knowledgeSources") or [])
+    ]
+    return bases, sources
+
+
+def _release_knowledge_dependents(engine: SearchEngine, api_version: str, defs: dict, index: str) -> ReleaseDependents:
+    async def release() -> bool:
+        bases, sources = knowledge_dependents(defs, index)
+        for rtype, names in (("knowledgebases", bases), ("knowledgesources", sources)):
+            results = await asyncio.gather(*(_send(engine, api_version, "delete", rtype, name) for name in names))
+            if not all(results):
+                return False
+        return True
+
+    return release
+
+
+async def _cut_over(
+    engine: SearchEngine,
+    api_version: str,
+    alias: str,
+    entry: dict,
+    new_index: str,
+    legacy: bool,
+    release_dependents: Optional[ReleaseDependents] = None,
+) -> bool:
+    if legacy:
+        logging.warning(f"⚠️ Replacing the non-versioned index '{alias}' with alias '{alias}' -> '{new_index}'.")
+        if release_dependents is not None and not await release_dependents():
+            return False
+        if not await _send(engine, api_version, "delete", "indexes", alias):
+            return False
+    if not await _send(engine, api_version, "put", "aliases", alias, {"name": alias, "indexes": [new_index]}):
+        return False
+    previous = entry.get("active")
+    if previous and previous != new_index and previous in entry["versions"]:
+        entry["versions"][previous]["retired"] = _now()
+    entry["active"] = new_index
+    entry["pending"] = None
+    logging.info(f"🔀 Alias '{alias}' now points to '{new_index}'")
+    return True
+
+
+def _warn_if_overdue(alias: str, entry: dict, pending: str, current: Optional[str], max_age: Optional[timedelta]) -> None:
+    created = (entry["versions"].get(pending) or {}).get("created")
+    if not max_age or not created:
+        return
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(created)
+    if age > max_age:
+        logging.warning(
+            f"⚠️ '{pending}' has been pending for {age.total_seconds() / 3600:.0f}h; alias '{alias}' still points to "
+            f"'{current}'. Re-ingest into '{pending}' and list it in SEARCH_INDEX_READY_SIGNAL (see {VERSION_STATE_KEY})."
+        )
+
+
+async def _collect_garbage(engine: SearchEngine, api_version: str, entry: dict, retention: timedelta) -> None:
+    now = datetime.now(timezone.utc)
+    for name, info in list(entry["versions"].items()):
+        if name in (entry.get("active"), entry.get("pending")) or not info.get("retired"):
+            continue
+        if now - datetime.fromisoformat(info["retired"]) < retention:
+            continue
+        logging.info(f"🧹 Deleting index '{name}' retired at {info['retired']}")
+        if await _send(engine, api_version, "delete", "indexes", name):
+            del entry["versions"][name]
+
+
+async def provision_versioned_index(
+    engine: SearchEngine,
+    api_version: str,
+    definition: dict,
+    entry: dict,
+    readiness_check: ReadinessCheck,
+    ready_timeout: float,
+    retention: timedelta,
+    pending_max_age: Optional[timedelta] = None,
+    release_dependents: Optional[ReleaseDependents] = None,
+) -> bool:
+    """Bring one aliased index in line with ``definition``; mutates its state ``entry``."""
+    alias = definition["name"]
+    entry.setdefault("versions", {})
+    ok, current, legacy, has_alias = await _resolve_current(engine, api_version, alias, entry)
+    if not ok:
+        return False
+
+    pending = entry.get("pending")
+    candidate = pending or current
+    if candidate:
+        ok, live = await _get(engine, api_version, "indexes", candidate)
+        if not ok:
+            return False
+        action = plan_action("indexes", dict(definition, name=candidate), live)
+    else:
+        action = ACTION_CREATE
+
+    if action == ACTION_SKIP:
+        logging.info(f"✅ Index '{candidate}' (alias '{alias}') is up to date; skipping.")
+    elif action == ACTION_RECREATE or candidate is None:
+        if pending:
+            # The schema changed again before the pending version went live; rebuild it.
+            logging.warning(f"♻️ Pending index '{pending}' is outdated; recreating it.")
+            if not await _send(engine, api_version, "delete", "indexes", pending):
+                return False
+            target = pending
+        else:
+            versions = [parse_version(alias, name) for name in list(entry["versions"]) + [current]]
+            target = version_name(alias, max([v for v in versions if v is not None] + [0]) + 1)
+            logging.info(f"🟢 Creating '{target}' next to '{current or '(none)'}' for alias '{alias}'")
+        if not await _send(engine, api_version, "put", "indexes", target, dict(definition, name=target)):
+            return False
+        entry["versions"][target] = {"created": _now()}
+        entry["pending"] = pending = target
+    else:
+        logging.info(f"🔄 Index '{candidate}' (alias '{alias}') changed; updating in place.")
+        if not await _send(engine, api_version, "put", "indexes", candidate, dict(definition, name=candidate)):
+            return False
+
+    if pending:
+        if await _wait_until_ready(readiness_check, engine, api_version, pending, current, ready_timeout):
+            if not await _cut_over(engine, api_version, alias, entry, pending, legacy, release_dependents):
+                return False
+        else:
+            logging.info(f"⏳ '{pending}' is not ready yet; alias '{alias}' keeps pointing to '{current}'.")
+            _warn_if_overdue(alias, entry, pending, current, pending_max_age)
+    elif current and not legacy:
+        entry["active"] = current
+        if not has_alias:
+            logging.warning(f"⚠️ Alias '{alias}' is missing; pointing it to '{current}'.")
+            if not await _send(engine, api_version, "put", "aliases", alias, {"name": alias, "indexes": [current]}):
+                return False
+
+    await _collect_garbage(engine, api_version, entry, retention)
+    return True
+
+
+async def stage_versioned_indexes(
+    defs: dict,
+    context: dict,
+    engine: SearchEngine,
+    api_version: str,
+    credential,
+    label: str,
+    readiness_check: Optional[ReadinessCheck] = None,
+    knowledge_api_version: Optional[str] = None,
+) -> Tuple[dict, Dict[str, bool]]:
+    """
+    Provision the versioned indexes blue/green and return (remaining definitions, {alias: success}).
+    The returned definitions no longer contain those indexes, so the regular graph provisioning never
+    deletes them; knowledge sources keep referencing the alias name. ``knowledge_api_version`` is
+    used to delete the knowledge resources that block a legacy index cutover.
+    """
+    names = set(get_versioned_index_names(context))
+    versioned = [index for index in defs.get("indexes") or [] if index.get("name") in names]
+    if not versioned:
+        return defs, {}
+
+    remaining = dict(defs)
+    remaining["indexes"] = [index for index in defs.get("indexes") or [] if index.get("name") not in names]
+    if readiness_check is None and readiness_mode(context) is None:
+        logging.error(
+            f"❗️ SEARCH_INDEX_VERSIONING is enabled but SEARCH_INDEX_READINESS is "
+            f"'{context.get('SEARCH_INDEX_READINESS') or ''}'; set it to one of {', '.join(READINESS_MODES)}. "
+            f"Leaving {', '.join(sorted(names))} untouched."
+        )
+        return remaining, {index["name"]: False for index in versioned}
+
+    check = readiness_check or default_readiness_check(context)
+    try:
+        ready_timeout = float(context.get("SEARCH_INDEX_READY_TIMEOUT_SECONDS") or 0)
+        retention = timedelta(hours=float(context.get("SEARCH_INDEX_RETENTION_HOURS") or DEFAULT_RETENTION_HOURS))
+    except (TypeError, ValueError):
+        logging.warning("❗️ Invalid readiness timeout or retention; using defaults.")
+        ready_timeout, retention = 0.0, timedelta(hours=DEFAULT_RETENTION_HOURS)
+    try:
+        pending_hours = float(context.get("SEARCH_INDEX_PENDING_MAX_HOURS") or DEFAULT_PENDING_MAX_HOURS)
+    except (TypeError, ValueError):
+        pending_hours = DEFAULT_PENDING_MAX_HOURS
+    pending_max_age = timedelta(hours=pending_hours) if pending_hours > 0 else None
+
+    state = load_version_state(context)
+    loaded = json.dumps(state, sort_keys=True)
+    results = await asyncio.gather(*(
+        provision_versioned_index(
+            engine, api_version, index, state.setdefault(index["name"], {}), check, ready_timeout, retention,
+            pending_max_age,
+            _release_knowledge_dependents(engine, knowledge_api_version or api_version, defs, index["name"]),
+        )
+        for index in versioned
+    ))
+    # Writing an unchanged value would still change the label's ETag and invalidate the snapshot cache.
+    if json.dumps(state, sort_keys=True) != loaded:
+        try:
+            await asyncio.to_thread(save_version_state, state, credential, label)
+        except Exception as e:
+            logging.error(f"❗️ Failed to save {VERSION_STATE_KEY}: {e}")
+    context[VERSION_STATE_KEY] = state
+    return remaining, {index["name"]: ok for index, ok in zip(versioned, results)}
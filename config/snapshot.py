@@ -0,0 +1,277 @@
+"""
+Shared App Configuration snapshot for the post-provision setup scripts.
+
+The aifoundry, containerapps and search setups all read the ``gpt-rag`` label. Instead of one
+``get_configuration_setting`` round-trip per key, every script reads through an
+:class:`AppConfigSnapshot`, which lists the whole label once (a single paged call) and answers
+lookups from memory. ``get_snapshot`` returns one shared instance per endpoint and label, so
+scripts running in the same process also share the client and its sync tokens: a value written
+by one step is visible to the next read, even on another App Config replica.
+
+The snapshot is persisted to ``config/.cache/appconfig-<hash>.json`` together with the ETag of
+every page of the listing. On the next run the listing is revalidated with ``If-None-Match``
+per page; when the service answers 304 for every page the cached settings are used as-is,
+otherwise the label is listed again. Set APP_CONFIG_SNAPSHOT_CACHE=false to always list the
+label from the service. Each fetch is timed and kept in ``AppConfigSnapshot.timings``; failed
+fetches are retried by the shared policy in config/retry.py.
+
+A snapshot can also be limited to a key filter (``"KEY_VAULT_URI"``, ``"AI_FOUNDRY_*"`` or a
+comma-separated list of up to five of those), so a caller that needs a couple of keys does not
+list the whole label. Callers that keep a snapshot for a long time can pass ``max_age`` to
+``load``: once the copy is older than that, its pages are revalidated with the same conditional
+requests (304 when nothing changed) before it is used again. Snapshots of one endpoint share the
+same SDK client.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+from .retry import endpoint_of, get_retry_policy
+from .runtime import get_credential, get_transport
+
+if TYPE_CHECKING:
+    from azure.appconfiguration import AzureAppConfigurationClient, ConfigurationSetting
+
+DEFAULT_LABEL = "gpt-rag"
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".cache"
+CACHE_FORMAT_VERSION = 1
+
+
+class FetchTiming(NamedTuple):
+    mode: str          # "full" (listed the label) or "revalidated" (cached pages still current)
+    pages: int         # page requests sent
+    settings: int      # settings in the snapshot afterwards
+    seconds: float
+
+
+def snapshot_cache_enabled() -> bool:
+    return os.getenv("APP_CONFIG_SNAPSHOT_CACHE", "true").strip().lower() not in {"0", "false", "f", "no", "n"}
+
+
+class AppConfigSnapshot:
+    """In-memory copy of the settings under one label (optionally one key filter), loaded lazily on first access."""
+
+    def __init__(
+        self,
+        client: "AzureAppConfigurationClient",
+        endpoint: str,
+        label: str = DEFAULT_LABEL,
+        cache_path: Optional[Path] = None,
+        use_cache: Optional[bool] = None,
+        key_filter: Optional[str] = None,
+    ):
+        self.client = client
+        self.endpoint = endpoint
+        self.label = label
+        self.key_filter = key_filter
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.use_cache = snapshot_cache_enabled() if use_cache is None else use_cache
+        self.timings: List[FetchTiming] = []
+        self._settings: Optional[Dict[str, "ConfigurationSetting"]] = None
+        self._page_etags: List[str] = []
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    # ── Public API ──────────────────────────────────────────────────────────
+    def load(self, refresh: bool = False, max_age: Optional[float] = None) -> Dict[str, "ConfigurationSetting"]:
+        """
+        Return the settings by key, listing or revalidating them when not loaded yet, when
+        refresh=True, or when the in-memory copy is older than ``max_age`` seconds.
+        """
+        with self._lock:
+            stale = max_age is not None and time.monotonic() - self._loaded_at > max_age
+            if self._settings is None or refresh or stale:
+                self._settings = self._fetch_with_retries()
+                self._loaded_at = time.monotonic()
+            return self._settings
+
+    @property
+    def loaded(self) -> bool:
+        return self._settings is not None
+
+    @property
+    def settings(self) -> Dict[str, "ConfigurationSetting"]:
+        return self.load()
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        setting = self.load().get(key)
+        return setting.value if setting is not None and setting.value is not None else default
+
+    def values(self) -> Dict[str, Optional[str]]:
+        return {key: setting.value for key, setting in self.load().items()}
+
+    def invalidate(self) -> None:
+        """Drop the in-memory copy after writes, so the next access revalidates against the service."""
+        with self._lock:
+            self._settings = None
+            self._page_etags = []
+
+    # ── Fetching ────────────────────────────────────────────────────────────
+    def _fetch_with_retries(self) -> Dict[str, "ConfigurationSetting"]:
+        return get_retry_policy().call(
+            self._fetch, endpoint=endpoint_of(self.endpoint), label=f"Listing App Config {self._describe()}"
+        )
+
+    def _describe(self) -> str:
+        return f"label '{self.label}'" + (f" keys '{self.key_filter}'" if self.key_filter else "")
+
+    def _fetch(self) -> Dict[str, "ConfigurationSetting"]:
+        start = time.perf_counter()
+        if self._settings is not None and self._page_etags:
+            # Revalidate the in-memory copy; no need to read the file it may have come from.
+            cached = (self._settings, self._page_etags)
+        else:
+            cached = self._read_cache() if self.use_cache else None
+        if cached:
+            settings, page_etags = cached
+            changed, requests = self._pages_changed(page_etags)
+            if not changed:
+                self._page_etags = page_etags
+                self._record("revalidated", requests, len(settings), start)
+                return settings
+            logging.info(f"🔄 App Config {self._describe()} changed since the cached snapshot; listing it again.")
+        else:
+            requests = 0
+
+        settings, page_etags = self._list_pages()
+        self._page_etags = page_etags if all(etag is not None for etag in page_etags) else []
+        if self.use_cache:
+            self._write_cache(settings, page_etags)
+        self._record("full", requests + len(page_etags), len(settings), start)
+        return settings
+
+    def _list_pages(self) -> Tuple[Dict[str, "ConfigurationSetting"], List[str]]:
+        settings: Dict[str, "ConfigurationSetting"] = {}
+        page_etags: List[str] = []
+        pages = self._list().by_page()
+        for page in pages:
+            for setting in page:
+                settings[setting.key] = setting
+            page_etags.append(pages.etag)
+        return settings, page_etags
+
+    def _pages_changed(self, page_etags: List[str]) -> Tuple[bool, int]:
+        """Re-send the listing with If-None-Match per page; 304 pages are skipped by the SDK."""
+        pages = self._list().by_page(match_conditions=page_etags)
+        for _ in pages:
+            return True, len(page_etags)
+        return False, len(page_etags)
+
+    def _list(self):
+        if self.key_filter:
+            return self.client.list_configuration_settings(key_filter=self.key_filter, label_filter=self.label)
+        return self.client.list_configuration_settings(label_filter=self.label)
+
+    def _record(self, mode: str, pages: int, count: int, start: float) -> None:
+        timing = FetchTiming(mode, pages, count, time.perf_counter() - start)
+        self.timings.append(timing)
+        source = "cache revalidated" if mode == "revalidated" else "listed"
+        logging.info(f"⏱️ App Config snapshot {self._describe()}: {count} settings {source} in {timing.seconds:.2f}s ({pages} page requests)")
+
+    # ── On-disk cache ───────────────────────────────────────────────────────
+    def _resolved_cache_path(self) -> Path:
+        if self.cache_path:
+            return self.cache_path
+        scope = f"{self.endpoint}|{self.label}" + (f"|{self.key_filter}" if self.key_filter else "")
+        key = hashlib.sha256(scope.encode("utf-8")).hexdigest()[:16]
+        return DEFAULT_CACHE_DIR / f"appconfig-{key}.json"
+
+    def _read_cache(self) -> Optional[Tuple[Dict[str, "ConfigurationSetting"], List[str]]]:
+        path = self._resolved_cache_path()
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"❗️ Ignoring unreadable App Config snapshot cache {path}: {e}")
+            return None
+        if (
+            data.get("version") != CACHE_FORMAT_VERSION
+            or data.get("label") != self.label
+            or data.get("keyFilter") != self.key_filter
+            or not data.get("pageEtags")
+        ):
+            return None
+        from azure.appconfiguration import ConfigurationSetting
+
+        settings = {
+            item["key"]: ConfigurationSetting(
+                key=item["key"],
+                label=item.get("label"),
+                value=item.get("value"),
+                content_type=item.get("contentType"),
+                etag=item.get("etag"),
+                tags=item.get("tags") or {},
+            )
+            for item in data.get("settings", [])
+        }
+        return settings, data["pageEtags"]
+
+    def _write_cache(self, settings: Dict[str, "ConfigurationSetting"], page_etags: List[str]) -> None:
+        if not page_etags or any(etag is None for etag in page_etags):
+            return
+        path = self._resolved_cache_path()
+        payload = {
+            "version": CACHE_FORMAT_VERSION,
+            "label": self.label,
+            "keyFilter": self.key_filter,
+            "pageEtags": page_etags,
+            "settings": [
+                {
+                    "key": s.key,
+                    "label": s.label,
+                    "value": s.value,
+                    "contentType": s.content_type,
+                    "etag": s.etag,
+                    "tags": s.tags,
+                }
+                for s in settings.values()
+            ],
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+        except OSError as e:
+            logging.warning(f"❗️ Could not write App Config snapshot cache {path}: {e}")
+
+
+# ── Shared instances ────────────────────────────────────────────────────────
+_snapshots: Dict[Tuple[str, str, Optional[str]], AppConfigSnapshot] = {}
+_clients: Dict[str, "AzureAppConfigurationClient"] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_snapshot(
+    endpoint: Optional[str] = None,
+    credential=None,
+    label: str = DEFAULT_LABEL,
+    key_filter: Optional[str] = None,
+) -> AppConfigSnapshot:
+    """
+    Return the process-wide snapshot for ``endpoint`` (default APP_CONFIG_ENDPOINT), ``label`` and
+    ``key_filter`` (None: every key of the label). ``credential`` (default: the shared one) is only
+    used when the first snapshot of the endpoint is created.
+    """
+    endpoint = endpoint or os.getenv("APP_CONFIG_ENDPOINT")
+    if not endpoint:
+        raise EnvironmentError("APP_CONFIG_ENDPOINT must be set")
+    with _snapshots_lock:
+        snapshot = _snapshots.get((endpoint, label, key_filter))
+        if snapshot is None:
+            client = _clients.get(endpoint)
+            if client is None:
+                from azure.appconfiguration import AzureAppConfigurationClient
+
+                client = AzureAppConfigurationClient(endpoint, credential or get_credential(), transport=get_transport())
+                _clients[endpoint] = client
+            snapshot = AppConfigSnapshot(client, endpoint, label, key_filter=key_filter)
+            _snapshots[(endpoint, label, key_filter)] = snapshot
+        return snapshot
@@ -427,22 +427,76 @@ function Invoke-PythonModule {
     Invoke-NativeCommand { & python -c "import os, runpy, sys; sys.path.insert(0, os.environ['GPT_RAG_REPO_ROOT']); runpy.run_module('$ModuleName', run_name='__main__')" }
 }
 
+# The venv lives in config/.venv/<key>, where <key> hashes config/requirements.txt
+# and the Python version, and is reused as long as neither changes. A venv is only
+# marked ready once its install succeeded, so an interrupted install is rebuilt.
+#   POSTPROVISION_WHEELHOUSE  directory of wheels for an offline install
+#                             (default: config/.wheelhouse when it exists). Build it
+#                             on a connected machine with the same OS and Python:
+#                               pip download -r config/requirements.txt -d config/.wheelhouse
+#   POSTPROVISION_REUSE_VENV  false rebuilds the venv on every run.
+$bootstrapTimer = [System.Diagnostics.Stopwatch]::StartNew()
+
+$wheelhouse = $env:POSTPROVISION_WHEELHOUSE
+if ([string]::IsNullOrWhiteSpace($wheelhouse) -and (Test-Path 'config/.wheelhouse' -PathType Container)) {
+    $wheelhouse = 'config/.wheelhouse'
+}
+
+function Install-Requirements {
+    if (-not [string]::IsNullOrWhiteSpace($wheelhouse)) {
+        Write-Host "⬇️ Installing requirements offline from $wheelhouse..."
+        Invoke-NativeCommand { & python -m pip install --no-index --find-links $wheelhouse -r config/requirements.txt }
+        if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
+    } else {
+        Write-Host "⬇️ Installing requirements..."
+        Invoke-NativeCommand { & python -m pip install --upgrade pip }
+        if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
+        Invoke-NativeCommand { & python -m pip install -r config/requirements.txt }
+        if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
+    }
+}
+
 Write-Host "🐍 Checking Python venv support..."
 Invoke-NativeCommand { & python -c "import venv" 2>$null }
 $venvSupported = ($LASTEXITCODE -eq 0)
 if ($venvSupported) {
-    Write-Host "📦 Creating temporary venv..."
-    Invoke-NativeCommand { python -m venv --without-pip config/.venv_temp }
+    $venvRoot = 'config/.venv'
+    $venvKey = (Invoke-NativeCommand { & python -c "import hashlib, platform, sys; d = hashlib.sha256(open('config/requirements.txt', 'rb').read()); d.update(f'{platform.python_implementation()} {sys.version} {platform.machine()}'.encode()); print(d.hexdigest()[:16])" }) | Select-Object -Last 1
     if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
+    $venvDir = Join-Path $venvRoot $venvKey.Trim()
+    $readyMarker = Join-Path $venvDir '.ready'
 
-    # Activate the venv
-    & config/.venv_temp/Scripts/Activate.ps1
+    if (-not (Test-Truthy ($(if ($env:POSTPROVISION_REUSE_VENV) { $env:POSTPROVISION_REUSE_VENV } else { 'true' })))) {
+        Remove-Item -LiteralPath $venvDir -Recurse -Force -ErrorAction SilentlyContinue
+    }
 
-    Write-Host "⬇️ Manually bootstrapping pip..."
-    Invoke-WebRequest -Uri "https://bootstrap.pypa.io/get-pip.py" -UseBasicParsing |
-        Select-Object -ExpandProperty Content |
-        & python
-    if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
+    if (Test-Path -LiteralPath $readyMarker) {
+        Write-Host "♻️ Reusing Python environment $venvDir (requirements unchanged)."
+        & (Join-Path $venvDir 'Scripts/Activate.ps1')
+    } else {
+        # Drop incomplete venvs and the ones built for other requirements or Python versions.
+        if (Test-Path -LiteralPath $venvRoot) {
+            Get-ChildItem -LiteralPath $venvRoot -Force | Remove-Item -Recurse -Force -ErrorAction SilentlyContinue
+        }
+        Write-Host "📦 Creating Python environment $venvDir..."
+        Invoke-NativeCommand { python -m venv $venvDir 2>$null }
+        if ($LASTEXITCODE -eq 0) {
+            & (Join-Path $venvDir 'Scripts/Activate.ps1')
+        } else {
+            Remove-Item -LiteralPath $venvDir -Recurse -Force -ErrorAction SilentlyContinue
+            Invoke-NativeCommand { python -m venv --without-pip $venvDir }
+            if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
+            & (Join-Path $venvDir 'Scripts/Activate.ps1')
+
+            Write-Host "⬇️ Manually bootstrapping pip..."
+            Invoke-WebRequest -Uri "https://bootstrap.pypa.io/get-pip.py" -UseBasicParsing |
+                Select-Object -ExpandProperty Content |
+                & python
+            if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
+        }
+        Install-Requirements
+        New-Item -ItemType File -Path $readyMarker -Force | Out-Null
+    }
 } else {
     Write-Host "⚠️ Python venv is unavailable; using the current Python interpreter and site-packages."
     Write-Host "   This matches the AI Landing Zone jumpbox Python contract used by other solution accelerators."
@@ -451,91 +505,24 @@ if ($venvSupported) {
         Write-Error "Python pip is required for post-provisioning but is not available on the selected interpreter."
         exit 1
     }
+    Install-Requirements
 }
 
-Write-Host "⬇️ Installing requirements..."
-Invoke-NativeCommand { & python -m pip install --upgrade pip }
-if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
-Invoke-NativeCommand { & python -m pip install -r config/requirements.txt }
-if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
-
-#-------------------------------------------------------------------------------
-# 1) AI Foundry Setup
-#-------------------------------------------------------------------------------
-if (-not $missing.Contains('APP_CONFIG_ENDPOINT')) {
-    Write-Host "`n📑 AI Foundry Setup..."
-    Write-Host "🚀 Running config.aifoundry.setup..."
-    Invoke-PythonModule -ModuleName 'config.aifoundry.setup'
-    if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
-    Write-Host "✅ AI Foundry setup script finished."
-} else {
-    Write-Host "⏭️  Skipping AI Foundry setup (missing APP_CONFIG_ENDPOINT)."
-}
-
-#-------------------------------------------------------------------------------
-# 2) Container Apps Setup
-#-------------------------------------------------------------------------------
-if (-not $missing.Contains('APP_CONFIG_ENDPOINT')) {
-    Write-Host "`n🔍 ContainerApp setup..."
-    Write-Host "🚀 Running config.containerapps.setup..."
-    Invoke-PythonModule -ModuleName 'config.containerapps.setup'
-    if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
-    Write-Host "✅ Container Apps setup script finished."
-} else {
-    Write-Host "⏭️  Skipping Container Apps setup (missing APP_CONFIG_ENDPOINT)."
-}
+$bootstrapTimer.Stop()
+Write-Host ("⏱️ Python environment ready in {0:N1}s" -f $bootstrapTimer.Elapsed.TotalSeconds)
 
 #-------------------------------------------------------------------------------
-# 3) AI Search Setup
+# Setup phases (AI Foundry, Container Apps, AI Search)
 #-------------------------------------------------------------------------------
+# The phases run concurrently in one Python process that shares the credential,
+# the App Config snapshot and the HTTP connection pool (see config/__main__.py).
 if (-not $missing.Contains('APP_CONFIG_ENDPOINT')) {
-    Write-Host "🔍 AI Search setup..."
-    Write-Host "🚀 Running config.search.setup..."
-    Invoke-PythonModule -ModuleName 'config.search.setup'
+    Write-Host "`n🚀 Running setup phases (config)..."
+    Invoke-PythonModule -ModuleName 'config'
     if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
-    Write-Host "✅ Search setup script finished."
+    Write-Host "✅ Setup phases finished."
 } else {
-    Write-Host "⏭️  Skipping Search setup (missing APP_CONFIG_ENDPOINT)."
+    Write-Host "⏭️  Skipping setup phases (missing APP_CONFIG_ENDPOINT)."
 }
 
-#-------------------------------------------------------------------------------
-# Cleaning up
-#-------------------------------------------------------------------------------
-# Write-Host "`n🧹 Cleaning Python environment up..."
-# if (Get-Command deactivate -ErrorAction SilentlyContinue) { deactivate }
-# # Try to stop any python processes that reference the temporary venv to avoid file locks
-# $venvPattern = "config\\.venv_temp"
-# try {
-#     $procs = Get-CimInstance Win32_Process | Where-Object { $_.CommandLine -and ($_.CommandLine -match $venvPattern) }
-# } catch {
-#     # Fallback if Get-CimInstance isn't available for some reason
-#     $procs = @()
-# }
-
-# if ($procs -and $procs.Count -gt 0) {
-#     Write-Host "Stopping processes referencing venv:"
-#     foreach ($p in $procs) {
-#         Write-Host "  Stopping pid $($p.ProcessId) - $($p.Name)"
-#         try { Stop-Process -Id $p.ProcessId -Force -ErrorAction SilentlyContinue } catch {}
-#     }
-#     Start-Sleep -Seconds 1
-# }
-
-# # Retry removal with exponential backoff to handle transient locks
-# $maxRetries = 5
-# for ($i = 1; $i -le $maxRetries; $i++) {
-#     try {
-#         Remove-Item -Recurse -Force config/.venv_temp -ErrorAction Stop
-#         Write-Host "Removed venv directory."
-#         break
-#     } catch {
-#         if ($i -eq $maxRetries) {
-#             Write-Host "⚠️ Failed to remove venv after $maxRetries attempts: $($_.Exception.Message)"
-#         } else {
-#             Write-Host ("Retry {0}/{1}: waiting and retrying..." -f $i, $maxRetries)
-#             Start-Sleep -Seconds (2 * $i)
-#         }
-#     }
-# }
-
 Write-Host "`n✅ postProvisioning completed."
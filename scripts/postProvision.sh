@@ -1,8 +1,9 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
-# Ensure the temporary venv is always cleaned up, even on early exits.
-# Cleanup failures must never cause the post-provision hook to report failure.
+# The post-provision venv is kept between runs (see "Setup Python environment");
+# only the legacy temporary venv is removed. Cleanup failures must never cause
+# the post-provision hook to report failure.
 cleanup() {
   deactivate 2>/dev/null || true
   rm -rf config/.venv_temp 2>/dev/null || true
@@ -99,66 +100,85 @@ fi
 ###############################################################################
 # Setup Python environment
 ###############################################################################
-echo "📦 Creating temporary venv…"
-python3 -m venv --without-pip config/.venv_temp
-source config/.venv_temp/bin/activate
-echo "⬇️ Manually bootstrapping pip…"
-curl -sS https://bootstrap.pypa.io/get-pip.py | python
+# The venv lives in config/.venv/<key>, where <key> hashes config/requirements.txt
+# and the Python version, and is reused as long as neither changes. A venv is only
+# marked ready once its install succeeded, so an interrupted install is rebuilt.
+#   POSTPROVISION_WHEELHOUSE  directory of wheels for an offline install
+#                             (default: config/.wheelhouse when it exists). Build it
+#                             on a connected machine with the same OS and Python:
+#                               pip download -r config/requirements.txt -d config/.wheelhouse
+#   POSTPROVISION_REUSE_VENV  false rebuilds the venv on every run.
+now() { python3 -c 'import time; print(f"{time.time():.3f}")'; }
+bootstrap_start="$(now)"
+
+VENV_ROOT="config/.venv"
+venv_key="$(python3 - <<'PY'
+import hashlib, platform, sys
+digest = hashlib.sha256()
+with open("config/requirements.txt", "rb") as f:
+    digest.update(f.read())
+digest.update(f"{platform.python_implementation()} {sys.version} {platform.machine()}".encode())
+print(digest.hexdigest()[:16])
+PY
+)"
+VENV_DIR="${VENV_ROOT}/${venv_key}"
+WHEELHOUSE="${POSTPROVISION_WHEELHOUSE:-}"
+if [[ -z "$WHEELHOUSE" && -d config/.wheelhouse ]]; then
+  WHEELHOUSE="config/.wheelhouse"
+fi
 
-echo "⬇️  Installing requirements…"
-pip install --upgrade pip
-pip install -r config/requirements.txt
+if ! is_truthy "${POSTPROVISION_REUSE_VENV:-true}"; then
+  rm -rf "$VENV_DIR"
+fi
 
-###############################################################################
-# 1) AI Foundry Setup
-###############################################################################
-echo
-echo "📑 AI Foundry Setup…"
-{
-  echo "🚀 Running config.aifoundry.aifoundry_setup…"
-  python -m config.aifoundry.setup
-  echo "✅ AI Foundry setup script finished."
-} || {
-  echo "❗️ Error during AI Foundry setup. Skipping it."
-}
+if [[ -f "${VENV_DIR}/.ready" ]]; then
+  echo "♻️ Reusing Python environment ${VENV_DIR} (requirements unchanged)."
+  source "${VENV_DIR}/bin/activate"
+else
+  # Drop incomplete venvs and the ones built for other requirements or Python versions.
+  rm -rf "${VENV_ROOT:?}"/* 2>/dev/null || true
+  mkdir -p "$VENV_ROOT"
+  echo "📦 Creating Python environment ${VENV_DIR}…"
+  if python3 -m venv "$VENV_DIR" 2>/dev/null; then
+    source "${VENV_DIR}/bin/activate"
+  else
+    rm -rf "$VENV_DIR"
+    python3 -m venv --without-pip "$VENV_DIR"
+    source "${VENV_DIR}/bin/activate"
+    echo "⬇️ Manually bootstrapping pip…"
+    curl -sS https://bootstrap.pypa.io/get-pip.py | python
+  fi
 
-###############################################################################
-# 2) Container Apps Setup
-###############################################################################
-echo
-echo "🔍 ContainerApp setup…"
-{
-  echo "🚀 Running config.containerapps.setup…"
-  python -m config.containerapps.setup
-  echo "✅ Container Apps setup script finished."
-} || {
-  echo "❗️ Error during Container Apps setup. Skipping it."
-}
+  if [[ -n "$WHEELHOUSE" ]]; then
+    echo "⬇️  Installing requirements offline from ${WHEELHOUSE}…"
+    pip install --no-index --find-links "$WHEELHOUSE" -r config/requirements.txt
+  else
+    echo "⬇️  Installing requirements…"
+    pip install --upgrade pip
+    pip install -r config/requirements.txt
+  fi
+  touch "${VENV_DIR}/.ready"
+fi
+
+python3 - "$bootstrap_start" "$(now)" <<'PY'
+import sys
+print(f"⏱️ Python environment ready in {float(sys.argv[2]) - float(sys.argv[1]):.1f}s")
+PY
 
 ###############################################################################
-# 3) AI Search Setup
+# Setup phases (AI Foundry, Container Apps, AI Search)
 ###############################################################################
+# The phases run concurrently in one Python process that shares the credential,
+# the App Config snapshot and the HTTP connection pool (see config/__main__.py).
+# Run a single phase with e.g. `python -m config --phases search`.
 echo
-echo "🔍 AI Search setup…"
+echo "🚀 Running setup phases (config)…"
 {
-  echo "🚀 Running config.search.setup…"
-  python -m config.search.setup
-  echo "✅ Search setup script finished."
+  python -m config
+  echo "✅ Setup phases finished."
 } || {
-  echo "❗️ Error during Search setup. Skipping it."
+  echo "❗️ One or more setup phases failed; see the summary above."
 }
 
-###############################################################################
-# Cleaning up
-###############################################################################
-echo
-echo "🧹 Cleaning Python environment up…"
-# `deactivate` only restores shell variables (PATH, PS1) — it deletes nothing.
-# Since the script is ending, there is nothing to restore. We skip it and
-# go straight to removing the venv directory.
-# python3's shutil.rmtree handles locked files and open __pycache__ handles
-# (common on macOS with Python 3.12+) without raising, unlike `rm -rf`.
-python3 -c "import shutil; shutil.rmtree('config/.venv_temp', ignore_errors=True)"
-
 echo
 echo "✅ postProvisioning completed."
@@ -0,0 +1,84 @@
+"""Shared retry policy (config/retry.py): throttling must back off, not trip the circuit breaker."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from config.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+from config.search.engine import SearchEngine
+
+CONCURRENT_CALLS = 10
+THROTTLED_ATTEMPTS = 3
+
+
+class HttpError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def make_policy():
+    return RetryPolicy(max_attempts=THROTTLED_ATTEMPTS + 1, base_delay=0, max_delay=0, breaker=CircuitBreaker(threshold=8, cooldown=30))
+
+
+def test_concurrent_throttled_calls_all_succeed():
+    policy = make_policy()
+    attempts = {}
+    lock = threading.Lock()
+
+    def call(n):
+        with lock:
+            attempts[n] = attempts.get(n, 0) + 1
+            if attempts[n] <= THROTTLED_ATTEMPTS:
+                raise HttpError(429, {"Retry-After": "0"})
+        return n
+
+    with ThreadPoolExecutor(max_workers=CONCURRENT_CALLS) as pool:
+        results = list(pool.map(lambda n: policy.call(call, n, endpoint="search"), range(CONCURRENT_CALLS)))
+
+    assert results == list(range(CONCURRENT_CALLS))
+    assert policy.stats.snapshot()["search"]["throttled"] == CONCURRENT_CALLS * THROTTLED_ATTEMPTS
+    policy.breaker.before_call("search")  # still closed
+
+
+def test_concurrent_throttled_search_requests_all_succeed():
+    class Client:
+        endpoint = "https://search.example.net"
+
+        def __init__(self):
+            self.calls = {}
+            self.lock = threading.Lock()
+
+        def request(self, method, rtype, rname, api_version, body):
+            with self.lock:
+                self.calls[rname] = self.calls.get(rname, 0) + 1
+                status = 429 if self.calls[rname] <= THROTTLED_ATTEMPTS else 200
+            return SimpleNamespace(status_code=status, headers={"Retry-After": "0"}, text="")
+
+        def invalidate_token(self):
+            pass
+
+    engine = SearchEngine(Client(), CONCURRENT_CALLS, max_retries=THROTTLED_ATTEMPTS, policy=make_policy())
+
+    async def run():
+        return await asyncio.gather(*(engine.request("get", "indexes", f"index-{n}", "v") for n in range(CONCURRENT_CALLS)))
+
+    responses = asyncio.run(run())
+    assert [r.status_code for r in responses] == [200] * CONCURRENT_CALLS
+
+
+def test_transient_failures_still_open_the_circuit():
+    policy = RetryPolicy(max_attempts=1, base_delay=0, max_delay=0, breaker=CircuitBreaker(threshold=2, cooldown=30))
+
+    def fail():
+        raise HttpError(500)
+
+    for _ in range(2):
+        with pytest.raises(HttpError):
+            policy.call(fail, endpoint="arm")
+    with pytest.raises(CircuitOpenError):
+        policy.call(fail, endpoint="arm")
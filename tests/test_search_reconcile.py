@@ -0,0 +1,75 @@
+"""Definition diffing (config/search/reconcile.py): removals from the template must not be skipped."""
+
+import copy
+
+from config.search.reconcile import ACTION_RECREATE, ACTION_SKIP, ACTION_UPDATE, plan_action
+
+
+def live_index():
+    return {
+        "@odata.etag": '"0x1"',
+        "name": "ragindex",
+        "fields": [
+            {"name": "id", "type": "Edm.String", "key": True},
+            {"name": "content", "type": "Edm.String"},
+            {
+                "name": "contentVector",
+                "type": "Collection(Edm.Single)",
+                "dimensions": 3072,
+                "vectorSearchProfile": "profile",
+            },
+        ],
+        "vectorSearch": {
+            "algorithms": [{"name": "hnsw", "kind": "hnsw", "hnswParameters": {"m": 4, "metric": "cosine"}}],
+            "profiles": [{"name": "profile", "algorithm": "hnsw", "compression": "scalar"}],
+            "compressions": [{"name": "scalar", "kind": "scalarQuantization"}],
+        },
+        "semantic": {
+            "defaultConfiguration": "semantic",
+            "configurations": [
+                {"name": "semantic", "prioritizedFields": {"prioritizedContentFields": [{"fieldName": "content"}]}}
+            ],
+        },
+        "scoringProfiles": [{"name": "boost", "text": {"weights": {"content": 2}}}],
+        "similarity": {"@odata.type": "#Microsoft.Azure.Search.BM25Similarity"},
+    }
+
+
+def template():
+    desired = copy.deepcopy(live_index())
+    for key in ("@odata.etag", "similarity"):
+        desired.pop(key)
+    desired["vectorSearch"]["profiles"][0]["compression"] = "scalar"
+    desired["fields"][2]["dimensions"] = "3072"
+    return desired
+
+
+def test_unchanged_template_is_skipped():
+    assert plan_action("indexes", template(), live_index()) == ACTION_SKIP
+
+
+def test_removing_vector_compression_is_not_skipped():
+    desired = template()
+    del desired["vectorSearch"]["profiles"][0]["compression"]
+    del desired["vectorSearch"]["compressions"]
+    assert plan_action("indexes", desired, live_index()) == ACTION_RECREATE
+
+
+def test_removing_semantic_configuration_is_an_update():
+    desired = template()
+    del desired["semantic"]
+    assert plan_action("indexes", desired, live_index()) == ACTION_UPDATE
+
+
+def test_removing_scoring_profiles_is_an_update():
+    desired = template()
+    del desired["scoringProfiles"]
+    assert plan_action("indexes", desired, live_index()) == ACTION_UPDATE
+
+
+def test_service_defaults_missing_from_template_are_still_skipped():
+    desired = template()
+    desired["fields"][1] = {"name": "content", "type": "Edm.String"}
+    live = live_index()
+    live["fields"][1].update({"searchable": True, "retrievable": True, "filterable": True})
+    assert plan_action("indexes", desired, live) == ACTION_SKIP
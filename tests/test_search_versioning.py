@@ -0,0 +1,193 @@
+"""Blue/green index versioning (config/search/versioning.py) against an in-memory Search service."""
+
+import asyncio
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from config.search import versioning
+
+ALIAS = "ragindex"
+
+
+class FakeResponse(SimpleNamespace):
+    def json(self):
+        return self.body
+
+
+class FakeEngine:
+    """Answers the REST calls versioning.py sends, keeping indexes and aliases in dicts."""
+
+    def __init__(self):
+        self.resources = {"indexes": {}, "aliases": {}, "knowledgesources": {}, "knowledgebases": {}}
+        self.document_counts = {}
+        self.calls = []
+
+    async def request(self, method, rtype, name, api_version, body=None):
+        self.calls.append((method, rtype, name))
+        store = self.resources[rtype]
+        if name.endswith("/docs/$count"):
+            index = name[: -len("/docs/$count")]
+            return FakeResponse(status_code=200, text=str(self.document_counts.get(index, 0)), body=None)
+        if method == "get":
+            if name not in store:
+                return FakeResponse(status_code=404, text="not found", body=None)
+            return FakeResponse(status_code=200, text=json.dumps(store[name]), body=store[name])
+        if method == "put":
+            created = name not in store
+            store[name] = body
+            return FakeResponse(status_code=201 if created else 200, text="", body=body)
+        if method == "delete":
+            if rtype == "indexes" and any(
+                ks["searchIndexParameters"]["searchIndexName"] == name for ks in self.resources["knowledgesources"].values()
+            ):
+                return FakeResponse(status_code=409, text="index is referenced by a knowledge source", body=None)
+            if store.pop(name, None) is None:
+                return FakeResponse(status_code=404, text="not found", body=None)
+            return FakeResponse(status_code=204, text="", body=None)
+        raise AssertionError(f"unexpected {method} {rtype}/{name}")
+
+
+def index_definition(content_type="Edm.String"):
+    return {
+        "name": ALIAS,
+        "fields": [
+            {"name": "id", "type": "Edm.String", "key": True},
+            {"name": "content", "type": content_type, "searchable": content_type == "Edm.String"},
+        ],
+    }
+
+
+@pytest.fixture
+def saved_states(monkeypatch):
+    saved = []
+    monkeypatch.setattr(versioning, "save_version_state", lambda state, credential, label: saved.append(json.loads(json.dumps(state))))
+    return saved
+
+
+def stage(engine, context, definition, **extra_defs):
+    defs = {"indexes": [definition], "indexers": [], **extra_defs}
+    return asyncio.run(versioning.stage_versioned_indexes(defs, context, engine, "2025-05-01-preview", None, "gpt-rag"))
+
+
+def make_context(**settings):
+    context = {
+        "SEARCH_INDEX_VERSIONING": "true",
+        "SEARCH_VERSIONED_INDEXES": [ALIAS],
+        "SEARCH_INDEX_READINESS": "signal",
+        "SEARCH_INDEX_RETENTION_HOURS": "1",
+    }
+    context.update(settings)
+    return context
+
+
+def test_create_pending_cutover_retire(saved_states):
+    engine = FakeEngine()
+    context = make_context()
+
+    # First run: nothing serves the alias yet, so v1 goes live right away.
+    remaining, results = stage(engine, context, index_definition())
+    assert results == {ALIAS: True}
+    assert remaining["indexes"] == []
+    assert engine.resources["aliases"][ALIAS]["indexes"] == ["ragindex-v1"]
+    assert saved_states[-1][ALIAS]["active"] == "ragindex-v1"
+    assert not versioning.has_pending_versions(context)
+
+    # A field type change cannot be applied in place: v2 is created and stays pending.
+    stage(engine, context, index_definition("Edm.Int32"))
+    entry = context[versioning.VERSION_STATE_KEY][ALIAS]
+    assert entry["pending"] == "ragindex-v2"
+    assert "ragindex-v2" in engine.resources["indexes"]
+    assert engine.resources["aliases"][ALIAS]["indexes"] == ["ragindex-v1"]
+    assert versioning.has_pending_versions(context)
+
+    # Another run without the signal neither recreates v2, cuts over nor rewrites the unchanged state.
+    engine.calls.clear()
+    saves = len(saved_states)
+    stage(engine, context, index_definition("Edm.Int32"))
+    assert ("put", "indexes", "ragindex-v2") not in engine.calls
+    assert engine.resources["aliases"][ALIAS]["indexes"] == ["ragindex-v1"]
+    assert len(saved_states) == saves
+
+    # Ingestion signals v2: the alias moves and v1 is retired but kept for the retention period.
+    context["SEARCH_INDEX_READY_SIGNAL"] = ["ragindex-v2"]
+    stage(engine, context, index_definition("Edm.Int32"))
+    entry = context[versioning.VERSION_STATE_KEY][ALIAS]
+    assert engine.resources["aliases"][ALIAS]["indexes"] == ["ragindex-v2"]
+    assert entry["active"] == "ragindex-v2" and entry["pending"] is None
+    assert entry["versions"]["ragindex-v1"]["retired"]
+    assert "ragindex-v1" in engine.resources["indexes"]
+    assert not versioning.has_pending_versions(context)
+
+    # Past the retention period the retired version is deleted.
+    context["SEARCH_INDEX_RETENTION_HOURS"] = "0"
+    stage(engine, context, index_definition("Edm.Int32"))
+    assert "ragindex-v1" not in engine.resources["indexes"]
+    assert "ragindex-v1" not in context[versioning.VERSION_STATE_KEY][ALIAS]["versions"]
+    assert saved_states[-1][ALIAS]["active"] == "ragindex-v2"
+
+
+def test_document_count_readiness_cuts_over_once_filled(saved_states):
+    engine = FakeEngine()
+    context = make_context(SEARCH_INDEX_READINESS="document_count")
+    stage(engine, context, index_definition())
+    engine.document_counts["ragindex-v1"] = 10
+
+    stage(engine, context, index_definition("Edm.Int32"))
+    assert context[versioning.VERSION_STATE_KEY][ALIAS]["pending"] == "ragindex-v2"
+
+    engine.document_counts["ragindex-v2"] = 10
+    stage(engine, context, index_definition("Edm.Int32"))
+    assert engine.resources["aliases"][ALIAS]["indexes"] == ["ragindex-v2"]
+
+
+def test_missing_readiness_leaves_versioned_indexes_untouched(saved_states):
+    engine = FakeEngine()
+    context = make_context(SEARCH_INDEX_READINESS="")
+    remaining, results = stage(engine, context, index_definition())
+    assert results == {ALIAS: False}
+    assert remaining["indexes"] == []
+    assert engine.calls == []
+    assert saved_states == []
+
+
+def test_overdue_pending_version_is_reported(saved_states, caplog):
+    engine = FakeEngine()
+    context = make_context(SEARCH_INDEX_PENDING_MAX_HOURS="1")
+    stage(engine, context, index_definition())
+    stage(engine, context, index_definition("Edm.Int32"))
+    context[versioning.VERSION_STATE_KEY][ALIAS]["versions"]["ragindex-v2"]["created"] = "2000-01-01T00:00:00+00:00"
+
+    with caplog.at_level(logging.WARNING):
+        stage(engine, context, index_definition("Edm.Int32"))
+    assert any("has been pending" in record.getMessage() for record in caplog.records)
+
+
+def test_legacy_index_cutover_releases_knowledge_sources(saved_states):
+    engine = FakeEngine()
+    knowledge_source = {"name": f"{ALIAS}-rag-ks", "kind": "searchIndex", "searchIndexParameters": {"searchIndexName": ALIAS}}
+    knowledge_base = {"name": f"{ALIAS}-rag-kb", "knowledgeSources": [{"name": knowledge_source["name"]}]}
+    engine.resources["indexes"][ALIAS] = index_definition()
+    engine.resources["knowledgesources"][knowledge_source["name"]] = knowledge_source
+    engine.resources["knowledgebases"][knowledge_base["name"]] = knowledge_base
+    context = make_context(SEARCH_INDEX_READY_SIGNAL=["ragindex-v1"])
+
+    remaining, results = stage(
+        engine, context, index_definition("Edm.Int32"),
+        knowledgeSources=[knowledge_source], knowledgeBases=[knowledge_base],
+    )
+
+    assert results == {ALIAS: True}
+    assert engine.resources["aliases"][ALIAS]["indexes"] == ["ragindex-v1"]
+    assert ALIAS not in engine.resources["indexes"]
+    deletes = [(rtype, name) for method, rtype, name in engine.calls if method == "delete"]
+    assert deletes == [
+        ("knowledgebases", knowledge_base["name"]),
+        ("knowledgesources", knowledge_source["name"]),
+        ("indexes", ALIAS),
+    ]
+    # They stay in the definitions, so the graph step creates them again against the alias.
+    assert remaining["knowledgeSources"] == [knowledge_source]
+    assert remaining["knowledgeBases"] == [knowledge_base]
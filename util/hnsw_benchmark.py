@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Offline HNSW parameter benchmark for the vector profiles in config/search/search.j2.
+
+Loads a sample of embeddings (.npy matrix or JSONL), holds out a set of query vectors, computes
+the exact top-k neighbors with NumPy, then builds a local HNSW index (hnswlib) for every
+combination of m / efConstruction / efSearch and reports recall@k, build time, index size and
+per-query latency percentiles. The recommended parameters are the fastest combination (p95
+latency) that reaches the target recall, written out as the JSON value for the
+SEARCH_HNSW_PARAMETERS App Config key:
+
+    python util/hnsw_benchmark.py embeddings.npy --k 10 --target-recall 0.95 --output hnsw.json
+    az appconfig kv set --name <appconfig> --label gpt-rag --key SEARCH_HNSW_PARAMETERS --value "$(jq -c .hnswParameters hnsw.json)"
+
+The default sweep stays within the ranges the Search service accepts (m 4-10, efConstruction and
+efSearch 100-1000). Local HNSW timings are relative: use them to compare settings, not to predict
+service latency.
+"""
+import json
+import os
+import tempfile
+import time
+
+import click
+import numpy as np
+from tabulate import tabulate
+
+try:
+    import hnswlib
+except ImportError:  # pragma: no cover - reported when the command runs
+    hnswlib = None
+
+# Search vector profile metric -> hnswlib space.
+METRIC_SPACES = {"cosine": "cosine", "dotProduct": "ip", "euclidean": "l2"}
+JSONL_VECTOR_FIELDS = ("contentVector", "vector", "embedding")
+
+def load_embeddings(path: str, field: str = None) -> np.ndarray:
+    """Read a 2-D .npy matrix or a JSONL file with one vector (or object holding one) per line."""
+    if path.endswith(".npy"):
+        data = np.load(path)
+    else:
+        rows = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                if isinstance(item, dict):
+                    keys = (field,) if field else JSONL_VECTOR_FIELDS
+                    item = next((item[k] for k in keys if k in item), None)
+                    if item is None:
+                        raise click.ClickException(f"No vector field ({', '.join(keys)}) in a line of {path}")
+                rows.append(item)
+        data = np.asarray(rows)
+    if data.ndim != 2:
+        raise click.ClickException(f"Expected a 2-D array of embeddings, got shape {data.shape}")
+    return np.ascontiguousarray(data, dtype=np.float32)
+
+def prepare_vectors(data: np.ndarray, metric: str) -> np.ndarray:
+    if metric == "cosine":
+        norms = np.linalg.norm(data, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return data / norms
+    return data
+
+def exact_top_k(base: np.ndarray, queries: np.ndarray, k: int, metric: str, batch_size: int = 1024) -> np.ndarray:
+    """Ground-truth neighbor ids (queries x k), computed in batches to bound memory."""
+    result = np.empty((len(queries), k), dtype=np.int64)
+    base_sq = np.einsum("ij,ij->i", base, base) if metric == "euclidean" else None
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start:start + batch_size]
+        scores = batch @ base.T
+        if metric == "euclidean":
+            # argmin ||q - x||^2 == argmax (2 q.x - ||x||^2)
+            scores = 2 * scores - base_sq
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        result[start:start + batch_size] = np.take_along_axis(top, order, axis=1)
+    return result
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+def index_size_bytes(index) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.bin")
+        index.save_index(path)
+        return os.path.getsize(path)
+
+def run_sweep(base, queries, truth, k, metric, m_values, ef_construction_values, ef_search_values, threads):
+    results = []
+    space = METRIC_SPACES[metric]
+    for m in m_values:
+        for ef_construction in ef_construction_values:
+            index = hnswlib.Index(space=space, dim=base.shape[1])
+            start = time.perf_counter()
+            index.init_index(max_elements=len(base), ef_construction=ef_construction, M=m)
+            index.add_items(base, np.arange(len(base)), num_threads=threads)
+            build_seconds = time.perf_counter() - start
+            size = index_size_bytes(index)
+            click.echo(f"Built m={m} efConstruction={ef_construction} in {build_seconds:.1f}s", err=True)
+
+            for ef_search in ef_search_values:
+                index.set_ef(max(ef_search, k))
+                latencies = np.empty(len(queries))
+                found = np.empty((len(queries), k), dtype=np.int64)
+                for i, query in enumerate(queries):
+                    t0 = time.perf_counter()
+                    labels, _ = index.knn_query(query, k=k, num_threads=1)
+                    latencies[i] = time.perf_counter() - t0
+                    found[i] = labels[0]
+                results.append({
+                    "m": m,
+                    "efConstruction": ef_construction,
+                    "efSearch": ef_search,
+                    "recall": recall_at_k(found, truth),
+                    "build_seconds": build_seconds,
+                    "index_bytes": size,
+                    "p50_ms": float(np.percentile(latencies, 50) * 1000),
+                    "p95_ms": float(np.percentile(latencies, 95) * 1000),
+                    "p99_ms": float(np.percentile(latencies, 99) * 1000),
+                })
+    return results
+
+def recommend(results, target_recall: float):
+    """Fastest p95 among runs reaching the target recall; otherwise the highest recall."""
+    passing = [r for r in results if r["recall"] >= target_recall]
+    if passing:
+        return min(passing, key=lambda r: (r["p95_ms"], r["index_bytes"], r["build_seconds"])), True
+    return max(results, key=lambda r: (r["recall"], -r["p95_ms"])), False
+
+def parse_values(text: str):
+    return sorted({int(v) for v in text.split(",") if v.strip()})
+
+@click.command()
+@click.argument("embeddings", type=click.Path(exists=True, dir_okay=False))
+@click.option("--field", default=None, help="JSONL field holding the vector (default: contentVector, vector or embedding).")
+@click.option("--sample", default=50000, show_default=True, help="Maximum number of vectors to index.")
+@click.option("--queries", "query_count", default=500, show_default=True, help="Vectors held out as queries.")
+@click.option("--k", default=10, show_default=True, help="Neighbors per query for recall@k.")
+@click.option("--metric", type=click.Choice(sorted(METRIC_SPACES)), default="cosine", show_default=True)
+@click.option("--m", "m_values", default="4,6,8,10", show_default=True, help="Comma-separated m values.")
+@click.option("--ef-construction", "ef_construction_values", default="100,200,400,800", show_default=True)
+@click.option("--ef-search", "ef_search_values", default="100,200,500,1000", show_default=True)
+@click.option("--target-recall", default=0.95, show_default=True, help="Minimum recall@k for a recommendation.")
+@click.option("--threads", default=-1, show_default=True, help="Build threads (-1 uses every core).")
+@click.option("--seed", default=42, show_default=True)
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Write the results and recommendation as JSON.")
+def main(embeddings, field, sample, query_count, k, metric, m_values, ef_construction_values, ef_search_values,
+         target_recall, threads, seed, output):
+    """Benchmark HNSW parameters on a sample of EMBEDDINGS and recommend hnswParameters."""
+    if hnswlib is None:
+        raise click.ClickException("hnswlib is not installed; run `pip install -r util/requirements.txt`.")
+
+    data = prepare_vectors(load_embeddings(embeddings, field), metric)
+    rng = np.random.default_rng(seed)
+    data = data[rng.permutation(len(data))[:sample + query_count]]
+    if len(data) <= query_count + k:
+        raise click.ClickException(f"Need more than {query_count + k} vectors, found {len(data)}.")
+    queries, base = data[:query_count], data[query_count:]
+    click.echo(f"Indexing {len(base)} vectors of {base.shape[1]} dimensions; {len(queries)} queries, k={k}", err=True)
+
+    start = time.perf_counter()
+    truth = exact_top_k(base, queries, k, metric)
+    click.echo(f"Exact top-{k} computed in {time.perf_counter() - start:.1f}s", err=True)
+
+    results = run_sweep(
+        base, queries, truth, k, metric,
+        parse_values(m_values), parse_values(ef_construction_values), parse_values(ef_search_values), threads,
+    )
+    best, meets_target = recommend(results, target_recall)
+
+    table = [
+        [r["m"], r["efConstruction"], r["efSearch"], f"{r['recall']:.4f}", f"{r['build_seconds']:.1f}",
+         f"{r['index_bytes'] / 1024 ** 2:.1f}", f"{r['p50_ms']:.2f}", f"{r['p95_ms']:.2f}", f"{r['p99_ms']:.2f}"]
+        for r in results
+    ]
+    click.echo(tabulate(
+        table,
+        headers=["m", "efConstruction", "efSearch", f"recall@{k}", "build s", "index MiB", "p50 ms", "p95 ms", "p99 ms"],
+        tablefmt="github",
+    ))
+
+    hnsw_parameters = {"m": best["m"], "efConstruction": best["efConstruction"], "efSearch": best["efSearch"], "metric": metric}
+    if not meets_target:
+        click.echo(f"WARNING: no combination reached recall@{k} >= {target_recall}; recommending the highest recall.", err=True)
+    click.echo(f"\nRecommended SEARCH_HNSW_PARAMETERS: {json.dumps(hnsw_parameters)}")
+
+    if output:
+        report = {
+            "hnswParameters": hnsw_parameters,
+            "meetsTargetRecall": meets_target,
+            "targetRecall": target_recall,
+            "k": k,
+            "vectors": len(base),
+            "queries": len(queries),
+            "dimensions": int(base.shape[1]),
+            "results": results,
+        }
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        click.echo(f"Wrote {output}", err=True)
+
+if __name__ == "__main__":
+    main()
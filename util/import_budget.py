@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for the setup modules run from the azd hooks and the jumpbox.
+
+Each module is imported in a fresh interpreter with ``python -X importtime``; the cumulative
+import time of the module (median of --repeat runs) is compared with its budget and the heaviest
+direct imports are listed, so a new top-level SDK import shows up as a failure instead of a
+slower post-provision run. Exits 1 when a module is over budget or fails to import.
+
+    python util/import_budget.py
+    python util/import_budget.py --budget config.search.setup=400 --repeat 7
+
+Run it from the repository root, in an environment with config/requirements.txt (and, for
+util.prereqs, util/requirements.txt) installed.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import click
+from tabulate import tabulate
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time budgets in milliseconds. Heavy SDKs (management clients, Key Vault,
+# App Config) must be imported inside the code paths that use them, not at module level.
+DEFAULT_BUDGETS = {
+    "config.__main__": 120,
+    "config.aifoundry.setup": 120,
+    "config.containerapps.setup": 120,
+    "config.search.setup": 600,
+    "util.prereqs": 250,
+}
+TOP_IMPORTS = 3
+
+def parse_importtime(stderr: str):
+    """Return [(depth, self_us, cumulative_us, name)] from ``-X importtime`` output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((depth, int(self_us), int(cumulative_us), name.strip()))
+    return entries
+
+def direct_imports(entries, module: str):
+    """Cumulative time of the imports made directly by ``module`` (printed just before it, one level deeper)."""
+    index = next(i for i, entry in enumerate(entries) if entry[3] == module and entry[0] == 0)
+    children = []
+    for depth, _, cumulative_us, name in reversed(entries[:index]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((name, cumulative_us))
+    return sorted(children, key=lambda child: -child[1])
+
+def measure(module: str, python: str):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.getenv("PYTHONPATH")])))
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=REPO_ROOT, env=env,
+    )
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit status {proc.returncode}"
+        raise RuntimeError(error)
+    entries = parse_importtime(proc.stderr)
+    total = next(cumulative for depth, _, cumulative, name in entries if name == module and depth == 0)
+    return total / 1000, direct_imports(entries, module)
+
+def parse_budgets(values):
+    budgets = dict(DEFAULT_BUDGETS)
+    for value in values:
+        module, sep, ms = value.partition("=")
+        if not sep:
+            raise click.BadParameter(f"expected MODULE=MS, got {value!r}", param_hint="--budget")
+        try:
+            budgets[module.strip()] = float(ms)
+        except ValueError:
+            raise click.BadParameter(f"budget for {module!r} is not a number", param_hint="--budget")
+    return budgets
+
+@click.command()
+@click.option("--budget", "budget_values", multiple=True, metavar="MODULE=MS", help="Set or add a module budget in milliseconds.")
+@click.option("--only", "only_modules", multiple=True, metavar="MODULE", help="Only check these modules.")
+@click.option("--repeat", default=5, show_default=True, help="Fresh-interpreter runs per module; the median is compared.")
+@click.option("--python", "python", default=sys.executable, show_default="current interpreter", help="Interpreter to measure.")
+@click.option("--json", "as_json", is_flag=True, help="Print the results as JSON.")
+def main(budget_values, only_modules, repeat, python, as_json):
+    """Fail when a setup module takes longer to import than its budget."""
+    budgets = parse_budgets(budget_values)
+    if only_modules:
+        budgets = {module: budgets.get(module, 0) for module in only_modules}
+
+    results = []
+    for module, budget in budgets.items():
+        try:
+            runs = [measure(module, python) for _ in range(max(1, repeat))]
+        except RuntimeError as e:
+            results.append({"module": module, "budget_ms": budget, "median_ms": None, "ok": False, "error": str(e), "top": []})
+            continue
+        median = statistics.median(ms for ms, _ in runs)
+        top = runs[-1][1][:TOP_IMPORTS]
+        results.append({
+            "module": module,
+            "budget_ms": budget,
+            "median_ms": round(median, 1),
+            "ok": budget <= 0 or median <= budget,
+            "error": None,
+            "top": [{"module": name, "ms": round(us / 1000, 1)} for name, us in top],
+        })
+
+    if as_json:
+        click.echo(json.dumps(results, indent=2))
+    else:
+        rows = [
+            [
+                r["module"],
+                "-" if r["median_ms"] is None else f"{r['median_ms']:.1f}",
+                f"{r['budget_ms']:.0f}" if r["budget_ms"] > 0 else "-",
+                "ok" if r["ok"] else ("IMPORT ERROR" if r["error"] else "OVER"),
+                r["error"] or ", ".join(f"{t['module']} {t['ms']:.0f}" for t in r["top"]),
+            ]
+            for r in results
+        ]
+        click.echo(tabulate(rows, headers=["module", "median ms", "budget ms", "status", "heaviest direct imports (ms)"], tablefmt="github"))
+
+    failed = [r["module"] for r in results if not r["ok"]]
+    if failed:
+        click.echo(f"\n❌ Over budget or failed to import: {', '.join(failed)}", err=True)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,38 @@
 #!/usr/bin/env python3
+"""
+Pre-deployment checks: Cosmos DB provisioning access and Azure OpenAI quota per region.
+
+Without options the tool asks for one region, as before. With --region (repeatable or
+comma-separated) or --all-regions it runs non-interactively: the Cosmos DB locations are listed
+once for every region, the Cognitive Services usages of all regions are fetched concurrently, and
+the regions are ranked by the quota left for the models in MODEL_DEPLOYMENTS (the env var, or the
+modelDeploymentList of main.parameters.json). Results are cached on disk per subscription for
+--cache-ttl seconds, so comparing regions again costs no ARM calls.
+
+    python util/prereqs.py --region eastus2,swedencentral --output json
+    python util/prereqs.py --all-regions --max-workers 16
+"""
+import hashlib
+import json
+import os
 import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 import click
 from tabulate import tabulate
-from azure.core.exceptions import HttpResponseError
-from azure.identity import DefaultAzureCredential
-from azure.mgmt.resource import ResourceManagementClient
-from azure.mgmt.cosmosdb import CosmosDBManagementClient
-from azure.mgmt.cognitiveservices import CognitiveServicesManagementClient
+
+# The Azure SDKs are imported inside the functions that use them: each management client pulls
+# in a large models tree, and the prompt and `az login` checks should not wait for them.
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_PARAMETERS_FILE = REPO_ROOT / "main.parameters.json"
+DEFAULT_CACHE_DIR = Path(os.getenv("PREREQS_CACHE_DIR") or Path.home() / ".cache" / "gpt-rag")
+DEFAULT_CACHE_TTL = 3600
+DEFAULT_MAX_WORKERS = 8
+CACHE_FORMAT_VERSION = 1
 
 def normalize_region(name: str) -> str:
     return name.replace(" ", "").replace("-", "").lower()
@@ -24,32 +48,201 @@ def get_default_subscription_id() -> str:
         click.echo("ERROR: Please login to Azure using `az login`.", err=True)
         sys.exit(1)
 
-def check_cosmos_provisioning(region: str, credential, subscription_id: str) -> bool:
+# ── Model deployments ───────────────────────────────────────────────────────
+def load_model_deployments(parameters_file: Path = DEFAULT_PARAMETERS_FILE):
+    """MODEL_DEPLOYMENTS (JSON env var) or the modelDeploymentList of the azd parameters file."""
+    raw = os.getenv("MODEL_DEPLOYMENTS")
+    try:
+        if raw:
+            return json.loads(raw)
+        with open(parameters_file, encoding="utf-8") as f:
+            return json.load(f)["parameters"]["modelDeploymentList"]["value"]
+    except (OSError, ValueError, KeyError) as e:
+        click.echo(f"⚠️ Could not read the model deployments: {e}", err=True)
+        return []
+
+def usage_name(deployment: dict) -> str:
+    """Quota name of a deployment in the usages API, e.g. ``OpenAI.GlobalStandard.gpt-4o``."""
+    model = deployment.get("model") or {}
+    sku = deployment.get("sku") or {}
+    return f"{model.get('format', 'OpenAI')}.{sku.get('name', 'Standard')}.{model.get('name', '')}"
+
+def required_quota(deployments):
+    """{usage name: capacity needed}, summing deployments that draw on the same quota."""
+    required = {}
+    for deployment in deployments:
+        name = usage_name(deployment)
+        required[name] = required.get(name, 0) + int((deployment.get("sku") or {}).get("capacity", 0))
+    return required
+
+# ── ARM queries ─────────────────────────────────────────────────────────────
+def list_cosmos_locations(credential, subscription_id: str):
+    """{normalized region: regular provisioning allowed} from a single Cosmos DB locations listing."""
+    from azure.mgmt.cosmosdb import CosmosDBManagementClient
+
     client = CosmosDBManagementClient(credential, subscription_id)
-    tgt = normalize_region(region)
+    return {
+        normalize_region(loc.name): bool(loc.properties.is_subscription_region_access_allowed_for_regular)
+        for loc in client.locations.list()
+    }
+
+def check_cosmos_provisioning(region: str, credential, subscription_id: str) -> bool:
+    from azure.core.exceptions import HttpResponseError
+
     try:
-        for loc in client.locations.list():
-            if normalize_region(loc.name) == tgt:
-                return bool(loc.properties.is_subscription_region_access_allowed_for_regular)
+        return list_cosmos_locations(credential, subscription_id).get(normalize_region(region), False)
     except HttpResponseError as e:
         click.echo(f"ERROR querying Cosmos DB locations: {e.message}", err=True)
     return False
 
-def get_openai_usages(region: str, credential, subscription_id: str):
+def ensure_cognitive_services_registered(credential, subscription_id: str) -> None:
+    from azure.mgmt.resource import ResourceManagementClient
+
     rm = ResourceManagementClient(credential, subscription_id)
     rp = rm.providers.get("Microsoft.CognitiveServices")
     if rp.registration_state.lower() != "registered":
         rm.providers.register("Microsoft.CognitiveServices")
+
+def list_usages(client, region: str):
+    return [
+        {"name": u.name.value, "current": u.current_value, "limit": u.limit}
+        for u in client.usages.list(location=normalize_region(region))
+    ]
+
+def get_openai_usages(region: str, credential, subscription_id: str):
+    from azure.core.exceptions import HttpResponseError
+    from azure.mgmt.cognitiveservices import CognitiveServicesManagementClient
+
+    ensure_cognitive_services_registered(credential, subscription_id)
     cs = CognitiveServicesManagementClient(credential, subscription_id)
     try:
-        api_region = region.replace(" ", "")
-        return list(cs.usages.list(location=api_region))
+        return list_usages(cs, region)
     except HttpResponseError as e:
         click.echo(f"ERROR fetching Azure OpenAI usage data: {e.message}", err=True)
         return []
 
+# ── Disk cache ──────────────────────────────────────────────────────────────
+class ResultCache:
+    """``{"cosmos": {...}, "regions": {region: usages}}`` per subscription, each entry with its fetch time."""
+
+    def __init__(self, subscription_id: str, ttl: float, enabled: bool = True, directory: Path = DEFAULT_CACHE_DIR):
+        key = hashlib.sha256(subscription_id.encode("utf-8")).hexdigest()[:16]
+        self.path = Path(directory) / f"prereqs-{key}.json"
+        self.ttl = ttl
+        self.enabled = enabled and ttl > 0
+        self.data = self._read() if self.enabled else {}
+
+    def _read(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data if data.get("version") == CACHE_FORMAT_VERSION else {}
+
+    def get(self, section: str, key: str):
+        entry = self.data.get(section, {}).get(key)
+        if entry and time.time() - entry.get("fetched_at", 0) < self.ttl:
+            return entry["value"]
+        return None
+
+    def put(self, section: str, key: str, value) -> None:
+        self.data.setdefault(section, {})[key] = {"fetched_at": time.time(), "value": value}
+
+    def save(self) -> None:
+        if not self.enabled:
+            return
+        self.data["version"] = CACHE_FORMAT_VERSION
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self.data), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            click.echo(f"⚠️ Could not write the preflight cache {self.path}: {e}", err=True)
+
+# ── Preflight ───────────────────────────────────────────────────────────────
+def cosmos_result(future, cache: ResultCache):
+    """The Cosmos DB locations listing of ``future`` (cached on success), or {} after reporting its error."""
+    try:
+        cosmos = future.result()
+    except Exception as e:
+        click.echo(f"ERROR querying Cosmos DB locations: {getattr(e, 'message', None) or e}", err=True)
+        return {}
+    cache.put("cosmos", "locations", cosmos)
+    return cosmos
+
+def collect(regions, all_regions: bool, credential, subscription_id: str, cache: ResultCache, max_workers: int):
+    """
+    Return ({region: cosmos allowed}, {region: usages or an error string}) for the requested
+    regions (every Cosmos DB location with ``all_regions``), querying only what is not cached.
+    """
+    from azure.mgmt.cognitiveservices import CognitiveServicesManagementClient
+
+    cosmos = cache.get("cosmos", "locations")
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="prereqs") as pool:
+        cosmos_future = None if cosmos is not None else pool.submit(list_cosmos_locations, credential, subscription_id)
+        if all_regions:
+            if cosmos_future is not None:
+                cosmos = cosmos_result(cosmos_future, cache)
+                cosmos_future = None
+            regions = sorted(cosmos)
+
+        usages = {region: cache.get("usages", region) for region in regions}
+        missing = [region for region, value in usages.items() if value is None]
+        if missing:
+            ensure_cognitive_services_registered(credential, subscription_id)
+            client = CognitiveServicesManagementClient(credential, subscription_id)
+            futures = {region: pool.submit(list_usages, client, region) for region in missing}
+            for region, future in futures.items():
+                try:
+                    usages[region] = future.result()
+                    cache.put("usages", region, usages[region])
+                except Exception as e:
+                    usages[region] = f"{type(e).__name__}: {getattr(e, 'message', None) or e}"
+
+        if cosmos_future is not None:
+            cosmos = cosmos_result(cosmos_future, cache)
+    cache.save()
+    return cosmos, usages
+
+def rank_regions(cosmos, usages, required):
+    """One report per region, best first: Cosmos allowed, then every model fits, then the smallest spare quota."""
+    reports = []
+    for region, region_usages in usages.items():
+        error = region_usages if isinstance(region_usages, str) else None
+        by_name = {} if error else {u["name"]: u for u in region_usages}
+        models = []
+        for name, needed in required.items():
+            usage = by_name.get(name)
+            headroom = None if usage is None else usage["limit"] - usage["current"]
+            models.append({
+                "usage": name,
+                "required": needed,
+                "headroom": headroom,
+                "fits": headroom is not None and headroom >= needed,
+            })
+        spare = [m["headroom"] - m["required"] for m in models if m["headroom"] is not None]
+        reports.append({
+            "region": region,
+            "cosmos_allowed": cosmos.get(region),
+            "models_fitting": sum(m["fits"] for m in models),
+            "models_required": len(models),
+            "min_spare": min(spare) if spare else None,
+            "viable": bool(cosmos.get(region)) and not error and all(m["fits"] for m in models),
+            "models": models,
+            "error": error,
+        })
+    reports.sort(key=lambda r: (
+        -r["viable"],
+        -bool(r["cosmos_allowed"]),
+        -r["models_fitting"],
+        -(r["min_spare"] if r["min_spare"] is not None else float("-inf")),
+        r["region"],
+    ))
+    return reports
+
 def format_usages_console(usages) -> str:
-    rows = [[u.name.value, u.current_value, u.limit] for u in usages]
+    rows = [[u["name"], u["current"], u["limit"]] for u in usages]
     return tabulate(
         rows,
         headers=["Resource", "Current", "Limit"],
@@ -58,12 +251,29 @@ def format_usages_console(usages) -> str:
         floatfmt=".2f"
     )
 
-@click.command(context_settings={"ignore_unknown_options": True})
-def main():
-    """Checks Cosmos DB provisioning and Azure OpenAI usage in a region."""
+def format_ranking_console(reports) -> str:
+    def cosmos(allowed):
+        return "?" if allowed is None else ("✅" if allowed else "❌")
+
+    def model(m):
+        headroom = "n/a" if m["headroom"] is None else f"{m['headroom']:g}"
+        return f"{'✅' if m['fits'] else '❌'} {m['usage']} {headroom}/{m['required']}"
+
+    rows = [
+        [i, r["region"], cosmos(r["cosmos_allowed"]), r["error"] or "\n".join(model(m) for m in r["models"])]
+        for i, r in enumerate(reports, 1)
+    ]
+    return tabulate(rows, headers=["#", "Region", "Cosmos DB", "Quota headroom/required"], tablefmt="simple")
+
+def parse_regions(values):
+    return [normalize_region(r) for value in values for r in value.split(",") if r.strip()]
+
+def run_interactive():
     # Always prompt for region — ensures input even when running script directly
     region = click.prompt("Azure region (default: eastus2)", default="eastus2", show_default=True)  # :contentReference[oaicite:1]{index=1}
 
+    from azure.identity import DefaultAzureCredential
+
     cred = DefaultAzureCredential()
     sub = get_default_subscription_id()
 
@@ -82,5 +292,42 @@ def main():
     else:
         click.echo("  ⚠️ No Azure OpenAI usage data found or an error occurred.")
 
+@click.command(context_settings={"ignore_unknown_options": True})
+@click.option("--region", "region_values", multiple=True, metavar="REGION[,REGION…]", help="Candidate region(s); skips the prompt.")
+@click.option("--all-regions", is_flag=True, help="Check every region listed by Cosmos DB.")
+@click.option("--output", type=click.Choice(["table", "json"]), default="table", show_default=True, help="Report format.")
+@click.option("--cache-ttl", default=DEFAULT_CACHE_TTL, show_default=True, help="Seconds to reuse cached results; 0 disables the cache.")
+@click.option("--max-workers", default=DEFAULT_MAX_WORKERS, show_default=True, help="Regions queried concurrently.")
+@click.option("--parameters-file", type=click.Path(dir_okay=False, path_type=Path), default=DEFAULT_PARAMETERS_FILE,
+              show_default=True, help="Parameters file with modelDeploymentList (when MODEL_DEPLOYMENTS is not set).")
+def main(region_values, all_regions, output, cache_ttl, max_workers, parameters_file):
+    """Checks Cosmos DB provisioning and Azure OpenAI quota in one or more regions."""
+    regions = parse_regions(region_values)
+    if not regions and not all_regions:
+        run_interactive()
+        return
+
+    from azure.identity import DefaultAzureCredential
+
+    required = required_quota(load_model_deployments(parameters_file))
+    sub = get_default_subscription_id()
+    cache = ResultCache(sub, cache_ttl)
+    start = time.perf_counter()
+    cosmos, usages = collect(regions, all_regions, DefaultAzureCredential(), sub, cache, max_workers)
+    if not usages:
+        click.echo("❌ No regions to rank: the Cosmos DB locations listing (used for --all-regions) returned none.", err=True)
+        sys.exit(1)
+    reports = rank_regions(cosmos, usages, required)
+
+    if output == "json":
+        click.echo(json.dumps(reports, indent=2))
+    else:
+        click.echo(format_ranking_console(reports))
+        click.echo(f"\n⏱️ {len(reports)} regions checked in {time.perf_counter() - start:.1f}s "
+                   f"(cache: {cache.path if cache.enabled else 'disabled'})")
+    if not any(r["viable"] for r in reports):
+        click.echo("❌ No region allows Cosmos DB provisioning with enough quota for every model.", err=True)
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()